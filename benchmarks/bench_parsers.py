@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+    Compare the parser backends of ``ordered_load`` on large schemas.
+
+    Usage: python benchmarks/bench_parsers.py [number of properties]
+"""
+
+import importlib
+import json
+import os
+import sys
+import time
+import yaml
+
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+loaders = importlib.import_module('sphinx-jsonschema.loaders')
+
+
+def make_schema(count):
+    properties = {}
+    for n in range(count):
+        properties['property_%d' % n] = {
+            'type': ['string', 'integer', 'object'][n % 3],
+            'description': 'Description of property %d, with *some* markup.' % n,
+            'minLength': n % 10,
+            'examples': ['example %d' % n, n],
+            'properties': {'nested': {'type': 'boolean', 'default': False}}
+        }
+    return {
+        '$schema': 'http://json-schema.org/draft-07/schema#',
+        'title': 'Benchmark',
+        'type': 'object',
+        'properties': properties
+    }
+
+
+def legacy_load(text):
+    # ordered_load as it was: a new pure Python loader class on every call
+    class OrderedLoader(yaml.SafeLoader):
+        pass
+
+    def construct_mapping(loader, node):
+        loader.flatten_mapping(node)
+        return OrderedDict(loader.construct_pairs(node))
+
+    OrderedLoader.add_constructor(
+        yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG,
+        construct_mapping)
+    return yaml.load(text, OrderedLoader)
+
+
+def timed(function, text, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    schema = make_schema(count)
+    json_text = json.dumps(schema, indent=2)
+    yaml_text = yaml.safe_dump(schema, sort_keys=False)
+
+    cases = [
+        ('json  legacy yaml.SafeLoader', legacy_load, json_text),
+        ('json  yaml.CSafeLoader', lambda text: loaders.ordered_load(text, format='yaml'), json_text),
+    ]
+    for name in sorted(loaders.JSON_BACKENDS):
+        def load(text, name=name):
+            loaders.set_json_backend(name)
+            return loaders.ordered_load(text, format='auto')
+        cases.append(('json  auto, %s backend' % name, load, json_text))
+    cases.extend([
+        ('yaml  legacy yaml.SafeLoader', legacy_load, yaml_text),
+        ('yaml  auto (yaml.CSafeLoader)', lambda text: loaders.ordered_load(text), yaml_text),
+    ])
+
+    print('%d properties, %d bytes JSON, %d bytes YAML'
+          % (count, len(json_text), len(yaml_text)))
+    baseline = None
+    for name, function, text in cases:
+        elapsed = timed(function, text)
+        baseline = baseline or elapsed
+        print('%-32s %9.4f s  %7.1fx' % (name, elapsed, baseline / elapsed))
+
+
+if __name__ == '__main__':
+    main()
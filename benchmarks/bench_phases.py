@@ -0,0 +1,214 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+    Time the phases of rendering the synthetic schemas of generate.py,
+    each phase on its own:
+
+    ordered_load         parsing the JSON text
+    resolve_pointer      selecting a part of the schema by JSON pointer
+    json_path_transform  applying the :hide_key: paths, as the directive does
+    _dispatch            the WideFormat traversal producing the rows
+    build_table          finishing the rows and building the table nodes
+
+    followed by a full headless Sphinx build of a project rendering every
+    shape. The phases run inside a docutils document, without Sphinx.
+
+    The results are written as JSON, to compare them across commits.
+
+    Usage: python benchmarks/bench_phases.py [--size N] [--repeat N] [--output results.json]
+           python benchmarks/bench_phases.py --compare before.json after.json
+"""
+
+import argparse
+import importlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from unittest.mock import Mock
+
+import docutils
+from docutils.core import publish_doctree
+from docutils.parsers.rst import Directive, directives
+from jsonpointer import resolve_pointer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+extension = importlib.import_module('sphinx-jsonschema')
+jsonpath = importlib.import_module('sphinx-jsonschema.jsonpath')
+loaders = importlib.import_module('sphinx-jsonschema.loaders')
+wide_format = importlib.import_module('sphinx-jsonschema.wide_format')
+
+from generate import SHAPES, POINTERS, HIDE, generate, write  # noqa: E402
+
+PHASES = ('ordered_load', 'resolve_pointer', 'json_path_transform', '_dispatch', 'build_table')
+
+
+def summary(times):
+    return {'best': min(times), 'median': statistics.median(times)}
+
+
+def timed(function, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    return summary(times)
+
+
+def make_format(state):
+    app = Mock()
+    app.config.jsonschema_options = {}
+    return wide_format.WideFormat(state, 1, '', {}, app)
+
+
+def measure(state, shape, text, repeat):
+    """ The times of the phases for the schema `text` of `shape` """
+    results = {}
+    results['ordered_load'] = timed(lambda: loaders.ordered_load(text, format='auto'), repeat)
+    schema = loaders.ordered_load(text, format='auto')
+    results['resolve_pointer'] = timed(lambda: resolve_pointer(schema, POINTERS[shape]), repeat)
+
+    engine = jsonpath.compile_paths([(path, extension.remove) for path in HIDE.get(shape, ['/$comment'])])
+    results['json_path_transform'] = timed(lambda: engine.transformed(schema), repeat)
+    schema = engine.transformed(schema)
+
+    results['_dispatch'] = timed(
+        lambda: make_format(state)._dispatch(wide_format.SchemaView.wrap(schema)), repeat)
+
+    times = []
+    for _ in range(repeat):
+        format = make_format(state)
+        view = wide_format.SchemaView.wrap(schema)
+        body, definitions = format._dispatch(view)
+        start = time.perf_counter()
+        cols, head, body = format._cover(view, body)
+        table = state.build_table((cols, head, body), format.lineno)
+        format._fill(table, head, body)
+        times.append(time.perf_counter() - start)
+    results['build_table'] = summary(times)
+    return results
+
+
+def bench_phases(size, repeat, seed):
+    results = {}
+
+    class BenchmarkDirective(Directive):
+        def run(self):
+            for shape in SHAPES:
+                text = json.dumps(generate(shape, size, seed), indent=2)
+                results[shape] = measure(self.state, shape, text, repeat)
+            return []
+
+    directives.register_directive('benchmark', BenchmarkDirective)
+    publish_doctree('.. benchmark::\n', source_path='bench.rst', settings_overrides={'report_level': 5})
+    return results
+
+
+def bench_build(size, repeat, seed):
+    """ The time of a full HTML build of a project rendering every shape """
+    from sphinx.application import Sphinx
+
+    directory = tempfile.mkdtemp(prefix='jsonschema-bench-')
+    try:
+        source = os.path.join(directory, 'source')
+        write(os.path.join(source, 'schemas'), size, seed)
+        with open(os.path.join(source, 'conf.py'), 'w') as file:
+            file.write("extensions = ['sphinx-jsonschema']\n"
+                       "jsonschema_options = {'disk_cache': False, 'http_cache': False}\n")
+        with open(os.path.join(source, 'index.rst'), 'w') as file:
+            file.write('Benchmark\n=========\n\n.. toctree::\n\n%s\n'
+                       % '\n'.join('    ' + shape for shape in SHAPES))
+        for shape in SHAPES:
+            options = '    :lift_definitions:\n    :auto_reference:\n'
+            if shape in HIDE:
+                options += '    :hide_key: %s\n' % ','.join(HIDE[shape])
+            with open(os.path.join(source, shape + '.rst'), 'w') as file:
+                file.write('%s\n%s\n\n.. jsonschema:: schemas/%s.json\n%s\n'
+                           '.. jsonschema:: schemas/%s.json#%s\n'
+                           % (shape, '=' * len(shape), shape, options, shape, POINTERS[shape]))
+
+        def build():
+            app = Sphinx(source, source, os.path.join(directory, 'html'),
+                         os.path.join(directory, 'doctrees'), 'html',
+                         status=None, warning=io.StringIO(), freshenv=True)
+            app.build()
+
+        return timed(build, repeat)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def metadata(args):
+    import sphinx
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'docutils': docutils.__version__,
+            'sphinx': sphinx.__version__,
+            'size': args.size, 'repeat': args.repeat, 'seed': args.seed}
+
+
+def report(results):
+    print('%-12s %s' % ('shape', ''.join('%21s' % phase for phase in PHASES)))
+    for shape, phases in results['phases'].items():
+        print('%-12s %s' % (shape, ''.join('%18.3fms' % (phases[phase]['best'] * 1000)
+                                           for phase in PHASES)))
+    print('full build   %.3fs' % results['build']['best'])
+
+
+def compare(before, after):
+    """ Print the ratio of the best times in `after` to those in `before` """
+    with open(before) as file:
+        before = json.load(file)
+    with open(after) as file:
+        after = json.load(file)
+    print('%-12s %s' % ('after/before', ''.join('%21s' % phase for phase in PHASES)))
+    for shape, phases in after['phases'].items():
+        if shape in before['phases']:
+            print('%-12s %s' % (shape, ''.join(
+                '%20.2fx' % (phases[phase]['best'] / before['phases'][shape][phase]['best'])
+                for phase in PHASES)))
+    print('full build   %.2fx' % (after['build']['best'] / before['build']['best']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--size', type=int, default=1, help='scale of the schemas')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of every measurement')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='file to write the results to')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='compare two result files')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = {'meta': metadata(args),
+               'phases': bench_phases(args.size, args.repeat, args.seed),
+               'build': bench_build(args.size, args.repeat, args.seed)}
+    report(results)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+"""
+    Deterministic generator of synthetic schemas in representative shapes,
+    used by the benchmarks. The same shape, size and seed always give the
+    same schema.
+
+    wide         an object with many properties of every kind
+    deep         objects nested many levels deep
+    definitions  many definitions, each an object of its own
+    refs         properties referring to definitions and to other files
+    enums        properties with large enums and examples
+    hide         nested objects with keys hidden by ``**`` paths
+
+    Usage: python benchmarks/generate.py directory [size] [seed]
+           writes <shape>.json for every shape and common.json to directory
+"""
+
+import json
+import os
+import random
+import sys
+
+TYPES = ['string', 'integer', 'number', 'boolean', 'object', 'array']
+
+FORMATS = ['date-time', 'email', 'uri', 'uuid', None]
+
+# the paths hidden with :hide_key: when rendering a shape
+HIDE = {
+    'hide': ['/**/examples', '/**/$comment', '/properties/*/default'],
+}
+
+# the file the external $ref of the refs shape point to
+COMMON = {
+    '$id': 'https://example.com/common.json',
+    'title': 'Common definitions',
+    'definitions': {
+        'identifier': {'type': 'string', 'format': 'uuid', 'description': 'A unique *identifier*.'},
+        'timestamp': {'type': 'string', 'format': 'date-time'},
+        'money': {'type': 'object', 'required': ['amount'],
+                  'properties': {'amount': {'type': 'number'}, 'currency': {'type': 'string'}}}
+    }
+}
+
+
+def description(rng, n):
+    words = ['the', 'value', 'of', 'this', 'field', 'identifies', 'owning', 'resource', 'see', 'section']
+    text = ' '.join(rng.choice(words) for _ in range(rng.randint(4, 16)))
+    if n % 3 == 0:
+        text += ', with *emphasis* and ``literal`` markup'
+    return 'Property %d: %s.' % (n, text)
+
+
+def leaf(rng, n):
+    kind = TYPES[n % len(TYPES)]
+    schema = {'type': kind, 'description': description(rng, n)}
+    if kind == 'string':
+        schema['minLength'] = rng.randint(0, 5)
+        schema['maxLength'] = rng.randint(10, 200)
+        format = rng.choice(FORMATS)
+        if format:
+            schema['format'] = format
+    elif kind in ('integer', 'number'):
+        schema['minimum'] = 0
+        schema['maximum'] = rng.randint(10, 10000)
+        schema['default'] = rng.randint(0, 10)
+    elif kind == 'boolean':
+        schema['default'] = bool(n % 2)
+    elif kind == 'object':
+        schema['properties'] = {'key': {'type': 'string'}, 'value': {'type': 'integer'}}
+        schema['additionalProperties'] = False
+    else:
+        schema['items'] = {'type': 'string'}
+        schema['uniqueItems'] = True
+    return schema
+
+
+def wide(rng, size):
+    count = 200 * size
+    return {'title': 'Wide', 'type': 'object',
+            'required': ['p%d' % n for n in range(0, count, 7)],
+            'properties': {'p%d' % n: leaf(rng, n) for n in range(count)}}
+
+
+def deep(rng, size):
+    depth = 12 * size
+    schema = {'type': 'object', 'properties': {'value%d' % n: leaf(rng, n) for n in range(3)}}
+    for level in range(depth):
+        schema = {'type': 'object', 'description': description(rng, level),
+                  'properties': dict({'level%d' % (depth - 1 - level): schema},
+                                     **{'value%d' % n: leaf(rng, n + level) for n in range(3)})}
+    schema['title'] = 'Deep'
+    return schema
+
+
+def definitions(rng, size):
+    count = 100 * size
+    defs = {}
+    for n in range(count):
+        defs['def%d' % n] = {'title': 'Definition %d' % n, 'type': 'object',
+                             'properties': {'p%d' % m: leaf(rng, n + m) for m in range(4)}}
+    return {'title': 'Definitions', 'type': 'object',
+            'properties': {'first': {'$ref': '#/definitions/def0'}},
+            'definitions': defs}
+
+
+def refs(rng, size):
+    count = 50 * size
+    external = sorted(COMMON['definitions'])
+    properties = {}
+    for n in range(count):
+        if n % 3 == 0:
+            ref = 'common.json#/definitions/%s' % external[n % len(external)]
+        else:
+            ref = '#/definitions/d%d' % (n % 20)
+        properties['p%d' % n] = {'$ref': ref}
+        if n % 5 == 0:
+            properties['p%d' % n] = {'type': 'array', 'items': {'$ref': ref}}
+    return {'title': 'References', 'type': 'object', 'properties': properties,
+            'definitions': {'d%d' % n: leaf(rng, n) for n in range(20)}}
+
+
+def enums(rng, size):
+    count = 40 * size
+    properties = {}
+    for n in range(count):
+        values = ['value-%d-%d' % (n, m) for m in range(rng.randint(20, 80))]
+        properties['p%d' % n] = {'type': 'string', 'enum': values,
+                                 'examples': rng.sample(values, 5),
+                                 'description': description(rng, n)}
+    return {'title': 'Enums', 'type': 'object', 'properties': properties}
+
+
+def hide(rng, size):
+    count = 60 * size
+
+    def annotated(n):
+        schema = leaf(rng, n)
+        schema['$comment'] = 'Internal note %d' % n
+        schema['examples'] = [n, str(n)]
+        return schema
+
+    properties = {}
+    for n in range(count):
+        properties['p%d' % n] = {'type': 'object', 'default': {}, '$comment': 'Object %d' % n,
+                                 'examples': [{}],
+                                 'properties': {'a': annotated(n), 'b': annotated(n + 1)}}
+    return {'title': 'Hidden', 'type': 'object', 'properties': properties}
+
+
+SHAPES = {
+    'wide': wide,
+    'deep': deep,
+    'definitions': definitions,
+    'refs': refs,
+    'enums': enums,
+    'hide': hide,
+}
+
+# the part of each shape a JSON pointer selects
+POINTERS = {
+    'wide': '/properties/p1',
+    'deep': '/properties/level0',
+    'definitions': '/definitions/def1',
+    'refs': '/definitions/d1',
+    'enums': '/properties/p0',
+    'hide': '/properties/p0',
+}
+
+
+def generate(shape, size=1, seed=0):
+    """ The schema of `shape`, `size` scales the number of properties or levels """
+    return SHAPES[shape](random.Random('%s-%d' % (shape, seed)), size)
+
+
+def write(directory, size=1, seed=0):
+    """ Write every shape, and the common definitions, as JSON files to `directory` """
+    os.makedirs(directory, exist_ok=True)
+    files = {'common': COMMON}
+    files.update((shape, generate(shape, size, seed)) for shape in SHAPES)
+    for name, schema in files.items():
+        with open(os.path.join(directory, name + '.json'), 'w') as file:
+            json.dump(schema, file, indent=2)
+    return sorted(files)
+
+
+def main():
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    for name in write(sys.argv[1], size, seed):
+        print(os.path.join(sys.argv[1], name + '.json'))
+
+
+if __name__ == '__main__':
+    main()
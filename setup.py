@@ -37,8 +37,9 @@ setup(
     keywords='sphinx json schema',
     packages=find_packages(),
     package_data={
-        '': ['LICENSE']
+        '': ['LICENSE'],
+        'sphinx-jsonschema': ['static/*.js']
     },
 
-    install_requires=['docutils', 'requests', 'jsonpointer', 'pyyaml']
+    install_requires=['docutils>=0.18', 'requests', 'jsonpointer', 'pyyaml']
 )
@@ -14,10 +14,7 @@
 """
 
 import csv
-import importlib
-import json
 import os
-import yaml
 
 from jsonpointer import resolve_pointer
 from traceback import format_exception, format_exception_only
@@ -28,105 +25,23 @@ from docutils.parsers.rst import Directive, DirectiveError
 from docutils.parsers.rst import directives
 from docutils.utils import SystemMessagePropagation
 from docutils.utils.error_reporting import SafeString
+from .cache import schema_cache, file_key, url_key, data_key
+from .fetch import get_fetcher, FetchError
+from .jsonpath import PathEngine, compile_paths, pairwise, maybe_int, json_path_validate
+from .loaders import FORMATS, SafeLoader, ordered_load, parse, read_file, sniff_format
+from .loaders import split_reference, import_object, native_schema, set_json_backend, find_schemas
+from .nodecache import node_cache, node_key, context, fragment_cache
+from .prefetch import prefetch, load_files as prefetch_files
+from .streaming import extract, streamable, STREAM_THRESHOLD
 from .wide_format import WideFormat, NOESC
-
-
-def pairwise(seq):
-    """ Iterate over pairs in a sequence """
-    return zip(seq, seq[1:])
-
-
-def maybe_int(val):
-    """ Convert value to an int and return it or just return the value """
-    try:
-        return int(val)
-    except:
-        return val
-
-
-def json_path_validate(path):
-    """ Check that json path doesn't contain consecutive or trailing wildcards """
-    forbidden = {
-        ('**', '**'),
-        ('**', '*'),
-        ('*', '**'),
-        ('*', '*')
-    }
-
-    return set(pairwise(path)) & forbidden == set()
-
-
-def _json_fan_out(doc, path, transform, deep=False):
-    """ Process */** wildcards in the path by fanning out the processing to multiple keys """
-    if not path:
-        if isinstance(doc, list):
-            for r in range(len(doc)):
-                transform(doc, r)
-        return
-
-    targets = []
-
-    def deeper(v):
-        if deep:
-            _json_fan_out(v, path, transform, deep)
-        else:
-            if len(path) > 1 :
-                _json_bind(v, path[1:], transform)
-
-    def iterate(iterator):
-        for k, v in iterator:
-            if k == path[0]:
-                targets.append(path)
-            else:
-                deeper(v)
-
-    if isinstance(doc, dict):
-        iterate(doc.items())
-    if isinstance(doc, list):
-        iterate(enumerate(doc))
-
-    # Since transformers can mutate the original document
-    # we need to process them once we're done iterating
-    for r in targets:
-        _json_bind(doc, r, transform)
-
-
-def _json_bind(doc, path, transform):
-    """ Bind (sub)document to a particular path """
-    obj = doc
-    last = obj
-
-    for idx, p in enumerate(path):
-        if p in ('**', '*'):
-            return _json_fan_out(
-                obj,
-                path[idx+1:],
-                transform,
-                deep=(p == '**')
-            )
-
-        last = obj
-        try:
-            obj = obj[p]
-        except (KeyError, IndexError):
-            return
-
-    if path:
-        transform(last, path[-1])
+from .compact_format import CompactFormat
+from .lazy_format import LazyFormat
+from . import inputs, instrument, labels, lazy_format, refindex
 
 
 def json_path_transform(document, path, transformer):
     """ Transform items in `document` conforming to `path` with a `transformer` in-place """
-
-    # Try to cast parts of the path as int if possible so that we can support
-    # paths like `/some/array/0/something` and we don't end up with TypeError
-    # trying to index into a list with a string '0'
-    parts = [maybe_int(p) for p in path.split('/')[1:]]
-
-    if not parts or not json_path_validate(parts):
-        raise ValueError('Supplied JSON path is invalid')
-
-    _json_bind(document, parts, transformer)
+    PathEngine([(path, transformer)]).apply(document)
 
 
 def remove(doc, key):
@@ -155,6 +70,17 @@ def jsonpath_list(item):
     raise ValueError('Invalid JSON path: "%s"' % item)
 
 
+# options selecting keys by JSON path, in the order they are applied
+PATH_OPTIONS = (('hide_key', remove),
+                ('hide_key_if_empty', remove_empty),
+                ('pass_unmodified', tag_noescape))
+
+# the layouts :layout: chooses from, ``jsonschema_layouts`` adds to them
+LAYOUTS = {'wide': WideFormat,
+           'compact': CompactFormat,
+           'lazy': LazyFormat}
+
+
 def flag(argument):
     if argument is None:
         return True
@@ -168,6 +94,10 @@ def flag(argument):
         '"%s" unknown, choose from "On", "True", "Off" or "False"' % argument)
 
 
+def parser_format(argument):
+    return directives.choice(argument, FORMATS)
+
+
 class JsonSchema(Directive):
     optional_arguments = 1
     has_content = True
@@ -180,25 +110,24 @@ class JsonSchema(Directive):
                    'encoding': directives.encoding,
                    'hide_key': jsonpath_list,
                    'hide_key_if_empty': jsonpath_list,
-                   'pass_unmodified': jsonpath_list}
+                   'pass_unmodified': jsonpath_list,
+                   'format': parser_format,
+                   'layout': directives.unchanged_required}
 
     def run(self):
+        env = self.state.document.settings.env
+        with instrument.span('jsonschema', docname=env.docname, lineno=self.lineno):
+            if instrument.enabled(self.config_options()):
+                return instrument.measure(env, self.lineno, self._run)
+            return self._run()
+
+    def _run(self):
+        return self._guard(lambda: self.render_schema(*self.get_json_data()))
+
+    def _guard(self, run):
+        # report the errors of rendering as those of the directive
         try:
-            schema, source, pointer = self.get_json_data()
-
-            if self.options.get('hide_key'):
-                for hide_path in self.options['hide_key']:
-                    json_path_transform(schema, hide_path, remove)
-            if self.options.get('hide_key_if_empty'):
-                for hide_path in self.options['hide_key_if_empty']:
-                    json_path_transform(schema, hide_path, remove_empty)
-            if self.options.get('pass_unmodified'):
-                for path in self.options['pass_unmodified']:
-                    json_path_transform(schema, path, tag_noescape)
-
-            format = WideFormat(self.state, self.lineno, source,
-                                self.options, self.state.document.settings.env.app)
-            return format.run(schema, pointer)
+            return run()
         except SystemMessagePropagation as detail:
             return [detail.args[0]]
         except DirectiveError as error:
@@ -212,25 +141,59 @@ class JsonSchema(Directive):
             raise self.error(''.join(format_exception(
                 type(error), error, tb, chain=False)))
 
+    def render_schema(self, schema, source, pointer):
+        """
+        Transform the schema as the options ask and lay it out.
+        """
+        instrument.note_source(source)
+        self.note_inputs(schema, source)
+
+        # all paths are applied in a single pass over the schema,
+        # the schema may be shared so it is transformed by copying
+        engine = compile_paths(self.path_rules())
+        if engine:
+            with instrument.phase('transform'), instrument.span('transform'):
+                schema = engine.transformed(schema)
+
+        format = self.layout()(self.state, self.lineno, source,
+                               self.options, self.state.document.settings.env.app)
+        with instrument.phase('layout'):
+            return self.render(format, schema, pointer)
+
     def get_json_data(self):
         """
         Get JSON data from the directive content, from an external
         file, from a URL reference, or from importing a schema defined in Python.
         """
+        with instrument.span('get_json_data'):
+            return self._get_json_data()
+
+    def _get_json_data(self):
         if self.arguments:
             filename, pointer = self._splitpointer(self.arguments[0])
         else:
             filename = None
             pointer = ''
 
+        resolved = False
         if self.content:
-            schema, source = self.from_content(filename)
+            data, source = self.from_content(filename)
+            schema = self.parse_data(data)
         elif filename and filename.startswith('http'):
             # Appears to be URL so process it as such
-            schema, source = self.from_url(filename)
+            schema = self.cached_load(url_key(filename, self.format()), self.from_url, filename)
+            source = filename
+            inputs.note_input(self._app(), self._docname(), ('url', filename))
         elif os.path.exists(self._convert_filename(filename)):
             # File exists so it must be a JSON schema
-            schema, source = self.from_file(filename)
+            path = self._convert_filename(filename)
+            key = file_key(path, self.options.get('encoding'), self.format(path))
+            if pointer and self._streamable(key, path):
+                schema = self.stream_load(key, path, pointer)
+                resolved = schema is not None
+            if not resolved:
+                schema = self.cached_load(key, self.from_file, filename)
+            source = self._file_source(path)
         elif filename:
             # Must be a Python reference to a schema
             schema, source = self.from_data(filename)
@@ -238,26 +201,158 @@ class JsonSchema(Directive):
             raise self.error('"%s" directive has no content or a reference to an external file.'
                              % self.name)
 
+        if pointer and not resolved:
+            try:
+                schema = resolve_pointer(schema, pointer)
+            except KeyError:
+                self._pointer_error(pointer, schema)
+
+        return schema, source, pointer
+
+    def render(self, format, schema, pointer):
+        """
+        Render the schema, or reuse the nodes of an identical earlier rendering.
+        """
+        env = self.state.document.settings.env
+        key = None
+        if self.config_options().get('node_cache', True):
+            # the name of the file only shows in targets and references
+            filename = None
+            if format.options['auto_target'] or format.options['auto_reference']:
+                filename = format.filename
+            # layouts may render differently for HTML
+            layout = '%s.%s' % (type(format).__module__, type(format).__name__), env.app.builder.format
+            # the index entries are made for the file relative to the source directory,
+            # the $id of the schema is part of the schema
+            key = node_key(schema, format.options, layout, filename, format.base, pointer, context(env))
+
+        def render():
+            return format.run(schema, pointer), format.labels, format.refs
+
+        return node_cache.render(key, render, self.state.document, env, self.lineno)
+
+    def note_inputs(self, schema, source):
+        """
+        Record the inputs of the rendering besides the schema itself: the
+        configuration and the local files the ``$ref`` point to.
+        """
+        app, docname = self._app(), self._docname()
+        for name in inputs.CONFIG:
+            inputs.note_input(app, docname, ('config', name))
+        if '://' not in source:
+            document_source = os.path.dirname(self.state.document.current_source)
+            directory = os.path.dirname(os.path.join(document_source, source))
+            for path in inputs.ref_files(schema, directory):
+                inputs.note_input(app, docname, ('file', path))
+
+    def layout(self):
+        """
+        The layout engine class selected by :layout: or the ``layout`` key
+        of ``jsonschema_options``, the default is ``wide``.
+        """
+        name = self.options.get('layout') or self.config_options().get('layout', 'wide')
+        layouts = dict(LAYOUTS)
+        layouts.update(self.state.document.settings.env.app.config.jsonschema_layouts)
+        if name not in layouts:
+            raise self.error('"%s" directive: unknown layout "%s", choose from: %s'
+                             % (self.name, name, ', '.join(sorted(layouts))))
+        layout = layouts[name]
+        if isinstance(layout, str):
+            # a Python reference like 'mod.pkg.Layout'
+            layout = self._import_object(layout)[0]
+        return layout
+
+    def path_rules(self):
+        """
+        The (path, transformer) pairs of the :hide_key:, :hide_key_if_empty:
+        and :pass_unmodified: options, the paths set in ``jsonschema_options``
+        come first.
+        """
+        config = self.config_options()
+        rules = []
+        for option, transformer in PATH_OPTIONS:
+            paths = config.get(option) or []
+            if isinstance(paths, str):
+                paths = jsonpath_list(paths)
+            for path in list(paths) + self.options.get(option, []):
+                if (path, transformer) not in rules:
+                    rules.append((path, transformer))
+        return rules
+
+    def format(self, filename=None):
+        """ The format to parse the schema in: 'auto', 'json' or 'yaml' """
+        format = self.options.get('format', 'auto')
+        if format == 'auto' and filename:
+            format = sniff_format('', filename)
+        return format
+
+    def _pointer_error(self, pointer, schema):
+        error = self.state_machine.reporter.error(
+            '"%s" directive encountered a KeyError when trying to resolve the pointer'
+            ' in schema: %s' % (self.name, SafeString(pointer)),
+            nodes.literal_block(schema, schema), line=self.lineno)
+        raise SystemMessagePropagation(error)
+
+    def _streamable(self, key, path):
+        # Only large JSON files that aren't cached in full yet are worth streaming
+        threshold = self.config_options().get('stream_threshold', STREAM_THRESHOLD)
+        return key not in schema_cache and streamable(path, key[-1], self.options.get('encoding'), threshold)
+
+    def stream_load(self, key, path, pointer):
+        """
+        Get the subschema `pointer` refers to from the JSON file at `path`
+        without parsing the remainder of the file. Returns None when the file
+        can't be streamed.
+        The returned document is shared and must not be modified.
+        """
+        def load():
+            with instrument.phase('parse'), instrument.span('extract', pointer=pointer):
+                return extract(path, pointer, lambda text: self.ordered_load(text, format='json'))
+
+        try:
+            return schema_cache.load(('pointer', pointer) + key, load)
+        except ValueError:
+            # not JSON after all, StreamError included
+            return None
+        except KeyError:
+            self._pointer_error(pointer, path)
+
+    def config_options(self):
+        return self.state.document.settings.env.app.config.jsonschema_options
+
+    def _app(self):
+        return self.state.document.settings.env.app
+
+    def _docname(self):
+        return self.state.document.settings.env.docname
+
+    def parse_data(self, data, format=None):
         try:
-            schema = self.ordered_load(schema)
+            with instrument.phase('parse'):
+                return parse(data, self.state.document.settings.env.app, self.ordered_load,
+                             format or self.format())
         except Exception as error:
             error = self.state_machine.reporter.error(
                 '"%s" directive encountered a the following error while parsing the data.\n %s'
                 % (self.name, SafeString("".join(format_exception_only(type(error), error)))),
-                nodes.literal_block(schema, schema), line=self.lineno)
+                nodes.literal_block(data, data), line=self.lineno)
             raise SystemMessagePropagation(error)
 
-        if pointer:
-            try:
-                schema = resolve_pointer(schema, pointer)
-            except KeyError:
-                error = self.state_machine.reporter.error(
-                    '"%s" directive encountered a KeyError when trying to resolve the pointer'
-                    ' in schema: %s' % (self.name, SafeString(pointer)),
-                    nodes.literal_block(schema, schema), line=self.lineno)
-                raise SystemMessagePropagation(error)
+    def cached_load(self, key, loader, reference):
+        """
+        Get the parsed schema for `reference` from the build wide schema cache,
+        calling `loader` to fetch its text when it isn't cached yet.
+        The returned document is shared and must not be modified.
+        """
+        # the format to parse in is the last part of the key
+        format = key[-1]
 
-        return schema, source, pointer
+        def load():
+            data, source = loader(reference)
+            instrument.note(bytes=len(data))
+            return self.parse_data(data, format), len(data)
+
+        return schema_cache.load(key, load)
 
     def from_content(self, filename):
         if filename:
@@ -270,6 +365,7 @@ class JsonSchema(Directive):
 
         source = self.content.source(0)
         data = '\n'.join(self.content)
+        instrument.note(bytes=len(data))
         return data, source
 
     def from_url(self, url):
@@ -278,27 +374,14 @@ class JsonSchema(Directive):
         if timeout < 0:
             timeout = None
 
+        fetcher = get_fetcher(self.state.document.settings.env.app)
         try:
-            import requests
-        except ImportError:
-            raise self.error('"%s" directive requires requests when loading from http.'
-                             ' Try "pip install requests".' % self.name)
-
-        try:
-            response = requests.get(url, timeout=timeout)
-        except requests.exceptions.RequestException as e:
-            raise self.error(u'"%s" directive recieved an "%s" when loading from url: %s.'
-                             % (self.name, type(e), url))
-
-        if response.status_code != 200:
-            # When making a connection to the url a status code will be returned
-            # Normally a OK (200) response would we be returned all other responses
-            # an error will be raised could be separated futher
+            with instrument.phase('load'):
+                data = fetcher.fetch(url, timeout=timeout)
+        except FetchError as e:
             raise self.error(u'"%s" directive received an "%s" when loading from url: %s.'
-                             % (self.name, response.reason, url))
+                             % (self.name, e, url))
 
-        # response content always binary converting with decode() no specific format defined
-        data = response.content.decode()
         return data, url
 
     def _convert_filename(self, filename):
@@ -314,48 +397,73 @@ class JsonSchema(Directive):
     def from_file(self, filename):
         source = self._convert_filename(filename)
         try:
-            with open(source, encoding=self.options.get('encoding')) as file:
-                data = file.read()
+            with instrument.phase('load'):
+                data = read_file(source, self.options.get('encoding'))
         except IOError as error:
             raise self.error(u'"%s" directive encountered an IOError while loading file: %s\n%s'
                              % (self.name, source, error))
 
+        return data, self._file_source(source)
+
+    def _file_source(self, path):
         # Simplifing source path and to the document a new dependency
         document_source = os.path.dirname(self.state.document.current_source)
-        source = utils.relative_path(document_source, source)
-        self.state.document.settings.record_dependencies.add(source)
+        source = utils.relative_path(document_source, path)
+        self._note_dependency(path)
+        return source
 
-        return data, source
+    def data_load(self, key, reference):
+        """
+        Get the schema for a Python reference from the build wide schema cache.
+        Dicts and lists, or functions returning them, are used without conversion,
+        other objects are converted to text and parsed.
+        The returned document is shared and must not be modified.
+        """
+        def load():
+            with instrument.phase('load'):
+                obj = self._import_object(reference)[0]
+                schema = native_schema(obj)
+            if schema is not None:
+                # it is in memory already, it costs nothing to keep it
+                return schema, 0
+            data = str(obj)
+            instrument.note(bytes=len(data))
+            return self.parse_data(data, key[-1]), len(data)
+
+        return schema_cache.load(key, load)
 
     def from_data(self, filename):
         """Get schema from Python data/object."""
-        document_source = os.path.dirname(self.state.document.current_source)
+        mod = self._import_object(filename)[1]
+        key = data_key(filename, self.format(), getattr(mod, '__file__', None))
+        return self.data_load(key, filename), self._module_source(mod)
 
-        parts = filename.split('.')
-        if len(parts) > 1:
-            module_name = '.'.join(parts[:-1])
-            obj_name = parts[-1]
-        else:
+    def _import_object(self, filename):
+        try:
+            return import_object(filename)
+        except ValueError:
             raise self.error(
                 f"{self.name} directive requires a Python reference to a schema object"
                 f" like 'mod.pkg.data'. '{filename}' is not valid."
             )
-
-        try:
-            mod = importlib.import_module(module_name)
-            data = str(getattr(mod, obj_name))
         except (ImportError, ModuleNotFoundError) as error:
             raise self.error(
                 f"{self.name} directive encountered an error while importing python"
-                f" module '{module_name}': \n{error}"
+                f" module '{split_reference(filename)[0]}': \n{error}"
             )
 
+    def _module_source(self, mod):
         # Simplifing source path and to the document a new dependency
-        source = mod.__file__
-        source = utils.relative_path(document_source, source)
-        self.state.document.settings.record_dependencies.add(source)
+        document_source = os.path.dirname(self.state.document.current_source)
+        source = utils.relative_path(document_source, mod.__file__)
+        self._note_dependency(mod.__file__)
+        return source
 
-        return data, source
+    def _note_dependency(self, path):
+        # Sphinx takes relative dependencies to be relative to the working directory
+        path = os.path.abspath(path)
+        self.state.document.settings.record_dependencies.add(path)
+        inputs.note_input(self._app(), self._docname(), ('file', path))
 
     def _splitpointer(self, path):
         val = path.rsplit('#', 1)
@@ -363,36 +471,110 @@ class JsonSchema(Directive):
             val.append('')
         return val
 
-    def ordered_load(self, text, Loader=yaml.SafeLoader, object_pairs_hook=OrderedDict):
-        """Allows you to use `pyyaml` to load as OrderedDict.
+    def ordered_load(self, text, Loader=SafeLoader, object_pairs_hook=OrderedDict, format='auto'):
+        return ordered_load(text, Loader, object_pairs_hook, format)
+
+
+class JsonSchemaCollection(JsonSchema):
+    """
+    Renders every schema file in a directory or matching a glob pattern, in
+    sorted order and each in a section of its own. The files are loaded
+    concurrently into the schema cache the other directives use as well.
+    """
+    optional_arguments = 0
+    required_arguments = 1
+    has_content = False
+    option_spec = dict(JsonSchema.option_spec)
+    del option_spec['timeout']
+
+    def _run(self):
+        pattern = self._convert_filename(self.arguments[0])
+        paths = find_schemas(pattern)
+        # files added or removed later change the collection
+        inputs.note_input(self._app(), self._docname(), ('files', os.path.abspath(pattern)))
+        if not paths:
+            return [self.state_machine.reporter.warning(
+                '"%s" directive: no schemas match "%s"' % (self.name, self.arguments[0]), line=self.lineno)]
+
+        encoding = self.options.get('encoding')
+        prefetch_files(self._app(), paths, encoding, self.format())
+
+        result = []
+        for path in paths:
+            with instrument.span('file', path=path):
+                try:
+                    rendered = self._guard(lambda: self.render_file(path))
+                except DirectiveError as error:
+                    # the other files are rendered still
+                    result.append(self.state_machine.reporter.system_message(
+                        error.level, error.msg, line=self.lineno))
+                    continue
+            result.extend(self._file_section(rendered, path))
+        return result
 
-        Taken from https://stackoverflow.com/a/21912744/1927102
-        """
-        class OrderedLoader(Loader):
-            pass
+    def render_file(self, path):
+        key = file_key(path, self.options.get('encoding'), self.format(path))
+        schema = self.cached_load(key, self.from_file, path)
+        return self.render_schema(schema, self._file_source(path), '')
 
-        def construct_mapping(loader, node):
-            loader.flatten_mapping(node)
-            return object_pairs_hook(loader.construct_pairs(node))
+    def _file_section(self, result, path):
+        # schemas without a lifted title get a section named after their file
+        if any(isinstance(node, nodes.section) for node in result):
+            return result
+        name = utils.relative_path(os.path.dirname(self.state.document.current_source), path)
+        section = nodes.section()
+        section += nodes.title(name, name)
+        section['names'].append(nodes.fully_normalize_name(name))
+        self.state.document.note_implicit_target(section, section)
+        section.extend(result)
+        return [section]
 
-        OrderedLoader.add_constructor(
-            yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG,
-            construct_mapping)
 
-        text = text.replace(r'\\(', r'\\\\(')
-        text = text.replace(r'\\)', r'\\\\)')
-        try:
-            result = yaml.load(text, OrderedLoader)
-        except yaml.scanner.ScannerError:
-            # will it load as plain json?
-            result = json.loads(text, object_pairs_hook=object_pairs_hook)
-        return result
+def config_inited(app, config):
+    set_json_backend(config.jsonschema_options.get('json_backend', 'auto'))
+
+
+def report_statistics(app, exception):
+    from sphinx.util import logging
+
+    logger = logging.getLogger(__name__)
+    for name, cache in (('schema', schema_cache), ('rendering', node_cache),
+                        ('fragment', fragment_cache)):
+        logger.verbose('jsonschema %s cache: %s', name,
+                       ', '.join('%s %s' % item for item in cache.stats().items()))
 
 
 def setup(app):
     app.add_directive('jsonschema', JsonSchema)
-    app.add_config_value('jsonschema_options', {}, 'env')
+    app.add_directive('jsonschema-collection', JsonSchemaCollection)
+    # the documents using them are read again when they change, see inputs.py
+    app.add_config_value('jsonschema_options', {}, '')
+    app.add_config_value('jsonschema_layouts', {}, '')
+    app.connect('config-inited', config_inited)
+    app.connect('config-inited', instrument.configure)
+    app.connect('env-before-read-docs', prefetch)
+    app.connect('build-finished', report_statistics)
+    app.connect('env-get-outdated', lazy_format.outdated)
+    app.connect('env-purge-doc', lazy_format.purge)
+    app.connect('env-merge-info', lazy_format.merge)
+    app.connect('html-page-context', lazy_format.add_script)
+    app.connect('build-finished', lazy_format.copy_script)
+    app.connect('env-purge-doc', refindex.purge)
+    app.connect('env-merge-info', refindex.merge)
+    app.connect('env-purge-doc', labels.purge)
+    app.connect('env-merge-info', labels.merge)
+    app.connect('env-get-outdated', inputs.outdated)
+    app.connect('env-purge-doc', inputs.purge)
+    app.connect('env-merge-info', inputs.merge)
+    app.connect('env-before-read-docs', instrument.reset)
+    app.connect('env-merge-info', instrument.merge)
+    app.connect('env-updated', instrument.stop_tracing)
+    app.connect('build-finished', instrument.report)
+    app.connect('doctree-read', instrument.collect_events)
+    app.connect('build-finished', instrument.write_trace)
+    app.add_post_transform(refindex.ReferenceResolver)
     return {
         'parallel_read_safe': True,
+        'parallel_write_safe': True,
         'version': '1.19.0'
     }
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+    Schema cache
+    ------------
+
+    Parsed schema documents are kept in a process wide cache so that
+    directives referring to the same file, URL or Python object share
+    a single parse.
+
+    :copyright: Copyright 2017-2021, Leo Noordergraaf
+    :licence: GPL v3, see LICENCE for details.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+from collections import OrderedDict
+from threading import RLock
+
+
+class LRUCache(object):
+    """
+    A least recently used cache bounded both in number of entries
+    and in the (estimated) number of bytes held.
+
+    Entries are stored together with a size, usually the length of the
+    text they were parsed from. When either bound is exceeded the least
+    recently used entries are evicted.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = 0
+        self._entries = OrderedDict()
+        self._lock = RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    @property
+    def size(self):
+        return self._size
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, size = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, size=0):
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            self._evict()
+
+    def discard(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._size -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'bytes': self._size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions
+        }
+
+    def _evict(self):
+        # never evict the entry just added, even when it is oversized
+        while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self._size > self.max_bytes):
+            key, (value, size) = self._entries.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+
+
+class SchemaCache(LRUCache):
+    """
+    Cache of parsed schema documents.
+
+    The cached documents are shared by all directives and must not be
+    modified. The layout engine only reads them, transformations copy
+    what they change.
+    """
+
+    def load(self, key, loader):
+        """
+        Return the (shared) document stored under `key`.
+        On a miss `loader` is called, it must return a tuple of the
+        parsed document and the size of the text it was parsed from.
+        """
+        document = self.get(key, _MISSING)
+        if document is _MISSING:
+            document, size = loader()
+            self.put(key, document, size)
+        return document
+
+
+_MISSING = object()
+
+
+class DiskCache(object):
+    """
+    Persistent cache of parsed schemas, keyed by a hash of the text they
+    were parsed from, that survives between builds.
+
+    Several builds may share the directory at the same time: entries are
+    written to a temporary file and atomically renamed into place, and
+    entries that disappear or can't be read are treated as a miss.
+    When the total size exceeds `max_bytes` the least recently used
+    entries are removed.
+
+    The entries are stored as JSON, reading an entry never runs code
+    even when others can write to the directory. Documents that JSON
+    can't hold exactly, like YAML dates or keys that aren't strings,
+    aren't stored.
+    """
+
+    VERSION = b'2'  # bump when the serialized form changes
+    SUFFIX = '.json'
+
+    def __init__(self, directory, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+        self._lock = RLock()
+
+    def digest(self, text, *context):
+        h = hashlib.sha256(self.VERSION)
+        for item in context:
+            h.update(str(item).encode())
+            h.update(b'\0')
+        h.update(text.encode('utf-8', 'surrogatepass'))
+        return h.hexdigest()
+
+    def _path(self, digest):
+        return os.path.join(self.directory, digest[:2], digest + self.SUFFIX)
+
+    def get(self, digest, default=None):
+        path = self._path(digest)
+        try:
+            with open(path, 'rb') as file:
+                document = json.loads(file.read(), object_pairs_hook=OrderedDict)
+        except Exception:
+            # missing, removed by a concurrent build or partially written
+            self.misses += 1
+            return default
+        try:
+            # mark as recently used
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return document
+
+    def put(self, digest, document):
+        path = self._path(digest)
+        try:
+            data = json.dumps(document, separators=(',', ':')).encode('ascii')
+            if json.loads(data) != document:
+                return
+        except (TypeError, ValueError, RecursionError):
+            return
+        try:
+            previous = os.stat(path).st_size
+        except OSError:
+            previous = 0
+        try:
+            atomic_write(path, data)
+        except OSError:
+            # a read only or full disk only costs performance
+            return
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                # an entry written again replaces the previous one
+                self._size += len(data) - previous
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _entries(self):
+        for root, dirs, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(self.SUFFIX):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield stat.st_mtime, stat.st_size, path
+
+    def _scan_size(self):
+        return sum(size for mtime, size, path in self._entries())
+
+    def _evict(self):
+        # remove the oldest entries until 3/4 of the allowed size is used
+        entries = sorted(self._entries())
+        size = sum(size for mtime, size, path in entries)
+        for mtime, entry_size, path in entries:
+            if size <= self.max_bytes * 3 // 4:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            size -= entry_size
+        self._size = size
+
+
+def atomic_write(path, data):
+    """
+    Write `data` to `path` through a temporary file that is renamed into
+    place, readers never see a partially written file.
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+_disk_caches = {}
+
+
+def get_disk_cache(app):
+    """
+    Return the disk cache configured for the Sphinx application, or None.
+
+    Configured in ``jsonschema_options`` by ``disk_cache`` (True, False or
+    a directory, default stored under the doctree directory) and
+    ``disk_cache_size`` (in bytes).
+    """
+    if app is None:
+        return None
+    options = app.config.jsonschema_options
+    directory = options.get('disk_cache', True)
+    if not directory:
+        return None
+    if directory is True:
+        directory = os.path.join(app.doctreedir, 'jsonschema')
+    directory = os.path.abspath(directory)
+    if directory not in _disk_caches:
+        _disk_caches[directory] = DiskCache(directory)
+    cache = _disk_caches[directory]
+    if 'disk_cache_size' in options:
+        cache.max_bytes = options['disk_cache_size']
+    return cache
+
+
+# the keys end with the format the document is parsed in
+
+
+def file_key(path, encoding=None, format='auto'):
+    """ Cache key for a file, changes whenever the file is modified """
+    stat = os.stat(path)
+    return ('file', os.path.realpath(path), stat.st_mtime_ns, stat.st_size, encoding, format)
+
+
+def url_key(url, format='auto'):
+    return ('url', url, format)
+
+
+def data_key(reference, format='auto', path=None):
+    """ Cache key for a Python reference, changes whenever the file of its module `path` is modified """
+    key = ('data', reference, format)
+    if path is not None and os.path.exists(path):
+        stat = os.stat(path)
+        key += (stat.st_mtime_ns, stat.st_size)
+    return key
+
+
+schema_cache = SchemaCache()
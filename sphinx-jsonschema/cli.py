@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+    Command line rendering
+    ----------------------
+
+    Renders schema files with the layout engines of the directive, outside
+    of a Sphinx project, for instance to check the schemas of a repository
+    in a pre-commit hook::
+
+        python -m sphinx-jsonschema -f json -j 4 'schemas/**/*.json'
+
+    Every schema is rendered in a docutils document of its own, standing in
+    for the Sphinx build: the Sphinx cross references are shown as text and
+    there is no index of labels or references. The schemas are rendered by
+    a pool of processes. The exit status is 1 when a schema fails to load or
+    render, or with ``-W`` when it causes a warning.
+
+    :copyright: Copyright 2017-2021, Leo Noordergraaf
+    :licence: GPL v3, see LICENCE for details.
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from traceback import format_exception_only
+
+from docutils import nodes, utils
+from docutils.core import publish_doctree, publish_from_doctree
+from docutils.parsers.rst import Directive, directives, roles
+from docutils.utils import SystemMessagePropagation
+from docutils.writers.html5_polyglot import Writer
+from jsonpointer import JsonPointerException, resolve_pointer
+
+from . import remove
+from .compact_format import CompactFormat
+from .jsonpath import compile_paths
+from .loaders import find_schemas, parse, read_file, sniff_format
+from .wide_format import WideFormat
+
+LAYOUTS = {'wide': WideFormat,
+           'compact': CompactFormat}
+
+OUTPUTS = {'html': '.html', 'pseudoxml': '.txt', 'json': '.json'}
+
+# the settings of the documents the schemas are rendered in
+SETTINGS = {'report_level': 5, 'halt_level': 5, 'doctitle_xform': False,
+            'output_encoding': 'unicode', 'embed_stylesheet': False}
+
+
+class Config(object):
+
+    def __init__(self, options):
+        self.jsonschema_options = options
+        self.jsonschema_layouts = {}
+
+
+class Context(object):
+    """ Stands in for the Sphinx application the layout engines get """
+
+    def __init__(self, options):
+        self.config = Config(options)
+        self.env = None
+        self.builder = None
+
+
+class SchemaDirective(Directive):
+    """ Renders the schema the settings of the document refer to """
+
+    def run(self):
+        settings = self.state.document.settings
+        path, _, pointer = settings.jsonschema_reference.partition('#')
+        try:
+            text = read_file(path, settings.jsonschema_encoding)
+        except (IOError, UnicodeDecodeError) as error:
+            raise self.error('loading failed: %s' % error)
+        try:
+            schema = parse(text, None, format=sniff_format(text, path))
+        except Exception as error:
+            raise self.error('parsing failed: %s' % error)
+        if pointer:
+            try:
+                schema = resolve_pointer(schema, pointer)
+            except JsonPointerException:
+                raise self.error('pointer "%s" not found' % pointer)
+
+        try:
+            engine = compile_paths([(path, remove) for path in settings.jsonschema_hide])
+            if engine:
+                schema = engine.transformed(schema)
+
+            context = Context(settings.jsonschema_options)
+            layout = LAYOUTS[settings.jsonschema_layout](self.state, self.lineno, path, {}, context)
+            return layout.run(schema, '#' + pointer if pointer else '')
+        except SystemMessagePropagation as detail:
+            return [detail.args[0]]
+        except Exception as error:
+            raise self.error('rendering failed: %s' % ''.join(format_exception_only(type(error), error)).strip())
+
+
+def ref_role(name, rawtext, text, lineno, inliner, options={}, content=[]):
+    # Sphinx cross references, shown as their title or target
+    if text.endswith('>') and '<' in text:
+        text = text[:text.rindex('<')].rstrip() or text[text.rindex('<') + 1:-1]
+    return [nodes.emphasis(rawtext, utils.unescape(text))], []
+
+
+def _register():
+    directives.register_directive('jsonschema', SchemaDirective)
+    roles.register_local_role('ref', ref_role)
+
+
+def summary(document):
+    """ The number of nodes of each kind in `document` and the titles of its sections """
+    counts = Counter(node.tagname for node in document.findall(nodes.Element))
+    del counts['document']
+    return {'nodes': sum(counts.values()),
+            'tags': dict(sorted(counts.items())),
+            'titles': [section.next_node(nodes.title).astext()
+                       for section in document.findall(nodes.section)]}
+
+
+def render(reference, args):
+    """
+    Render the schema file `reference`, optionally followed by a JSON
+    pointer, as `args.format`. Returns the output and the (level, message)
+    pairs of the problems found.
+    """
+    _register()
+    settings = dict(SETTINGS, jsonschema_reference=reference, jsonschema_encoding=args.encoding,
+                    jsonschema_hide=args.hide, jsonschema_layout=args.layout,
+                    jsonschema_options=dict(args.option))
+
+    document = publish_doctree('.. jsonschema::\n', source_path=reference.partition('#')[0],
+                               settings_overrides=dict(settings, warning_stream=False))
+    messages = [(node['level'], node.children[0].astext()) for node in document.findall(nodes.system_message)]
+    if args.format == 'json':
+        output = json.dumps(dict(file=reference, **summary(document)), indent=2)
+    elif args.format == 'html':
+        writer = Writer()
+        publish_from_doctree(document, writer=writer, settings_overrides=settings)
+        output = writer.parts['body']
+    else:
+        output = publish_from_doctree(document, writer_name='pseudoxml', settings_overrides=settings)
+    return output, messages
+
+
+def expand(patterns):
+    """ The schema files the file names, directories and glob patterns refer to, in order """
+    files = []
+    for pattern in patterns:
+        path, hash, pointer = pattern.partition('#')
+        if os.path.isdir(path) or glob.has_magic(path):
+            matches = find_schemas(path)
+        else:
+            matches = [path]
+        files.extend(match + hash + pointer for match in matches if match + hash + pointer not in files)
+    return files
+
+
+def option(argument):
+    # name, name=true or name="json value"
+    name, equals, value = argument.partition('=')
+    if not equals:
+        return name, True
+    try:
+        return name, json.loads(value)
+    except ValueError:
+        return name, value
+
+
+def parser():
+    parser = argparse.ArgumentParser(
+        prog='python -m sphinx-jsonschema',
+        description='Render JSON schemas without Sphinx, to check them or to include the output elsewhere.')
+    parser.add_argument('schemas', nargs='+', metavar='SCHEMA',
+                        help='schema file, directory or glob pattern, a file may be followed by #pointer')
+    parser.add_argument('-f', '--format', choices=sorted(OUTPUTS), default='html',
+                        help='HTML fragments, the docutils node tree or JSON summaries of the nodes')
+    parser.add_argument('-l', '--layout', choices=sorted(LAYOUTS), default='wide')
+    parser.add_argument('-o', '--output', metavar='DIRECTORY',
+                        help='write the rendering of every schema to a file in DIRECTORY instead of to stdout')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='number of processes rendering schemas')
+    parser.add_argument('-O', '--option', type=option, action='append', default=[], metavar='NAME[=VALUE]',
+                        help='set an option of jsonschema_options, like lift_definitions')
+    parser.add_argument('--hide', action='append', default=[], metavar='PATH',
+                        help='hide the keys the path refers to, like :hide_key:')
+    parser.add_argument('--encoding', help='encoding of the schema files')
+    parser.add_argument('-W', dest='strict', action='store_true', help='turn warnings into errors')
+    return parser
+
+
+def _destination(output, reference, base, extension):
+    path = os.path.relpath(reference.partition('#')[0], base)
+    name = os.path.splitext(path)[0]
+    if '#' in reference:
+        name += '-' + reference.partition('#')[2].strip('/').replace('/', '-')
+    return os.path.join(output, name + extension)
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    files = expand(args.schemas)
+    if not files:
+        print('no schemas found', file=sys.stderr)
+        return 1
+
+    if args.jobs > 1 and len(files) > 1:
+        with ProcessPoolExecutor(min(args.jobs, len(files))) as executor:
+            results = list(executor.map(render, files, [args] * len(files)))
+    else:
+        results = [render(reference, args) for reference in files]
+
+    failed = False
+    base = os.path.commonpath([os.path.dirname(os.path.abspath(file.partition('#')[0])) for file in files])
+    summaries = []
+    for reference, (output, messages) in zip(files, results):
+        for level, message in messages:
+            if level >= 3 or args.strict and level == 2:
+                failed = True
+            print('%s: %s: %s' % (reference, utils.Reporter.levels[level], message),
+                  file=sys.stderr)
+
+        if args.output:
+            path = _destination(args.output, os.path.abspath(reference), base, OUTPUTS[args.format])
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as file:
+                file.write(output)
+        elif args.format == 'json':
+            summaries.append(json.loads(output))
+        else:
+            sys.stdout.write(output)
+
+    if summaries:
+        print(json.dumps(summaries, indent=2))
+    return 1 if failed else 0
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+    CompactFormat layout engine
+    ---------------------------
+
+    This layout renders a schema as nested lists instead of a table.
+    Keys with a simple value become a single list item, properties
+    become bullet items and the other nested schemas become definition
+    list items. No columns are added for nesting levels, so deep schemas
+    produce far fewer nodes and far less output than the wide table.
+
+    :copyright: Copyright 2017-2021, Leo Noordergraaf
+    :licence: GPL v3, see LICENCE for details.
+"""
+
+from docutils import nodes
+
+from .instrument import phase
+from .refindex import link
+from .wide_format import WideFormat, SchemaView, Block, PLAIN
+
+
+class CompactFormat(WideFormat):
+    """
+    Renders the rows the WideFormat traversal produces as nested lists:
+
+    - a row with a single cell becomes a paragraph,
+    - a row with a plain key and a single line value becomes a bullet
+      item reading "key: value",
+    - a block labeled with a bullet ('- name') becomes a bullet item
+      starting with the name,
+    - other blocks become definition list items, the label is the term.
+    """
+
+    def transform(self, schema):
+        schema = SchemaView.wrap(schema)
+        body, definitions = self._dispatch(schema)
+        if len(body) > 0:
+            self._identify(schema, body)
+            lists = nodes.container(classes=['jsonschema'])
+            with phase('table'):
+                lists += self._lists(body)
+        else:
+            lists = None
+        return lists, definitions
+
+    def _lists(self, rows):
+        # Turn the rows into body elements. Blocks are not processed by
+        # recursion but using a stack of [rows, node, list] frames, the
+        # list is the last bullet or definition list added to the node.
+        root = nodes.Element()
+        stack = [[iter(rows), root, None]]
+        while stack:
+            frame = stack[-1]
+            for row in frame[0]:
+                if isinstance(row, Block):
+                    item = self._item(frame, row.label)
+                    stack.append([iter(row.rows), item, None])
+                    break
+                if len(row) == 1:
+                    self._paragraph(row[0].text, frame[1])
+                    if row[0].ref is not None:
+                        link(frame[1], row[0].ref)
+                elif len(row) == 2 and PLAIN.match(row[0].text) and '\n' not in row[1].text:
+                    item = nodes.list_item()
+                    self._list(frame, nodes.bullet_list, bullet='-').append(item)
+                    self._paragraph(row[0].text + ': ' + row[1].text, item)
+                else:
+                    # the remaining cells are nested below the first
+                    item = self._item(frame, row[0])
+                    stack.append([iter([row[1:]]), item, None])
+                    break
+            else:
+                stack.pop()
+        return root.children
+
+    def _list(self, frame, cls, **attributes):
+        # the list of class cls to add the next item to
+        node, current = frame[1], frame[2]
+        if not (isinstance(current, cls) and node.children and node[-1] is current):
+            current = frame[2] = cls(**attributes)
+            node += current
+        return current
+
+    def _item(self, frame, label):
+        # add an item labeled by cell label, returns the node to add its content to
+        text = label.text
+        if text == '-' or text.startswith('- '):
+            item = nodes.list_item()
+            self._list(frame, nodes.bullet_list, bullet='-').append(item)
+            self._paragraph(text[2:], item)
+            return item
+
+        definition = nodes.definition()
+        item = nodes.definition_list_item('', self._term(text, definition), definition)
+        self._list(frame, nodes.definition_list).append(item)
+        return definition
+
+    def _term(self, text, definition):
+        if PLAIN.match(text):
+            return nodes.term(text, text)
+        textnodes, messages = self.state.inline_text(text, self.lineno)
+        definition += messages
+        return nodes.term(text, '', *textnodes)
+
+    def _paragraph(self, text, node):
+        # add the paragraphs reStructuredText parses text into
+        if PLAIN.match(text):
+            paragraph = nodes.paragraph(text, text)
+            paragraph.source, paragraph.line = self.state.document.current_source, self.lineno + 1
+            node += paragraph
+        elif text:
+            self._parse(self._convert_content(text), self.lineno, node)
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+    Schema fetching
+    ---------------
+
+    Loads schemas over HTTP(S) using a shared, pooled session.
+    Responses are stored on disk and revalidated using conditional
+    requests (ETag and Last-Modified) so unchanged schemas are not
+    downloaded again. In offline mode schemas are served from that
+    cache only.
+
+    :copyright: Copyright 2017-2021, Leo Noordergraaf
+    :licence: GPL v3, see LICENCE for details.
+"""
+
+import hashlib
+import json
+import os
+
+from threading import BoundedSemaphore, Lock
+from urllib.parse import urlsplit
+
+from .cache import atomic_write
+from .instrument import span
+
+
+class FetchError(Exception):
+    pass
+
+
+class Fetcher(object):
+    """
+    Fetch schemas over HTTP.
+
+    All requests share one `requests.Session`, and thereby its pool of
+    connections. At most `max_per_host` requests to the same host run
+    concurrently. When `cache_dir` is given responses are cached there.
+    """
+
+    def __init__(self, cache_dir=None, offline=False, max_per_host=4, pool_size=16):
+        self.cache_dir = cache_dir
+        self.offline = offline
+        self.max_per_host = max_per_host
+        self.pool_size = pool_size
+        self.downloads = 0
+        self.revalidations = 0
+        # the digest of the content last fetched per URL, see inputs.py
+        self.digests = {}
+        self._session = None
+        self._hosts = {}
+        self._lock = Lock()
+
+    @property
+    def session(self):
+        with self._lock:
+            if self._session is None:
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                adapter = HTTPAdapter(pool_connections=self.pool_size,
+                                      pool_maxsize=self.pool_size)
+                self._session = requests.Session()
+                self._session.mount('http://', adapter)
+                self._session.mount('https://', adapter)
+            return self._session
+
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = BoundedSemaphore(self.max_per_host)
+            return self._hosts[host]
+
+    def _cache_path(self, url):
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, digest[:2], digest)
+
+    def _read_cache(self, url):
+        # return (metadata, body) of the cached response or None
+        if not self.cache_dir:
+            return None
+        path = self._cache_path(url)
+        try:
+            with open(path + '.json', encoding='utf-8') as file:
+                meta = json.load(file)
+            with open(path + '.body', 'rb') as file:
+                body = file.read()
+        except (OSError, ValueError):
+            return None
+        if meta.get('url') != url or meta.get('length') != len(body):
+            # hash collision or a body written by a concurrent build
+            return None
+        return meta, body
+
+    def _write_cache(self, url, response):
+        if not self.cache_dir:
+            return
+        meta = {
+            'url': url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'length': len(response.content)
+        }
+        path = self._cache_path(url)
+        try:
+            atomic_write(path + '.body', response.content)
+            atomic_write(path + '.json', json.dumps(meta).encode('utf-8'))
+        except OSError:
+            pass
+
+    def fetch(self, url, timeout=30):
+        """ Return the content of `url` as text """
+        with span('fetch', url=url):
+            text = self._fetch(url, timeout)
+        self.digests[url] = hashlib.sha256(text.encode('utf-8', 'surrogatepass')).hexdigest()
+        return text
+
+    def _fetch(self, url, timeout):
+        cached = self._read_cache(url)
+
+        if self.offline:
+            if cached is None:
+                raise FetchError('not available in the offline cache')
+            return cached[1].decode()
+
+        try:
+            import requests
+        except ImportError:
+            raise FetchError('requests is not installed, try "pip install requests"')
+
+        headers = {}
+        if cached is not None:
+            meta = cached[0]
+            if meta.get('etag'):
+                headers['If-None-Match'] = meta['etag']
+            if meta.get('last_modified'):
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        try:
+            with self._host_slot(url):
+                response = self.session.get(url, timeout=timeout, headers=headers)
+        except requests.exceptions.RequestException as e:
+            if cached is not None:
+                # host unreachable or too slow, the cached copy is better than nothing
+                return cached[1].decode()
+            raise FetchError(type(e))
+
+        if response.status_code == 304 and cached is not None:
+            self.revalidations += 1
+            return cached[1].decode()
+
+        if response.status_code != 200:
+            # When making a connection to the url a status code will be returned
+            # Normally a OK (200) response would we be returned all other responses
+            # an error will be raised could be separated futher
+            raise FetchError(response.reason)
+
+        self.downloads += 1
+        self._write_cache(url, response)
+        # response content always binary converting with decode() no specific format defined
+        return response.content.decode()
+
+
+_fetchers = {}
+
+
+def get_fetcher(app):
+    """
+    Return the fetcher configured for the Sphinx application.
+
+    Configured in ``jsonschema_options`` by ``http_cache`` (True, False or
+    a directory, default stored under the doctree directory), ``offline``
+    and ``http_max_per_host``.
+    """
+    options = app.config.jsonschema_options if app is not None else {}
+    directory = options.get('http_cache', True)
+    if directory is True:
+        directory = os.path.join(app.doctreedir, 'jsonschema-http') if app is not None else None
+    if directory:
+        directory = os.path.abspath(directory)
+    offline = bool(options.get('offline', False))
+    max_per_host = options.get('http_max_per_host', 4)
+
+    key = (directory, offline, max_per_host)
+    if key not in _fetchers:
+        _fetchers[key] = Fetcher(directory, offline, max_per_host)
+    return _fetchers[key]
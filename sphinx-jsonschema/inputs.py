@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+    Input tracking
+    --------------
+
+    Every input a directive uses is recorded with its document, together
+    with a digest of its content: the schema file, URL or Python module,
+    the local files its ``$ref`` point to, directly or through other
+    files, and the ``jsonschema_options``
+    and ``jsonschema_layouts`` configuration. Before documents are read
+    the digests are compared to those of the current inputs, the
+    documents with an input that changed are read again, the others are
+    left alone.
+
+    Inputs are tuples of a kind and a name:
+
+    - ('file', path) for schema files and Python modules,
+    - ('url', url) for schemas loaded over HTTP(S),
+    - ('files', pattern) for the files a directory or glob pattern matches,
+    - ('config', name) for configuration values.
+
+    :copyright: Copyright 2017-2021, Leo Noordergraaf
+    :licence: GPL v3, see LICENCE for details.
+"""
+
+import hashlib
+import json
+import os
+
+from .cache import LRUCache, schema_cache, file_key, url_key
+from .fetch import get_fetcher, FetchError
+from .loaders import FORMATS, find_schemas, parse, read_file, sniff_format
+
+CONFIG = ('jsonschema_options', 'jsonschema_layouts')
+
+
+class InputIndex(object):
+    """ Maps the documents to the digests of their inputs """
+
+    def __init__(self):
+        self.documents = {}
+
+    def add(self, docname, input, digest):
+        self.documents.setdefault(docname, {})[input] = digest
+
+    def purge(self, docname):
+        self.documents.pop(docname, None)
+
+    def merge(self, other, docnames):
+        for docname in docnames:
+            if docname in other.documents:
+                self.documents[docname] = dict(other.documents[docname])
+
+    def changed(self, current, docnames):
+        """
+        The documents among `docnames` with an input that has another
+        digest now, `current` returns the digest of an input.
+        """
+        digests = {}
+        result = []
+        for docname in docnames:
+            for input, digest in self.documents.get(docname, {}).items():
+                if input not in digests:
+                    digests[input] = current(input)
+                if digests[input] != digest:
+                    result.append(docname)
+                    break
+        return result
+
+
+def get_index(env):
+    if not hasattr(env, 'jsonschema_inputs'):
+        env.jsonschema_inputs = InputIndex()
+    return env.jsonschema_inputs
+
+
+def digest(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8', 'surrogatepass')
+    return hashlib.sha256(data).hexdigest()
+
+
+# the digests of the files by (path, mtime, size)
+_file_digests = {}
+
+
+def file_digest(path):
+    """ The digest of the content of the file at `path`, None if it can't be read """
+    try:
+        stat = os.stat(path)
+        key = (path, stat.st_mtime_ns, stat.st_size)
+        if key not in _file_digests:
+            with open(path, 'rb') as file:
+                _file_digests[key] = digest(file.read())
+        return _file_digests[key]
+    except OSError:
+        return None
+
+
+def files_digest(pattern):
+    """ The digest of the names of the files `pattern` matches """
+    return digest('\n'.join(find_schemas(pattern)))
+
+
+def url_digest(app, url, fetch=True):
+    """
+    The digest of the content at `url`, None if it can't be fetched.
+    Unless `fetch` is true the digest of the content fetched last is used when known.
+    """
+    fetcher = get_fetcher(app)
+    known = fetcher.digests.get(url)
+    if known is not None and not fetch:
+        return known
+    try:
+        fetcher.fetch(url)
+    except FetchError:
+        return None
+    if known is not None and fetcher.digests[url] != known:
+        # the schema parsed earlier in this process is out of date
+        for format in FORMATS:
+            schema_cache.discard(url_key(url, format))
+    return fetcher.digests[url]
+
+
+def config_digest(app, name):
+    value = getattr(app.config, name, None)
+    # classes and functions by name, their repr changes with every run
+    return digest(json.dumps(value, sort_keys=True, default=_qualname))
+
+
+def _qualname(obj):
+    return '%s.%s' % (getattr(obj, '__module__', ''),
+                      getattr(obj, '__qualname__', type(obj).__qualname__))
+
+
+def current_digest(app, input, fetch=True):
+    kind, name = input
+    if kind == 'file':
+        return file_digest(name)
+    if kind == 'url':
+        return url_digest(app, name, fetch)
+    if kind == 'files':
+        return files_digest(name)
+    return config_digest(app, name)
+
+
+def note_input(app, docname, input):
+    """ Record `input` as used by `docname` """
+    # the URLs are fetched by the directive already
+    get_index(app.env).add(docname, input, current_digest(app, input, fetch=False))
+
+
+def ref_files(schema, directory):
+    """
+    The local files the ``$ref`` in `schema` point to, relative to
+    `directory`, and the files the ``$ref`` in those point to in turn.
+    Only files that exist are returned.
+    """
+    files = set()
+    pending = [(schema, directory)]
+    while pending:
+        schema, directory = pending.pop()
+        for path in _direct_ref_files(schema, directory):
+            if path not in files:
+                files.add(path)
+                document = _load(path)
+                if document is not None:
+                    pending.append((document, os.path.dirname(path)))
+    return sorted(files)
+
+
+# the files the $ref of a schema point to by (id of the schema, directory),
+# the entries hold on to their schema so its id isn't reused
+_ref_files = LRUCache(max_entries=1024)
+
+
+def _direct_ref_files(schema, directory):
+    key = (id(schema), directory)
+    entry = _ref_files.get(key)
+    if entry is not None and entry[0] is schema:
+        return entry[1]
+
+    locations = set()
+    stack = [schema]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            ref = node.get('$ref')
+            if isinstance(ref, str):
+                location = ref.partition('#')[0]
+                if location and '://' not in location:
+                    locations.add(location)
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            stack.extend(node)
+
+    files = set()
+    for location in locations:
+        path = os.path.normpath(os.path.join(directory, location))
+        if os.path.isfile(path):
+            files.add(path)
+    _ref_files.put(key, (schema, files))
+    return files
+
+
+def _load(path):
+    # the schema of a file reached through $ref, None when it can't be parsed
+    format = sniff_format('', path)
+
+    def load():
+        text = read_file(path)
+        return parse(text, format=format), len(text)
+
+    try:
+        return schema_cache.load(file_key(path, None, format), load)
+    except Exception:
+        return None
+
+
+def outdated(app, env, added, changed, removed):
+    """ Handler of the `env-get-outdated` event """
+    if not hasattr(env, 'jsonschema_inputs'):
+        return []
+    docnames = [docname for docname in env.jsonschema_inputs.documents
+                if docname not in changed and docname not in removed]
+    return env.jsonschema_inputs.changed(lambda input: current_digest(app, input), docnames)
+
+
+def purge(app, env, docname):
+    if hasattr(env, 'jsonschema_inputs'):
+        env.jsonschema_inputs.purge(docname)
+
+
+def merge(app, env, docnames, other):
+    if hasattr(other, 'jsonschema_inputs'):
+        get_index(env).merge(other.jsonschema_inputs, docnames)
@@ -0,0 +1,326 @@
+# -*- coding: utf-8 -*-
+"""
+    Directive instrumentation
+    -------------------------
+
+    When ``profile`` is set in ``jsonschema_options`` every directive
+    records where it spends its time: loading, parsing, transforming the
+    schema, laying it out and building the table, together with the
+    number of bytes loaded, the number of nodes made and the peak of the
+    memory allocated while it ran.
+
+    The records are kept in the build environment, so those of parallel
+    readers are merged with the others. When the build is finished the
+    slowest directives are listed and all records are written to a JSON
+    report.
+
+    Phases nest, the time of a phase excludes that of the phases started
+    within it. When the instrumentation is off a phase costs a single
+    check.
+
+    When ``trace`` is set the directives, the loaders and the layout
+    engine also emit spans to a trace-event file, to be viewed on the
+    timeline of the build in chrome://tracing or Perfetto. The spans of
+    parallel readers are collected in the build environment as well.
+
+    :copyright: Copyright 2017-2021, Leo Noordergraaf
+    :licence: GPL v3, see LICENCE for details.
+"""
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+from .cache import atomic_write
+
+PHASES = ('load', 'parse', 'transform', 'layout', 'table')
+
+REPORT = 'jsonschema-profile.json'
+
+TRACE = 'jsonschema-trace.json'
+
+# the record of the directive running, if it is instrumented
+_current = None
+
+# whether spans are traced, and the trace events of this process
+_tracing = False
+_events = []
+
+
+class Record(object):
+    """ The measurements of a single directive """
+
+    def __init__(self, docname, lineno, memory):
+        self.docname = docname
+        self.lineno = lineno
+        self.source = None
+        self.bytes = 0
+        self.nodes = 0
+        self.peak = None
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self._memory = memory
+        self._stack = []
+        self._start = self._mark = time.perf_counter()
+        if memory:
+            _reset_peak()
+            self._base = tracemalloc.get_traced_memory()[0]
+
+    def enter(self, name):
+        now = time.perf_counter()
+        if self._stack:
+            self.phases[self._stack[-1]] += now - self._mark
+        self._stack.append(name)
+        self._mark = now
+
+    def exit(self):
+        now = time.perf_counter()
+        self.phases[self._stack.pop()] += now - self._mark
+        self._mark = now
+
+    def finish(self, result):
+        self.total = time.perf_counter() - self._start
+        self.nodes = sum(1 for node in result for _ in node.findall())
+        if self._memory:
+            self.peak = tracemalloc.get_traced_memory()[1] - self._base
+
+    def as_dict(self):
+        return {'docname': self.docname, 'lineno': self.lineno, 'source': self.source,
+                'bytes': self.bytes, 'nodes': self.nodes, 'peak_memory': self.peak,
+                'total': self.total, 'phases': self.phases}
+
+
+def _reset_peak():
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    else:
+        # before Python 3.9 only restarting the tracing resets its peak
+        frames = tracemalloc.get_traceback_limit()
+        tracemalloc.stop()
+        tracemalloc.start(frames)
+
+
+class Phase(object):
+
+    __slots__ = ('name',)
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        if _current is not None:
+            _current.enter(self.name)
+
+    def __exit__(self, *exc_info):
+        if _current is not None:
+            _current.exit()
+
+
+_phases = {name: Phase(name) for name in PHASES}
+
+
+def phase(name):
+    """ Context manager attributing the time spent in it to phase `name` """
+    return _phases[name]
+
+
+def note(**values):
+    """ Add `values` to the measurements of the running directive, like bytes=100 """
+    if _current is not None:
+        for name, value in values.items():
+            setattr(_current, name, getattr(_current, name) + value)
+
+
+def note_source(source):
+    if _current is not None:
+        _current.source = source
+
+
+def enabled(options):
+    return bool(options.get('profile', False))
+
+
+def measure(env, lineno, run):
+    """ Call `run` and record its measurements with `env`, returns its result """
+    global _current
+    options = env.app.config.jsonschema_options
+    memory = options.get('profile_memory', True)
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    record = _current = Record(env.docname, lineno, memory)
+    result = []
+    try:
+        result = run()
+        return result
+    finally:
+        _current = None
+        record.finish(result)
+        get_records(env).append(record.as_dict())
+
+
+def configure(app, config):
+    """ Handler of the `config-inited` event """
+    global _tracing
+    _tracing = bool(config.jsonschema_options.get('trace', False))
+
+
+def tracing():
+    return _tracing
+
+
+def clock():
+    """ The time in microseconds, the same in all processes """
+    return time.perf_counter() * 1e6
+
+
+def complete(name, start, args):
+    """ Add the event of a span that started at `start` """
+    _events.append({'name': name, 'cat': 'jsonschema', 'ph': 'X', 'ts': start, 'dur': clock() - start,
+                    'pid': os.getpid(), 'tid': threading.get_ident(), 'args': args})
+
+
+class Span(object):
+
+    __slots__ = ('name', 'args', 'start')
+
+    def __init__(self, name, args):
+        self.name = name
+        self.args = args
+
+    def __enter__(self):
+        self.start = clock()
+
+    def __exit__(self, *exc_info):
+        complete(self.name, self.start, self.args)
+
+
+class _Untraced(object):
+
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_untraced = _Untraced()
+
+
+def span(name, **args):
+    """ Context manager tracing the time spent in it as span `name` """
+    if _tracing:
+        return Span(name, args)
+    return _untraced
+
+
+def _take_events():
+    # the events of this process, a reader process inherits those of the main process
+    global _events
+    events, _events = _events, []
+    pid = os.getpid()
+    return [event for event in events if event['pid'] == pid]
+
+
+def collect_events(app, doctree):
+    """ Handler of the `doctree-read` event, keeps the events with the environment """
+    if _tracing:
+        events = _take_events()
+        for event in events:
+            event['args'].setdefault('docname', app.env.docname)
+        get_events(app.env).extend(events)
+
+
+def get_events(env):
+    if not hasattr(env, 'jsonschema_trace'):
+        env.jsonschema_trace = []
+    return env.jsonschema_trace
+
+
+def get_records(env):
+    if not hasattr(env, 'jsonschema_profile'):
+        env.jsonschema_profile = []
+    return env.jsonschema_profile
+
+
+def reset(app, env, docnames):
+    # only the directives of the documents read in this build are reported
+    if enabled(app.config.jsonschema_options):
+        env.jsonschema_profile = []
+    if _tracing:
+        # the spans of the prefetch, before any document is read
+        env.jsonschema_trace = _take_events()
+
+
+def merge(app, env, docnames, other):
+    get_records(env).extend(record for record in getattr(other, 'jsonschema_profile', ())
+                            if record['docname'] in docnames)
+    get_events(env).extend(event for event in getattr(other, 'jsonschema_trace', ())
+                           if event['args'].get('docname') in docnames)
+
+
+def stop_tracing(app, env):
+    # the directives run while reading, tracing slows down the rest of the build
+    if enabled(app.config.jsonschema_options) and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def write_trace(app, exception):
+    """ Handler of the `build-finished` event writing the trace events """
+    path = app.config.jsonschema_options.get('trace', False)
+    if exception is not None or not path:
+        return
+    events = get_events(app.env) + _take_events()
+    main = os.getpid()
+    # name the processes and threads on the timeline
+    names = []
+    for pid in sorted({event['pid'] for event in events}):
+        names.append({'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0,
+                      'args': {'name': 'sphinx-build' if pid == main else 'reader %d' % pid}})
+    for pid, tid in sorted({(event['pid'], event['tid']) for event in events}):
+        if pid == main and tid == threading.main_thread().ident:
+            name = 'main'
+        else:
+            name = 'thread %d' % tid
+        names.append({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}})
+
+    if path is True:
+        path = os.path.join(app.doctreedir, TRACE)
+    atomic_write(os.path.abspath(path), json.dumps(
+        {'traceEvents': names + sorted(events, key=lambda event: event['ts']),
+         'displayTimeUnit': 'ms'}).encode('utf-8'))
+
+
+def report(app, exception):
+    """ Handler of the `build-finished` event """
+    from sphinx.util import logging
+
+    options = app.config.jsonschema_options
+    if exception is not None or not enabled(options):
+        return
+
+    logger = logging.getLogger(__name__)
+
+    records = sorted(getattr(app.env, 'jsonschema_profile', ()), key=lambda record: -record['total'])
+    totals = {name: sum(record['phases'][name] for record in records) for name in PHASES}
+    totals['total'] = sum(record['total'] for record in records)
+
+    top = options.get('profile_top', 10)
+    if records and top:
+        logger.info('jsonschema: %d directives in %.3fs (%s)', len(records), totals['total'],
+                    ', '.join('%s %.3fs' % (name, totals[name]) for name in PHASES))
+        for record in records[:top]:
+            logger.info('  %8.3fs  %s:%s  %s  %s, %d bytes, %d nodes%s',
+                        record['total'], record['docname'], record['lineno'], record['source'],
+                        ', '.join('%s %.3fs' % (name, record['phases'][name]) for name in PHASES),
+                        record['bytes'], record['nodes'],
+                        '' if record['peak_memory'] is None
+                        else ', peak %.1f MB' % (record['peak_memory'] / 1e6))
+
+    path = options['profile']
+    if path is True:
+        path = os.path.join(app.doctreedir, REPORT)
+    atomic_write(os.path.abspath(path), json.dumps(
+        {'directives': len(records), 'totals': totals, 'records': records}, indent=2).encode('utf-8'))
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""
+    JSON path engine
+    ----------------
+
+    Applies transformations to all keys of a document matching any of a
+    set of JSON paths in a single traversal of the document.
+
+    Paths are JSON pointers in which a ``*`` matches a single level and
+    ``**`` any number of levels. All paths are tracked simultaneously
+    while walking the document, the transformations found are applied
+    once the walk is complete, in the order of the paths. As when each
+    path is applied by itself, the paths following one that removed list
+    items are matched again, against the list positions after the removal.
+
+    :copyright: Copyright 2017-2021, Leo Noordergraaf
+    :licence: GPL v3, see LICENCE for details.
+"""
+
+import copy
+
+from threading import Lock
+
+WILDCARDS = ('*', '**')
+
+# matcher states
+BIND = 0        # match the literal path part at this level
+FAN_OUT = 1     # after a *, match the following part at this or the next level
+DEEP = 2        # after a **, match the following part at this or any deeper level
+
+
+def pairwise(seq):
+    """ Iterate over pairs in a sequence """
+    return zip(seq, seq[1:])
+
+
+def maybe_int(val):
+    """ Convert value to an int and return it or just return the value """
+    try:
+        return int(val)
+    except:
+        return val
+
+
+def json_path_validate(path):
+    """ Check that json path doesn't contain consecutive or trailing wildcards """
+    forbidden = {
+        ('**', '**'),
+        ('**', '*'),
+        ('*', '**'),
+        ('*', '*')
+    }
+
+    return set(pairwise(path)) & forbidden == set()
+
+
+def parse_path(path):
+    # Try to cast parts of the path as int if possible so that we can support
+    # paths like `/some/array/0/something` and we don't end up with TypeError
+    # trying to index into a list with a string '0'
+    parts = [maybe_int(p) for p in path.split('/')[1:]]
+
+    if not parts or not json_path_validate(parts):
+        raise ValueError('Supplied JSON path is invalid')
+    return tuple(parts)
+
+
+def _children(obj):
+    if isinstance(obj, dict):
+        return obj.items()
+    if isinstance(obj, list):
+        return enumerate(obj)
+    return ()
+
+
+def _has(obj, key):
+    if isinstance(obj, dict):
+        return key in obj
+    if isinstance(obj, list):
+        return isinstance(key, int) and -len(obj) <= key < len(obj)
+    return False
+
+
+class PathEngine(object):
+    """
+    A compiled set of (path, transformer) rules.
+
+    A transformer is called as ``transformer(container, key)`` for every
+    key matching its path.
+    """
+
+    def __init__(self, rules):
+        self.rules = [(parse_path(path), transformer) for path, transformer in rules]
+
+    def __bool__(self):
+        return bool(self.rules)
+
+    def apply(self, document):
+        """ Transform `document` in-place """
+        self._perform(document)
+
+    def transformed(self, document):
+        """
+        Return a transformed `document`, leaving `document` itself untouched.
+        Only the containers leading to transformed keys are copied, all other
+        parts are shared with `document`.
+        """
+        copies = _Copies(document)
+        self._perform(document, copies)
+        return copies.current(document)
+
+    def _match(self, document, rules):
+        # Returns the (rule, link, key) matches of `rules` in `document`, where
+        # link is the container holding key as (container, parent link, key in parent).
+        actions = []
+        states = [(rule, BIND, 0) for rule in rules]
+        # Depth first walk using an explicit stack so the depth of the
+        # document isn't limited. An entry holds the link of an object and
+        # the states of the rules at that object.
+        stack = [((document, None, None), states)]
+        while stack:
+            link, states = stack.pop()
+            children, deferred = self._step(link, states, actions)
+            if deferred:
+                # the same object again, after its children
+                stack.append((link, deferred))
+            for key, value, states in reversed(children):
+                stack.append(((value, link, key), states))
+        return actions
+
+    def _step(self, link, states, actions):
+        # Match the states at the object of link, returns the children to
+        # visit with their states and the states to process at the object
+        # once those are done.
+        obj = link[0]
+        children = {}
+        deferred = []
+
+        def descend(key, state):
+            children.setdefault(key, []).append(state)
+
+        pending = list(states)
+        while pending:
+            rule, mode, index = pending.pop(0)
+            parts = self.rules[rule][0]
+
+            if mode == BIND:
+                part = parts[index]
+                if part in WILDCARDS:
+                    pending.append((rule, DEEP if part == '**' else FAN_OUT, index + 1))
+                elif not _has(obj, part):
+                    continue
+                elif index == len(parts) - 1:
+                    actions.append((rule, link, part))
+                else:
+                    descend(part, (rule, BIND, index + 1))
+                continue
+
+            if index == len(parts):
+                # trailing wildcard, applies to all items of a list
+                if isinstance(obj, list):
+                    for key in range(len(obj)):
+                        actions.append((rule, link, key))
+                continue
+
+            matches = False
+            for key, _ in _children(obj):
+                if key == parts[index]:
+                    matches = True
+                elif mode == DEEP:
+                    descend(key, (rule, DEEP, index))
+                elif index < len(parts) - 1:
+                    # the wildcard consumes this level
+                    descend(key, (rule, BIND, index + 1))
+            if matches:
+                # match the part following the wildcard at this level,
+                # after the other keys were processed
+                deferred.append((rule, BIND, index))
+
+        if not children:
+            return (), deferred
+        return [(key, value, children[key]) for key, value in _children(obj) if key in children], deferred
+
+    def _perform(self, document, copies=None):
+        # Since transformers can mutate the original document
+        # they are applied once the whole document has been visited.
+        # With `copies` the containers are copied before they're changed.
+        # The links of the actions form a tree of the paths walked, the
+        # ids of the links of the paths that no longer lead to their
+        # object, as a parent was removed, are kept in detached. An object
+        # shared by several paths stays reachable through the others.
+        pending = list(range(len(self.rules)))
+        actions = self._match(document, pending)
+        children = None
+        detached = set()
+
+        def current(obj):
+            return obj if copies is None else copies.current(obj)
+
+        def detach(link, key, value):
+            nonlocal children
+            if children is None:
+                children = _child_links(actions)
+            candidates = [child for child in children.get(id(link), ())
+                          if child[0] is value or current(child[0]) is value]
+            candidates.sort(key=lambda child: child[2] != key)
+            stack = candidates[:1]
+            while stack:
+                child = stack.pop()
+                if id(child) not in detached:
+                    detached.add(id(child))
+                    stack.extend(children.get(id(child), ()))
+
+        while pending:
+            rule = pending.pop(0)
+            shifted = False
+            # each rule in document order
+            for _, link, key in [action for action in actions if action[0] == rule]:
+                obj = current(link[0])
+                if id(link) in detached or not _has(obj, key):
+                    # removed by an earlier transformation
+                    continue
+                if copies is not None:
+                    obj = copies.writable(link[0])
+                value = obj[key]
+                size = len(obj)
+                self.rules[rule][1](obj, key)
+                if isinstance(obj, list) and len(obj) != size:
+                    shifted = True
+                if isinstance(value, (dict, list)) and (not _has(obj, key) or obj[key] is not value):
+                    detach(link, key, value)
+            if shifted and pending:
+                # the positions the following rules matched have moved
+                actions = self._match(current(document), pending)
+                children = None
+                detached = set()
+
+
+def _child_links(actions):
+    # Map the ids of the links leading to the actions to their child links.
+    children = {}
+    seen = set()
+    for _, link, _ in actions:
+        while link[1] is not None and id(link) not in seen:
+            seen.add(id(link))
+            children.setdefault(id(link[1]), []).append(link)
+            link = link[1]
+    return children
+
+
+class _Copies(object):
+    """
+    The copies of the containers of a document changed by transformations.
+    A container shared by several parents, as YAML aliases are, is changed
+    for all of them.
+    """
+
+    def __init__(self, document):
+        self.document = document
+        # the ids of the original containers and their copies
+        self.copies = {}
+        # the ids of the original containers and their (parent, key) pairs
+        self.parents = None
+
+    def current(self, obj):
+        return self.copies.get(id(obj), obj)
+
+    def writable(self, obj):
+        """ Return the copy of `obj`, copying its parents up to the root """
+        if id(obj) in self.copies:
+            return self.copies[id(obj)]
+        if self.parents is None:
+            self.parents = _parents(self.document)
+        if id(obj) not in self.parents:
+            # not part of the original document
+            return obj
+
+        originals = []
+        pending = [obj]
+        while pending:
+            original = pending.pop()
+            if id(original) in self.copies:
+                continue
+            self.copies[id(original)] = copy.copy(original)
+            originals.append(original)
+            pending.extend(parent for parent, _ in self.parents[id(original)])
+
+        for original in originals:
+            duplicate = self.copies[id(original)]
+            for parent, key in self.parents[id(original)]:
+                parent = self.copies[id(parent)]
+                if not (_has(parent, key) and parent[key] is original):
+                    # removed, or moved by the removal of an earlier list item
+                    key = next((index for index, item in enumerate(parent) if item is original), None) \
+                        if isinstance(parent, list) else None
+                if key is not None:
+                    parent[key] = duplicate
+        return self.copies[id(obj)]
+
+
+def _parents(document):
+    # Map the ids of all containers in document to their (parent, key) pairs.
+    parents = {id(document): []}
+    stack = [document]
+    while stack:
+        obj = stack.pop()
+        for key, value in _children(obj):
+            if isinstance(value, (dict, list)):
+                if id(value) in parents:
+                    parents[id(value)].append((obj, key))
+                else:
+                    parents[id(value)] = [(obj, key)]
+                    stack.append(value)
+    return parents
+
+
+_compiled = {}
+_lock = Lock()
+
+
+def compile_paths(rules):
+    """
+    Return the PathEngine for a sequence of (path, transformer) rules,
+    compiled engines are reused.
+    """
+    key = tuple(rules)
+    with _lock:
+        engine = _compiled.get(key)
+        if engine is None:
+            engine = _compiled[key] = PathEngine(key)
+    return engine
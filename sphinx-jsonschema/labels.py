@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+    Label bookkeeping
+    -----------------
+
+    The targets of ``$$target`` and ``:auto_target:`` are registered as
+    labels of the standard domain. The same label is often defined by
+    more than one document, for instance when a schema file is rendered
+    on several pages, while the standard domain keeps a single document
+    per label. So the labels are also kept per document in the build
+    environment, and the label of the standard domain is always the one
+    of the last document in the order a full build reads them.
+
+    This keeps the labels right when a document defining them is edited
+    or removed, and when documents are read by parallel processes.
+
+    :copyright: Copyright 2017-2021, Leo Noordergraaf
+    :licence: GPL v3, see LICENCE for details.
+"""
+
+
+class LabelIndex(object):
+    """
+    Maps the labels to the (id, title) of their target in each
+    document defining them, and the documents to their labels.
+    """
+
+    def __init__(self):
+        self.labels = {}
+        self.documents = {}
+
+    def add(self, anchor, docname, anchorid, title):
+        self.labels.setdefault(anchor, {})[docname] = anchorid, title
+        self.documents.setdefault(docname, set()).add(anchor)
+
+    def purge(self, docname):
+        """ Remove the labels of `docname`, returns their anchors """
+        anchors = self.documents.pop(docname, set())
+        for anchor in anchors:
+            del self.labels[anchor][docname]
+            if not self.labels[anchor]:
+                del self.labels[anchor]
+        return anchors
+
+    def merge(self, other, docnames):
+        """ Take over the labels of `docnames`, returns their anchors """
+        anchors = set()
+        for docname in docnames:
+            for anchor in other.documents.get(docname, ()):
+                self.add(anchor, docname, *other.labels[anchor][docname])
+                anchors.add(anchor)
+        return anchors
+
+    def install(self, domaindata, anchors):
+        """ Register `anchors` with the standard domain data """
+        for anchor in anchors:
+            if anchor in self.labels:
+                docname = max(self.labels[anchor])
+                anchorid, title = self.labels[anchor][docname]
+                domaindata['anonlabels'][anchor] = docname, anchorid
+                domaindata['labels'][anchor] = docname, anchorid, title
+
+
+def get_index(env):
+    if not hasattr(env, 'jsonschema_labels'):
+        env.jsonschema_labels = LabelIndex()
+    return env.jsonschema_labels
+
+
+def note_label(env, anchor, docname, anchorid, title):
+    index = get_index(env)
+    index.add(anchor, docname, anchorid, title)
+    index.install(env.domaindata['std'], [anchor])
+
+
+def purge(app, env, docname):
+    # runs before the standard domain drops the labels of docname,
+    # the labels other documents define too are registered for those
+    if hasattr(env, 'jsonschema_labels'):
+        anchors = env.jsonschema_labels.purge(docname)
+        env.jsonschema_labels.install(env.domaindata['std'], anchors)
+
+
+def merge(app, env, docnames, other):
+    # runs after the standard domain took over the labels of docnames
+    if hasattr(other, 'jsonschema_labels'):
+        index = get_index(env)
+        index.install(env.domaindata['std'], index.merge(other.jsonschema_labels, docnames))
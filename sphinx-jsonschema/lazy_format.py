@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+"""
+    LazyFormat layout engine
+    ------------------------
+
+    For HTML output the schema is embedded in the page as JSON and
+    rendered in the browser by a small script, subtrees are built when
+    the reader expands them. No table is built while reading, which
+    makes large schemas cheap to build and light to load.
+    Other builders get the WideFormat rendering.
+
+    The choice is made while reading, so documents are read again
+    when they are built with a builder of the other kind.
+
+    :copyright: Copyright 2017-2021, Leo Noordergraaf
+    :licence: GPL v3, see LICENCE for details.
+"""
+
+import json
+import os
+
+from collections.abc import Mapping
+
+from docutils import nodes
+
+from .wide_format import WideFormat, SchemaView
+
+STATIC = os.path.join(os.path.dirname(__file__), 'static')
+SCRIPT = 'jsonschema-lazy.js'
+
+
+class LazyFormat(WideFormat):
+
+    def __init__(self, state, lineno, source, options, app):
+        super(LazyFormat, self).__init__(state, lineno, source, options, app)
+        self.html = getattr(app.builder, 'format', None) == 'html'
+        note_format(app.env, app.env.docname, 'html' if self.html else 'other')
+
+    def transform(self, schema):
+        if not self.html:
+            return super(LazyFormat, self).transform(schema)
+
+        schema = SchemaView.wrap(schema)
+        definitions = []
+        if self.options['lift_definitions']:
+            # rendered as sections of their own, at the nesting level WideFormat uses
+            self.nesting += 1
+            if '$defs' in schema:
+                definitions = self._definitions(schema, '$defs')
+            elif 'definitions' in schema:
+                definitions = self._definitions(schema, 'definitions')
+            self.nesting -= 1
+
+        if len(schema) == 0:
+            return None, definitions
+        return nodes.raw('', embed(schema), format='html'), definitions
+
+
+def embed(schema):
+    """ The HTML the script renders `schema` from """
+    data = json.dumps(schema, default=_plain, ensure_ascii=False, separators=(',', ':'))
+    # the JSON can't end the script element or start a comment
+    data = data.replace('<', '\\u003c')
+    return ('<div class="jsonschema-lazy"><script type="application/json">%s</script></div>'
+            % data)
+
+
+def _plain(value):
+    # views of the schema as dicts, other values YAML loads, like dates, as text
+    if isinstance(value, Mapping):
+        return dict(value)
+    return str(value)
+
+
+def note_format(env, docname, format):
+    """ Remember the kind of builder, 'html' or 'other', a document is rendered for """
+    if not hasattr(env, 'jsonschema_lazy'):
+        env.jsonschema_lazy = {}
+    env.jsonschema_lazy[docname] = format
+
+
+def outdated(app, env, added, changed, removed):
+    # documents rendered for the other kind of builder
+    format = 'html' if app.builder.format == 'html' else 'other'
+    return [docname for docname, rendered in getattr(env, 'jsonschema_lazy', {}).items()
+            if rendered != format and docname not in removed]
+
+
+def purge(app, env, docname):
+    getattr(env, 'jsonschema_lazy', {}).pop(docname, None)
+
+
+def merge(app, env, docnames, other):
+    for docname in docnames:
+        if docname in getattr(other, 'jsonschema_lazy', {}):
+            note_format(env, docname, other.jsonschema_lazy[docname])
+
+
+def add_script(app, pagename, templatename, context, doctree):
+    if pagename in getattr(app.env, 'jsonschema_lazy', {}):
+        app.add_js_file(SCRIPT)
+
+
+def copy_script(app, exception):
+    if exception is None and app.builder.format == 'html' and getattr(app.env, 'jsonschema_lazy', None):
+        from sphinx.util.fileutil import copy_asset_file
+
+        copy_asset_file(os.path.join(STATIC, SCRIPT), os.path.join(app.outdir, '_static'))
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+    Schema loaders
+    --------------
+
+    Reading and parsing of schemas independent of the directive, shared
+    by the directive itself and by the prefetch phase.
+
+    :copyright: Copyright 2017-2021, Leo Noordergraaf
+    :licence: GPL v3, see LICENCE for details.
+"""
+
+import glob
+import importlib
+import json
+import os
+import yaml
+
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from .cache import get_disk_cache
+from .instrument import span
+
+
+# libyaml's loader is an order of magnitude faster than the pure Python one
+SafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+FORMATS = ('auto', 'json', 'yaml')
+
+# the files searched for in directories
+EXTENSIONS = ('.json', '.yaml', '.yml')
+
+_loader_classes = {}
+
+
+def _json_loads_stdlib(text, object_pairs_hook):
+    return json.loads(text, object_pairs_hook=object_pairs_hook)
+
+
+def _json_loads_orjson(text, object_pairs_hook):
+    # orjson returns plain dicts, these preserve order too, other
+    # mappings are left to the standard library
+    if object_pairs_hook not in (OrderedDict, dict):
+        return _json_loads_stdlib(text, object_pairs_hook)
+    try:
+        return orjson.loads(text)
+    except orjson.JSONDecodeError:
+        # e.g. integers beyond 64 bit, let the standard library decide
+        return _json_loads_stdlib(text, object_pairs_hook)
+
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKENDS = {'json': _json_loads_stdlib}
+if orjson is not None:
+    JSON_BACKENDS['orjson'] = _json_loads_orjson
+
+json_loads = JSON_BACKENDS.get('orjson', _json_loads_stdlib)
+
+
+def set_json_backend(name='auto'):
+    """ Select the JSON parser by name: 'json', 'orjson' or 'auto' for the fastest available """
+    global json_loads
+    if name == 'auto':
+        name = 'orjson' if 'orjson' in JSON_BACKENDS else 'json'
+    try:
+        json_loads = JSON_BACKENDS[name]
+    except KeyError:
+        raise ValueError('JSON backend "%s" is not available, choose from %s'
+                         % (name, ', '.join(sorted(JSON_BACKENDS))))
+
+
+def _ordered_loader(Loader, object_pairs_hook):
+    # creating the loader class is expensive, do it once
+    key = (Loader, object_pairs_hook)
+    if key not in _loader_classes:
+        class OrderedLoader(Loader):
+            pass
+
+        def construct_mapping(loader, node):
+            loader.flatten_mapping(node)
+            return object_pairs_hook(loader.construct_pairs(node))
+
+        OrderedLoader.add_constructor(
+            yaml.resolver.BaseResolver.DEFAULT_MAPPING_TAG,
+            construct_mapping)
+        _loader_classes[key] = OrderedLoader
+    return _loader_classes[key]
+
+
+def sniff_format(text, filename=None):
+    """
+    Guess the format of a schema from the name of its file, or failing
+    that from its content. Returns 'json', 'yaml' or 'auto' when undecided.
+    """
+    if filename:
+        extension = os.path.splitext(filename)[1].lower()
+        if extension in ('.yaml', '.yml'):
+            return 'yaml'
+    if text.lstrip()[:1] in ('{', '['):
+        return 'json'
+    return 'auto'
+
+
+def ordered_load(text, Loader=SafeLoader, object_pairs_hook=OrderedDict, format='auto'):
+    """Allows you to use `pyyaml` to load as OrderedDict.
+
+    Taken from https://stackoverflow.com/a/21912744/1927102
+
+    With `format` 'auto' text that looks like JSON is parsed by the (much
+    faster) JSON parser first, when that fails the YAML parser is used.
+    With 'json' only the JSON parser is used, with 'yaml' the YAML parser
+    is tried first.
+    """
+    text = text.replace(r'\\(', r'\\\\(')
+    text = text.replace(r'\\)', r'\\\\)')
+
+    if format == 'json':
+        return json_loads(text, object_pairs_hook)
+    if format == 'auto' and sniff_format(text) == 'json':
+        try:
+            return json_loads(text, object_pairs_hook)
+        except ValueError:
+            # YAML in flow style looks like JSON too
+            pass
+
+    try:
+        result = yaml.load(text, _ordered_loader(Loader, object_pairs_hook))
+    except yaml.scanner.ScannerError:
+        # will it load as plain json?
+        result = json.loads(text, object_pairs_hook=object_pairs_hook)
+    return result
+
+
+def parse(text, app=None, load=ordered_load, format='auto'):
+    """
+    Parse schema text, using the persistent parse cache when the
+    Sphinx application has one configured.
+    """
+    with span('parse', format=format, size=len(text)):
+        disk_cache = get_disk_cache(app)
+        if disk_cache is None:
+            return load(text, format=format)
+
+        digest = disk_cache.digest(text, format)
+        schema = disk_cache.get(digest)
+        if schema is None:
+            schema = load(text, format=format)
+            disk_cache.put(digest, schema)
+        return schema
+
+
+def read_file(path, encoding=None):
+    with span('read', path=path), open(path, encoding=encoding) as file:
+        return file.read()
+
+
+def find_schemas(pattern):
+    """
+    The schema files in the directory `pattern`, or the files matching the
+    glob `pattern`, in sorted order.
+    """
+    if os.path.isdir(pattern):
+        return sorted(os.path.join(directory, name)
+                      for directory, _, names in os.walk(pattern)
+                      for name in names if name.endswith(EXTENSIONS))
+    return sorted(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+
+
+def split_reference(reference):
+    """ Split a Python reference 'mod.pkg.data' in module and object name """
+    parts = reference.split('.')
+    if len(parts) > 1:
+        return '.'.join(parts[:-1]), parts[-1]
+    raise ValueError(reference)
+
+
+_imported = {}
+
+
+def import_object(reference):
+    """
+    Import the object a Python reference refers to and return it with its module.
+    The reference may continue past the module, as in 'mod.pkg.Model.schema'.
+    Resolved references are remembered, until the file of their module
+    is modified: then the module is reloaded.
+    """
+    entry = _imported.pop(reference, None)
+    if entry is not None:
+        obj, mod, stamp = entry
+        if _module_stamp(mod) == stamp:
+            _imported[reference] = entry
+            return obj, mod
+        importlib.reload(mod)
+
+    module_name, obj_name = split_reference(reference)
+    attributes = [obj_name]
+    while True:
+        try:
+            mod = importlib.import_module(module_name)
+            break
+        except ImportError as error:
+            # only retry when the reference itself isn't a module
+            if error.name != module_name or '.' not in module_name:
+                raise
+            module_name, name = split_reference(module_name)
+            attributes.insert(0, name)
+
+    obj = mod
+    for name in attributes:
+        obj = getattr(obj, name)
+
+    _imported[reference] = obj, mod, _module_stamp(mod)
+    return obj, mod
+
+
+def _module_stamp(mod):
+    try:
+        stat = os.stat(mod.__file__)
+    except (AttributeError, TypeError, OSError):
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def native_schema(obj):
+    """
+    Return the schema a Python object holds as data: dicts and lists are used
+    as they are, functions and methods are called to obtain the schema.
+    Returns None for objects that must be converted to text and parsed.
+    """
+    if callable(obj) and not isinstance(obj, type):
+        obj = obj()
+    if isinstance(obj, (Mapping, list)):
+        return obj
+    return None
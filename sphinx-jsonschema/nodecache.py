@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+    Rendered node cache
+    -------------------
+
+    Identical schemas rendered with identical options produce identical
+    node trees. The trees are cached, keyed by a hash of the schema, the
+    options and the parser context, and a copy is handed out when the
+    same rendering is requested again.
+
+    Rendering also registers things with the document and the Sphinx
+    environment: section names, hyperlink reference names, labels and
+    entries in the schema reference index.
+    These are recorded with the nodes and replayed for every copy.
+    Trees with registrations that can't be replayed, like footnotes or
+    explicit targets in descriptions, or with system messages are not
+    cached.
+
+    The same applies on a smaller scale to the reStructuredText fragments
+    of a rendering, descriptions and references repeated across properties
+    and documents are parsed once and copied from the fragment cache.
+
+    :copyright: Copyright 2017-2021, Leo Noordergraaf
+    :licence: GPL v3, see LICENCE for details.
+"""
+
+import hashlib
+import json
+
+from docutils import nodes
+from docutils.parsers.rst import roles
+
+from .cache import LRUCache
+from .labels import note_label
+from .refindex import note
+
+# nodes that are registered with the document in ways that can't be replayed
+UNCACHEABLE = (nodes.system_message, nodes.problematic, nodes.pending,
+               nodes.footnote, nodes.footnote_reference,
+               nodes.citation, nodes.citation_reference,
+               nodes.substitution_definition, nodes.substitution_reference)
+
+
+class Rendering(object):
+    """ The nodes of a rendering and the side effects to replay """
+
+    __slots__ = ('nodes', 'labels', 'refs', 'source', 'lineno')
+
+    def __init__(self, nodes, labels, refs, source, lineno):
+        self.nodes = nodes
+        self.labels = labels
+        self.refs = refs
+        self.source = source
+        self.lineno = lineno
+
+
+class NodeCache(LRUCache):
+    """
+    Cache of rendered node trees.
+
+    The cached trees are private copies, `render()` returns a new copy
+    for every directive.
+    """
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        super(NodeCache, self).__init__(max_entries, max_bytes)
+
+    def render(self, key, render, document, env, lineno):
+        """
+        Return the nodes stored under `key`, or when missing the nodes
+        `render()` returns. `render` returns the nodes, the labels it
+        registered as (anchor, id, title) tuples and the entries it made
+        in the reference index as (key, id, title) tuples.
+        A `key` of None disables caching.
+        """
+        if key is not None:
+            rendering = self.get(key)
+            if rendering is not None:
+                return replay(rendering, document, env, lineno)
+
+        result, labels, refs = render()
+        if key is not None and cacheable(result, labels):
+            rendering = Rendering([node.deepcopy() for node in result], labels, refs,
+                                  document.current_source, lineno)
+            self.put(key, rendering, sum(len(node.astext()) for node in result))
+        return result
+
+
+def cacheable(result, labels):
+    """ Check whether all registrations made while rendering can be replayed """
+    target_ids = {label[1] for label in labels}
+    for root in result:
+        for node in root.findall():
+            if isinstance(node, UNCACHEABLE):
+                return False
+            if not isinstance(node, nodes.Element):
+                continue
+            if node.get('refid') or node.get('anonymous'):
+                return False
+            if node['ids'] and not isinstance(node, nodes.section) and not (
+                    isinstance(node, nodes.target) and set(node['ids']) <= target_ids):
+                return False
+    return True
+
+
+def replay(rendering, document, env, lineno):
+    """ Return a copy of the cached nodes registered with `document` """
+    result = [node.deepcopy() for node in rendering.nodes]
+    offset = lineno - rendering.lineno
+    docname = env.docname if env is not None else None
+    # the ids sections get in this document
+    section_ids = {}
+
+    for root in result:
+        for node in root.findall():
+            if node.line is not None:
+                node.line += offset
+            if node.source == rendering.source:
+                node.source = document.current_source
+            if not isinstance(node, nodes.Element):
+                continue
+            if isinstance(node, nodes.section):
+                old_ids, node['ids'] = node['ids'], []
+                document.note_implicit_target(node, node)
+                section_ids.update(zip(old_ids, node['ids']))
+            if node.get('refname'):
+                document.note_refname(node)
+            if 'refdoc' in node:
+                node['refdoc'] = docname
+
+    if env is not None:
+        for anchor, anchorid, title in rendering.labels:
+            note_label(env, anchor, docname, anchorid, title)
+        for ref, anchorid, title in rendering.refs:
+            note(env, ref, docname, section_ids.get(anchorid, anchorid), title)
+    return result
+
+
+def context(env):
+    """ The settings of the parser that influence the rendering """
+    default_role = roles._roles.get('')
+    if env is None:
+        return [repr(default_role)]
+    return [repr(default_role),
+            getattr(env.temp_data.get('default_domain'), 'name', None),
+            sorted((key, repr(value)) for key, value in env.ref_context.items())]
+
+
+def node_key(schema, options, *args):
+    """
+    The hash of a schema, the effective options and any other arguments
+    influencing the rendering. Returns None when the schema can't be hashed.
+    """
+    try:
+        text = json.dumps([schema, sorted(options.items()), args],
+                          default=repr, ensure_ascii=False)
+    except (TypeError, ValueError, RecursionError):
+        # mixed key types or nested too deep
+        return None
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def fragment_key(text, env):
+    """ The hash of a fragment of reStructuredText and the parser context """
+    text = json.dumps([text, context(env)], ensure_ascii=False)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+node_cache = NodeCache()
+fragment_cache = NodeCache(max_entries=8192, max_bytes=16 * 1024 * 1024)
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+    Schema prefetching
+    ------------------
+
+    Before Sphinx reads the documents, the sources about to be read are
+    scanned for *jsonschema* directives. All distinct schemas they refer
+    to are then loaded and parsed concurrently into the schema cache so
+    the directives themselves find them ready. The files of the
+    *jsonschema-collection* directives are included.
+
+    Errors are ignored here, the directive reports them when it loads
+    the schema itself.
+
+    :copyright: Copyright 2017-2021, Leo Noordergraaf
+    :licence: GPL v3, see LICENCE for details.
+"""
+
+import glob
+import os
+import re
+
+from concurrent.futures import ThreadPoolExecutor
+
+from .cache import schema_cache, get_disk_cache, file_key, url_key, data_key
+from .fetch import get_fetcher
+from .loaders import FORMATS, parse, read_file, sniff_format, import_object, native_schema, find_schemas
+from .loaders import ordered_load
+from .streaming import extract, streamable, STREAM_THRESHOLD
+
+DIRECTIVE = re.compile(r'^(?P<indent>[ \t]*)\.\.[ \t]+jsonschema(-collection)?::[ \t]*(?P<argument>\S+)[ \t]*$')
+OPTION = re.compile(r'^[ \t]+:(?P<name>\w+):[ \t]*(?P<value>.*?)[ \t]*$')
+# the lines starting a literal block: code directives and paragraphs ending in ::
+LITERAL = re.compile(r'^(?P<indent>[ \t]*)(?:\.\.[ \t]+(?:code-block|code|sourcecode|parsed-literal)::.*'
+                     r'|(?!\.\.[ \t])\S.*::[ \t]*)$')
+
+
+def scan(text):
+    """
+    Find the references of all *jsonschema* directives in a reStructuredText
+    source. Yields the reference, the JSON pointer following it and the
+    options of the directive. The examples in literal blocks are passed over.
+    """
+    lines = text.splitlines()
+    # the indentation of the literal block passed over
+    literal = None
+    for lineno, line in enumerate(lines):
+        if literal is not None:
+            if not line.strip() or len(line) - len(line.lstrip()) > literal:
+                continue
+            literal = None
+
+        match = LITERAL.match(line)
+        if match:
+            literal = len(match.group('indent'))
+            continue
+
+        match = DIRECTIVE.match(line)
+        if not match:
+            continue
+
+        argument = match.group('argument')
+        reference, _, pointer = argument.rpartition('#') if '#' in argument else (argument, '', '')
+        if not reference:
+            # pointer into inline content
+            continue
+
+        options = {}
+        for option in lines[lineno + 1:]:
+            match = OPTION.match(option)
+            if not match:
+                break
+            options[match.group('name')] = match.group('value')
+        yield reference, pointer, options
+
+
+def collect(app, env, docnames):
+    """
+    Return a dict of cache keys and loader functions for all schemas
+    referenced by `docnames`.
+    """
+    fetcher = get_fetcher(app)
+    loads = {}
+
+    for docname in docnames:
+        path = env.doc2path(docname)
+        try:
+            text = read_file(path, app.config.source_encoding)
+        except (IOError, UnicodeDecodeError):
+            continue
+
+        for reference, pointer, options in scan(text):
+            encoding = options.get('encoding') or None
+            format = options.get('format', 'auto')
+            if format not in FORMATS:
+                continue
+            if reference.startswith('http'):
+                try:
+                    timeout = float(options.get('timeout', 30))
+                except ValueError:
+                    continue
+                loads[url_key(reference, format)] = _loader(
+                    app, format, fetcher.fetch, reference, None if timeout < 0 else timeout)
+                continue
+
+            filename = reference
+            if not os.path.isabs(filename):
+                filename = os.path.join(os.path.dirname(path), filename)
+            if glob.has_magic(filename) or os.path.isdir(filename):
+                # the files of a collection
+                for match in find_schemas(filename):
+                    _add_file(loads, app, match, encoding, format)
+            elif os.path.exists(filename):
+                _add_file(loads, app, filename, encoding, format, pointer)
+            elif '.' in reference:
+                try:
+                    mod = import_object(reference)[1]
+                except Exception:
+                    continue
+                loads[data_key(reference, format, getattr(mod, '__file__', None))] = \
+                    _data_loader(app, format, reference)
+
+    return loads
+
+
+def _add_file(loads, app, path, encoding, format, pointer=''):
+    if format == 'auto':
+        format = sniff_format('', path)
+    key = file_key(path, encoding, format)
+    threshold = app.config.jsonschema_options.get('stream_threshold', STREAM_THRESHOLD)
+    if pointer and streamable(path, format, encoding, threshold):
+        # only the part the directive streams, under the key it looks for
+        loads[('pointer', pointer) + key] = _stream_loader(path, pointer)
+    else:
+        loads[key] = _loader(app, format, read_file, path, encoding)
+
+
+def _stream_loader(path, pointer):
+    def load():
+        return extract(path, pointer, lambda text: ordered_load(text, format='json'))
+    return load
+
+
+def _loader(app, format, read, *args):
+    def load():
+        data = read(*args)
+        return parse(data, app, format=format), len(data)
+    return load
+
+
+def _data_loader(app, format, reference):
+    def load():
+        obj = import_object(reference)[0]
+        schema = native_schema(obj)
+        if schema is not None:
+            return schema, 0
+        data = str(obj)
+        return parse(data, app, format=format), len(data)
+    return load
+
+
+def _prefetch(key, load):
+    try:
+        schema_cache.load(key, load)
+    except Exception:
+        pass
+
+
+def prefetch(app, env, docnames):
+    """ Handler of the `env-before-read-docs` event """
+    options = app.config.jsonschema_options
+    if not options.get('prefetch', True):
+        return
+
+    load(app, collect(app, env, docnames))
+
+
+def load_files(app, paths, encoding=None, format='auto'):
+    """ Load the schema files `paths` concurrently into the schema cache """
+    loads = {}
+    for path in paths:
+        _add_file(loads, app, path, encoding, format)
+    load(app, loads)
+
+
+def load(app, loads):
+    """
+    Load the schemas of `loads`, a dict of cache keys and loader functions,
+    concurrently into the schema cache.
+    """
+    loads = {key: loader for key, loader in loads.items() if key not in schema_cache}
+    if not loads:
+        return
+
+    # create the shared caches before the workers start using them
+    get_disk_cache(app)
+    with ThreadPoolExecutor(app.config.jsonschema_options.get('prefetch_workers', 8)) as executor:
+        for key, loader in loads.items():
+            executor.submit(_prefetch, key, loader)
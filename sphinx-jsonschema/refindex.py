@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+    Schema reference index
+    ----------------------
+
+    Every schema rendered with a target or a section is entered in an
+    index kept in the build environment, by the file or the id of the
+    schema and its JSON pointer. After all documents are read the
+    references (``$ref``) are resolved through the index, also when the
+    schema they refer to is rendered in another document. References
+    that aren't in the index are rendered as before.
+
+    :copyright: Copyright 2017-2021, Leo Noordergraaf
+    :licence: GPL v3, see LICENCE for details.
+"""
+
+import os
+import posixpath
+
+from urllib.parse import urldefrag, urljoin
+
+from docutils import nodes
+from docutils.transforms import Transform
+
+
+class schema_reference(nodes.Inline, nodes.Element):
+    """
+    The content of a ``$ref`` cell, replaced by a reference to the rendered
+    schema when one of its keys is in the index or by its own content otherwise.
+    """
+
+
+class RefIndex(object):
+    """
+    Maps the keys of rendered schemas to the (docname, anchor, title)
+    of their rendering. The entries are kept per document so they can be
+    purged and merged. The rendering in the last document, in the order
+    a full build reads them, wins.
+    """
+
+    def __init__(self):
+        self.targets = {}
+        self.documents = {}
+
+    def add(self, key, docname, anchor, title):
+        entries = self.targets.setdefault(key, [])
+        # the last rendering in a document wins
+        entries[:] = [entry for entry in entries if entry[0] != docname]
+        entries.append((docname, anchor, title))
+        self.documents.setdefault(docname, set()).add(key)
+
+    def resolve(self, keys):
+        """ The entry of the first of `keys` in the index, or None """
+        for key in keys:
+            entries = self.targets.get(key)
+            if entries:
+                return max(entries)
+        return None
+
+    def purge(self, docname):
+        for key in self.documents.pop(docname, ()):
+            entries = [entry for entry in self.targets[key] if entry[0] != docname]
+            if entries:
+                self.targets[key] = entries
+            else:
+                del self.targets[key]
+
+    def merge(self, other, docnames):
+        for docname in docnames:
+            for key in other.documents.get(docname, ()):
+                for entry in other.targets[key]:
+                    if entry[0] == docname:
+                        self.add(key, *entry)
+
+
+def get_index(env):
+    if not hasattr(env, 'jsonschema_refs'):
+        env.jsonschema_refs = RefIndex()
+    return env.jsonschema_refs
+
+
+def schema_base(document, source):
+    """
+    The file of a schema relative to the source directory, or its URL.
+    None outside a Sphinx build.
+    """
+    env = getattr(document.settings, 'env', None)
+    if env is None or not source:
+        return None
+    if '://' in source:
+        return source
+    path = os.path.join(os.path.dirname(document.current_source), source)
+    return os.path.relpath(os.path.normpath(path), env.srcdir).replace(os.sep, '/')
+
+
+def ref_key(base, ref):
+    """ The index key of `ref` in the schema at `base` """
+    location, _, pointer = ref.partition('#')
+    if location:
+        if '://' in location or '://' in base:
+            base = urldefrag(urljoin(base, location))[0]
+        else:
+            base = posixpath.normpath(posixpath.join(posixpath.dirname(base), location))
+    return base + '#' + pointer.rstrip('/')
+
+
+def link(node, keys):
+    """ Mark the content of the last paragraph in `node` as a reference to one of `keys` """
+    paragraphs = [child for child in node.children if isinstance(child, nodes.paragraph)]
+    if paragraphs:
+        paragraph = paragraphs[-1]
+        children, paragraph.children = paragraph.children, []
+        paragraph += schema_reference('', *children, keys=list(keys))
+
+
+def note(env, key, docname, anchor, title):
+    get_index(env).add(key, docname, anchor, title)
+
+
+def purge(app, env, docname):
+    if hasattr(env, 'jsonschema_refs'):
+        env.jsonschema_refs.purge(docname)
+
+
+def merge(app, env, docnames, other):
+    if hasattr(other, 'jsonschema_refs'):
+        get_index(env).merge(other.jsonschema_refs, docnames)
+
+
+class ReferenceResolver(Transform):
+    # a post transform, before the :ref: roles the references fall back to
+    # are resolved
+    default_priority = 5
+
+    def apply(self, **kwargs):
+        env = self.document.settings.env
+        index = get_index(env)
+        std = env.get_domain('std')
+        for node in list(self.document.findall(schema_reference)):
+            entry = index.resolve(node['keys'])
+            if entry is None:
+                if node.children:
+                    node.replace_self(node.children)
+                else:
+                    node.parent.remove(node)
+                continue
+            docname, anchor, title = entry
+            # the same reference as the :ref: role makes
+            node.replace_self(std.build_reference_node(env.docname, env.app.builder,
+                                                       docname, anchor, title, 'ref'))
@@ -0,0 +1,76 @@
+/*
+ * Renders the schemas embedded by the lazy layout of sphinx-jsonschema.
+ *
+ * Each schema is a tree of nested lists, the subtrees are only built
+ * when they are expanded.
+ *
+ * :copyright: Copyright 2017-2021, Leo Noordergraaf
+ * :licence: GPL v3, see LICENCE for details.
+ */
+(function () {
+    'use strict';
+
+    // prefix marking strings that must not be escaped, see pass_unmodified
+    var NOESC = ':noesc:';
+
+    function isTree(value) {
+        return value !== null && typeof value === 'object' && Object.keys(value).length > 0;
+    }
+
+    function show(value) {
+        if (typeof value === 'string') {
+            return value.indexOf(NOESC) === 0 ? value.slice(NOESC.length) : value;
+        }
+        return JSON.stringify(value);
+    }
+
+    function label(key, required) {
+        var node = document.createElement(required ? 'strong' : 'span');
+        node.textContent = key;
+        return node;
+    }
+
+    // the list of the members of an object or the items of an array,
+    // `required` names the members to emphasise
+    function render(value, required) {
+        var list = document.createElement('ul');
+        Object.keys(value).forEach(function (key) {
+            var child = value[key];
+            var item = document.createElement('li');
+            var name = Array.isArray(value) ? '-' : key;
+            var bold = required.indexOf(key) >= 0;
+            if (isTree(child)) {
+                var details = document.createElement('details');
+                var summary = document.createElement('summary');
+                summary.appendChild(label(name, bold));
+                details.appendChild(summary);
+                details.addEventListener('toggle', function expand() {
+                    details.removeEventListener('toggle', expand);
+                    var members = key === 'properties' && Array.isArray(value.required) ? value.required : [];
+                    details.appendChild(render(child, members));
+                });
+                item.appendChild(details);
+            } else {
+                item.appendChild(label(name, bold));
+                item.appendChild(document.createTextNode(': ' + show(child)));
+            }
+            list.appendChild(item);
+        });
+        return list;
+    }
+
+    function init() {
+        var blocks = document.querySelectorAll('div.jsonschema-lazy');
+        Array.prototype.forEach.call(blocks, function (block) {
+            var data = block.querySelector('script[type="application/json"]');
+            var schema = JSON.parse(data.textContent);
+            block.appendChild(isTree(schema) ? render(schema, []) : document.createTextNode(show(schema)));
+        });
+    }
+
+    if (document.readyState === 'loading') {
+        document.addEventListener('DOMContentLoaded', init);
+    } else {
+        init();
+    }
+})();
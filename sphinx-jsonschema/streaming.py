@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+    Streaming pointer extraction
+    ----------------------------
+
+    Extracts the value a JSON pointer refers to from a (very large) JSON
+    file without parsing the whole document. The file is memory mapped,
+    values not on the path to the pointer are skipped over by scanning
+    for brackets and strings, and only the selected subtree is parsed.
+
+    :copyright: Copyright 2017-2021, Leo Noordergraaf
+    :licence: GPL v3, see LICENCE for details.
+"""
+
+import json
+import mmap
+import os
+import re
+
+WHITESPACE = re.compile(rb'[ \t\r\n]*')
+STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+# everything up to the next bracket, strings may contain brackets
+FLAT = re.compile(rb'(?:[^\[\]{}"]+|"[^"\\]*(?:\\.[^"\\]*)*")*', re.DOTALL)
+
+
+def _nested(depth):
+    # A container with at most `depth` levels of nesting. Every alternative
+    # matches a single character or a string to prevent catastrophic
+    # backtracking when the nesting is deeper.
+    pattern = rb'[\[{](?:[^\[\]{}"]|' + STRING.pattern + rb')*[\]}]'
+    for _ in range(depth - 1):
+        pattern = rb'[\[{](?:[^\[\]{}"]|' + STRING.pattern + rb'|' + pattern + rb')*[\]}]'
+    return re.compile(pattern, re.DOTALL)
+
+
+NESTED = _nested(6)
+SCALAR = re.compile(rb'[^,\]}\s]+')
+BOM = b'\xef\xbb\xbf'
+
+
+class StreamError(ValueError):
+    """ The document is not (valid) JSON, parse it in full instead """
+
+
+def unescape(token):
+    return token.replace('~1', '/').replace('~0', '~')
+
+
+def pointer_tokens(pointer):
+    if not pointer:
+        return []
+    if not pointer.startswith('/'):
+        raise StreamError('Pointer must start with "/": %s' % pointer)
+    return [unescape(token) for token in pointer.split('/')[1:]]
+
+
+def _skip_whitespace(buffer, pos):
+    return WHITESPACE.match(buffer, pos).end()
+
+
+def _expect(buffer, pos, char):
+    if buffer[pos:pos + 1] != char:
+        raise StreamError('Expected %r at offset %d' % (char, pos))
+    return pos + 1
+
+
+def _string(buffer, pos):
+    # return the decoded string starting at pos and the position after it
+    match = STRING.match(buffer, pos)
+    if not match:
+        raise StreamError('Expected a string at offset %d' % pos)
+    raw = match.group()
+    if b'\\' in raw:
+        return json.loads(raw.decode('utf-8')), match.end()
+    return raw[1:-1].decode('utf-8'), match.end()
+
+
+def skip_value(buffer, pos):
+    """ Return the position after the JSON value starting at `pos` """
+    char = buffer[pos:pos + 1]
+    if char == b'"':
+        return _string(buffer, pos)[1]
+
+    if char not in (b'{', b'['):
+        match = SCALAR.match(buffer, pos)
+        if not match:
+            raise StreamError('Expected a value at offset %d' % pos)
+        return match.end()
+
+    # most containers are matched by the regular expression at once,
+    # deeper ones are scanned bracket by bracket
+    depth = 0
+    end = len(buffer)
+    while True:
+        pos = FLAT.match(buffer, pos).end()
+        if pos >= end:
+            raise StreamError('Unexpected end of document')
+        char = buffer[pos:pos + 1]
+        if char in (b'{', b'['):
+            match = NESTED.match(buffer, pos)
+            if match:
+                pos = match.end()
+                if depth == 0:
+                    return pos
+                continue
+            depth += 1
+            pos += 1
+        elif char in (b'}', b']'):
+            pos += 1
+            depth -= 1
+            if depth == 0:
+                return pos
+        else:
+            raise StreamError('Unterminated string at offset %d' % pos)
+
+
+def _member(buffer, pos, token):
+    # position of the value of member `token` of the object starting at pos
+    pos = _skip_whitespace(buffer, _expect(buffer, pos, b'{'))
+    if buffer[pos:pos + 1] == b'}':
+        raise KeyError(token)
+    while True:
+        key, pos = _string(buffer, pos)
+        pos = _skip_whitespace(buffer, pos)
+        pos = _skip_whitespace(buffer, _expect(buffer, pos, b':'))
+        if key == token:
+            return pos
+        pos = _skip_whitespace(buffer, skip_value(buffer, pos))
+        if buffer[pos:pos + 1] == b'}':
+            raise KeyError(token)
+        pos = _skip_whitespace(buffer, _expect(buffer, pos, b','))
+
+
+def _item(buffer, pos, token):
+    # position of item `token` of the array starting at pos
+    if not token.isdigit() or (token != '0' and token.startswith('0')):
+        raise KeyError(token)
+    index = int(token)
+    pos = _skip_whitespace(buffer, _expect(buffer, pos, b'['))
+    if buffer[pos:pos + 1] == b']':
+        raise KeyError(token)
+    while index:
+        pos = _skip_whitespace(buffer, skip_value(buffer, pos))
+        if buffer[pos:pos + 1] == b']':
+            raise KeyError(token)
+        pos = _skip_whitespace(buffer, _expect(buffer, pos, b','))
+        index -= 1
+    return pos
+
+
+def locate(buffer, pointer):
+    """
+    Return the start and end offset of the value `pointer` refers to.
+    Raises KeyError when the pointer can't be resolved and StreamError
+    when the document isn't JSON.
+    """
+    pos = len(BOM) if buffer[:len(BOM)] == BOM else 0
+    pos = _skip_whitespace(buffer, pos)
+
+    for token in pointer_tokens(pointer):
+        char = buffer[pos:pos + 1]
+        if char == b'{':
+            pos = _member(buffer, pos, token)
+        elif char == b'[':
+            pos = _item(buffer, pos, token)
+        elif char and char in b'"-0123456789tfn':
+            # a scalar has no members
+            raise KeyError(token)
+        else:
+            raise StreamError('Expected a value at offset %d' % pos)
+
+    return pos, skip_value(buffer, pos)
+
+
+# files of this size or more are streamed when a pointer selects a part of them
+STREAM_THRESHOLD = 16 * 1024 * 1024
+
+
+def streamable(path, format, encoding, threshold=STREAM_THRESHOLD):
+    """ Check whether a part of the file at `path` is worth streaming instead of parsing it all """
+    return (format != 'yaml' and
+            encoding in (None, 'utf-8', 'utf8', 'utf-8-sig') and
+            threshold is not None and 0 <= threshold <= os.path.getsize(path) and
+            is_json(path))
+
+
+def is_json(path):
+    """ Check whether a file looks like a JSON document """
+    with open(path, 'rb') as file:
+        start = file.read(64)
+    if start.startswith(BOM):
+        start = start[len(BOM):]
+    return start.lstrip()[:1] in (b'{', b'[')
+
+
+def extract(path, pointer, load):
+    """
+    Parse only the part of the JSON file at `path` that `pointer` refers to.
+    `load` parses the text of that part. Returns the value and the size
+    of its text.
+    """
+    with open(path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            start, end = locate(buffer, pointer)
+            try:
+                text = buffer[start:end].decode('utf-8')
+            except UnicodeDecodeError as error:
+                raise StreamError(error)
+    return load(text), end - start
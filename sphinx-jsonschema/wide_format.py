@@ -10,13 +10,22 @@
     :licence: GPL v3, see LICENCE for details.
 """
 
+import re
+
 from sys import version_info
+from collections.abc import MutableMapping, Sequence
 from copy import deepcopy
 from pathlib import Path
+from urllib.parse import urldefrag
 from docutils import statemachine
 from docutils import nodes
 from docutils.nodes import fully_normalize_name as normalize_name
 
+from .instrument import clock, complete, phase, span, tracing
+from .labels import note_label
+from .nodecache import fragment_cache, fragment_key
+from .refindex import schema_base, ref_key, link, note
+
 if version_info[0] == 2:
     str_unicode = unicode
 else:
@@ -24,6 +33,157 @@ else:
 
 NOESC = ':noesc:'  # prefix marker to indicate string must not be escaped.
 
+# Text that reStructuredText parses into a paragraph holding just that text:
+# a single line of letters, digits, spaces and punctuation without meaning
+# in inline markup, not looking like the start of an enumerated list.
+PLAIN = re.compile(r"(?![^\W_]+[.)](?:\s|$))[^\W_](?:[^\W_]|[ ,.;!?'()/+=#%&$-])*(?<! )\Z")
+
+
+class SchemaView(MutableMapping):
+    """
+    A view on a schema that leaves the schema itself untouched.
+    Deleting a key marks it as consumed, assigned keys are kept
+    separately. This allows a parsed schema to be rendered by
+    many directives.
+    """
+
+    __slots__ = ('schema', 'overlay', 'consumed')
+
+    def __init__(self, schema):
+        self.schema = schema
+        self.overlay = {}
+        self.consumed = set()
+
+    @classmethod
+    def wrap(cls, schema):
+        if isinstance(schema, cls):
+            return schema
+        return cls(schema)
+
+    def __getitem__(self, key):
+        if key in self.overlay:
+            return self.overlay[key]
+        if key in self.consumed:
+            raise KeyError(key)
+        return self.schema[key]
+
+    def __setitem__(self, key, value):
+        self.overlay[key] = value
+        self.consumed.discard(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.overlay.pop(key, None)
+        self.consumed.add(key)
+
+    def __contains__(self, key):
+        return key in self.overlay or (key not in self.consumed and key in self.schema)
+
+    def __iter__(self):
+        for key in self.schema:
+            if key not in self.consumed:
+                yield key
+        for key in self.overlay:
+            if key not in self.schema:
+                yield key
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+class Cell(object):
+    """ A table cell, its text is converted for the table builder by `TableRows` """
+
+    __slots__ = ('rowspan', 'colspan', 'text', 'ref')
+
+    def __init__(self, text):
+        self.rowspan = 0
+        self.colspan = 0
+        self.text = text
+        # the reference index keys of the schema a $ref cell refers to
+        self.ref = None
+
+
+class Block(object):
+    """
+    Rows labeled by a cell in the column before them, the label spans
+    all rows. Blocks nest, `WideFormat._layout()` flattens them into
+    the rows of the table.
+    """
+
+    __slots__ = ('label', 'rows', 'count')
+
+    def __init__(self, label, rows):
+        self.label = label
+        self.rows = rows
+        # the number of table rows
+        self.count = sum(row.count if isinstance(row, Block) else 1 for row in rows)
+        label.rowspan = self.count - 1
+
+
+class TableRows(Sequence):
+    """
+    The rows of a table, in the format of the table builder.
+    Each row is converted when it is read, so the (large) list of
+    lines of every cell exists only while the cell is being parsed.
+    When `deferred` the table builder gets empty cells, `fill()`
+    parses them afterwards.
+    """
+
+    __slots__ = ('rows', 'lineno', 'item', 'deferred')
+
+    def __init__(self, rows, source, lineno, deferred=False):
+        self.rows = rows
+        self.lineno = lineno
+        # all lines share the same source and line number
+        self.item = (source, lineno)
+        self.deferred = deferred
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self.rows)))]
+        return [None if cell is None else self._convert(cell) for cell in self.rows[index]]
+
+    def _convert(self, cell):
+        if self.deferred or PLAIN.match(cell.text):
+            # an empty cell isn't parsed, `fill()` adds the text
+            lines = []
+        else:
+            lines = statemachine.string2lines(cell.text)
+        # the table builder adds this offset to the line of the table
+        return (cell.rowspan, cell.colspan, 0,
+                statemachine.StringList(lines, items=[self.item] * len(lines)))
+
+    def fill(self, group, parse):
+        """
+        Add the text of the plain and deferred cells to the entries of the
+        rows in `group`, a thead or tbody node the table builder built from
+        these rows. `parse(content, offset, node)` parses the deferred cells.
+        """
+        source, lineno = self.item
+        for row, row_node in zip(self.rows, group.children):
+            entries = iter(row_node.children)
+            for cell in row:
+                if cell is None:
+                    continue
+                entry = next(entries)
+                if PLAIN.match(cell.text):
+                    # the same paragraph the parser creates
+                    paragraph = nodes.paragraph(cell.text, cell.text)
+                    paragraph.source, paragraph.line = source, lineno + 1
+                    entry += paragraph
+                elif self.deferred:
+                    lines = statemachine.string2lines(cell.text)
+                    parse(statemachine.StringList(lines, items=[self.item] * len(lines)),
+                          lineno, entry)
+                if cell.ref is not None:
+                    link(entry, cell.ref)
+
+
 class WideFormat(object):
     KV_SIMPLE = [
         'multipleOf', 'maximum', 'exclusiveMaximum', 'minimum',
@@ -59,20 +219,38 @@ class WideFormat(object):
         self.nesting = 0
         self.ref_titles = {}
         self.target_pointer = '#'
+        # the (anchor, id, title) of the labels registered with Sphinx
+        self.labels = []
+        # the reference index keys of the schema, from its file and its $id,
+        # and the (key, anchor, title) of the entries made in the index
+        self.base = schema_base(state.document, source)
+        self.schema_id = None
+        self.refs = []
 
         self.options = deepcopy(self.option_defaults)
         self.options.update(app.config.jsonschema_options)
         self.options.update(options)
 
     def run(self, schema, pointer=''):
+        with span('WideFormat.run', pointer=self.target_pointer + pointer):
+            return self._run(schema, pointer)
+
+    def _run(self, schema, pointer):
+        schema = SchemaView.wrap(schema)
         # To set the correct auto target for a nested definitions we need to save
         # the current pointer that may be used inside recursive run append on
         before = self.target_pointer
         self.target_pointer += pointer
 
+        if self.schema_id is None and isinstance(schema.get('$id', schema.get('id')), str):
+            # nested pointers are relative to the schema with the $id
+            self.schema_id = (urldefrag(schema.get('$id', schema.get('id')))[0], self.target_pointer)
+
         result = []
+        title = schema.get('title')
         target = self._target(schema, self.target_pointer)
         section = self._section(schema)
+        self._index(target or section, title)
 
         table, definitions = self.transform(schema)
 
@@ -95,20 +273,69 @@ class WideFormat(object):
         return result
 
     def transform(self, schema):
-        body, definitions = self._dispatch(schema)
+        schema = SchemaView.wrap(schema)
+        with span('dispatch'):
+            body, definitions = self._dispatch(schema)
         if len(body) > 0:
-            cols, head, body = self._cover(schema, body)
-            table = self.state.build_table((cols, head, body), self.lineno)
+            with phase('table'), span('build_table', rows=len(body)):
+                cols, head, body = self._cover(schema, body)
+                table = self.state.build_table((cols, head, body), self.lineno)
+                self._fill(table, head, body)
         else:
             table = None
         return table, definitions
 
+    def _fill(self, table, head, body):
+        # add the plain text and deferred cells, the table builder only adds parsed cells
+        if not isinstance(table, nodes.table):
+            return
+        for tgroup in table.children:
+            if isinstance(tgroup, nodes.tgroup):
+                for group in tgroup.children:
+                    if isinstance(group, nodes.thead):
+                        head.fill(group, self._parse)
+                    elif isinstance(group, nodes.tbody):
+                        body.fill(group, self._parse)
+
+    def _env(self):
+        # the Sphinx environment when fragments are cached
+        env = getattr(self.state.document.settings, 'env', None)
+        if env is not None and self.options.get('fragment_cache', True):
+            return env
+        return None
+
+    def _parse(self, content, offset, node):
+        # Parse the reStructuredText in content into node. In a Sphinx build
+        # the nodes of identical content parsed before are copied instead.
+        env = self._env()
+        key = None if env is None else fragment_key(list(content), env)
+
+        def parse():
+            container = nodes.Element()
+            self.state.nested_parse(content, offset, container)
+            return container.children, [], []
+
+        node += fragment_cache.render(key, parse, self.state.document, env, self.lineno)
+
+    def _index(self, node, title):
+        # Enter the schema rendered at the current pointer in the reference index
+        if self.base is None or node is None or not node['ids']:
+            return
+        keys = [self.base + self.target_pointer]
+        if self.schema_id is not None:
+            schema_id, pointer = self.schema_id
+            if self.target_pointer.startswith(pointer):
+                keys.append(schema_id + '#' + self.target_pointer[len(pointer):].lstrip('#'))
+        env = self.app.env
+        for key in keys:
+            entry = (key, node['ids'][0], title or key)
+            note(env, entry[0], env.docname, *entry[1:])
+            self.refs.append(entry)
+
     def _target(self, schema, pointer=''):
         # Wrap section and table in a target (anchor) node so
         # that it can be referenced from other sections.
-        labels = self.app.env.domaindata['std']['labels']
-        anonlabels = self.app.env.domaindata['std']['anonlabels']
-        docname = self.app.env.docname
+        env = self.app.env
 
         targets = []
 
@@ -136,9 +363,11 @@ class WideFormat(object):
             targetnode.line = self.lineno
 
             for target in targets:
-                anchor = normalize_name(target)
-                anonlabels[anchor] = docname, targetnode['ids'][0]
-                labels[anchor] = docname, targetnode['ids'][0], (schema['title'] if 'title' in schema else target)
+                label = (normalize_name(target), targetnode['ids'][0],
+                         schema['title'] if 'title' in schema else target)
+                if env is not None:
+                    note_label(env, label[0], env.docname, *label[1:])
+                self.labels.append(label)
 
             return targetnode
 
@@ -172,19 +401,31 @@ class WideFormat(object):
 
     def _get_description(self, schema, node):
         if 'description' in schema:
-            self.state.nested_parse(self._convert_content(schema['description']), self.lineno, node)
+            self._parse(self._convert_content(schema['description']), self.lineno, node)
             del schema['description']
 
         if '$$description' in schema:
             if isinstance(schema['$$description'], list):
                 schema['$$description'] = '\n'.join(schema['$$description'])
-            self.state.nested_parse(self._convert_content(schema['$$description']), self.lineno, node)
+            self._parse(self._convert_content(schema['$$description']), self.lineno, node)
             del schema['$$description']
 
     def _cover(self, schema, body):
         # Patch up and finish the table.
         head = []
+        self._identify(schema, body)
+
+        # all rows should be of equal length, create column spans
+        nrcols, body = self._layout(body)
 
+        # All columns have same width, to change alter the first element
+        source = self.state.document.current_source
+        # in a Sphinx build the cells are parsed using the fragment cache
+        deferred = self._env() is not None
+        return ([1] * nrcols, TableRows(head, source, self.lineno, deferred),
+                TableRows(body, source, self.lineno, deferred))
+
+    def _identify(self, schema, body):
         # Outermost id becomes schema url
         # NB: disregards interior id's
         # to support both 'id' draft 4 only and '$id' from draft 6
@@ -195,20 +436,35 @@ class WideFormat(object):
             body.insert(0, self._line(self._cell(schema['$id'])))
             del schema['$id']
 
-        # patch up if necessary, all rows should be of equal length
-        nrcols = self._square(body)
-        # assume len(head[n]) <= nrcols
-        nrcols = self._square(head, nrcols)
-
-        # create column spans and proper type casts
-        self._calc_spans(head, nrcols)
-        self._calc_spans(body, nrcols)
-
-        # All columns have same width, to change alter the first element
-        return [1] * nrcols, head, body
-
     def _dispatch(self, schema, label=None):
-        # Main driver of the recursive schema traversal.
+        # Main driver of the schema traversal.
+        # Nested schemas are not processed by recursion but by running the
+        # generator of each level on an explicit stack. A generator yields
+        # a (schema, label) pair to have it dispatched and receives the
+        # resulting (rows, definitions) in return.
+        # When traced every nested level is a span of its own.
+        stack = [self._walk(schema, label)]
+        starts = [clock()] if tracing() else None
+        result = None
+        while True:
+            try:
+                request = stack[-1].send(result)
+            except StopIteration as done:
+                stack.pop()
+                if starts:
+                    complete('_walk', starts.pop(), {'depth': len(stack)})
+                if not stack:
+                    return done.value
+                result = done.value
+            else:
+                stack.append(self._walk(*request))
+                if starts is not None:
+                    starts.append(clock())
+                result = None
+
+    def _walk(self, schema, label=None):
+        # Process a single level of the schema traversal.
+        schema = SchemaView.wrap(schema)
         rows = []
         self.nesting += 1
 
@@ -222,22 +478,22 @@ class WideFormat(object):
         if 'type' in schema:
             # select processor for type
             if 'object' in schema['type']:
-                rows = self._objecttype(schema)
+                rows = yield from self._objecttype(schema)
             elif 'array' in schema['type']:
-                rows = self._arraytype(schema)
+                rows = yield from self._arraytype(schema)
         else:
-            rows = self._objecttype(schema)
+            rows = yield from self._objecttype(schema)
             self._check_description(schema, rows)
         rows.extend(self._simpletype(schema))
 
         if '$ref' in schema:
             rows.extend(self._reference(schema))
 
-        rows.extend(self._complexstructures(schema))
+        rows.extend((yield from self._complexstructures(schema)))
 
         # definitions aren't really type equiv's but still best place for them
-        rows.extend(self._objectproperties(schema, 'definitions'))
-        rows.extend(self._objectproperties(schema, '$defs'))
+        rows.extend((yield from self._objectproperties(schema, 'definitions')))
+        rows.extend((yield from self._objectproperties(schema, '$defs')))
 
         if label is not None:
             # prepend label column if required
@@ -249,17 +505,17 @@ class WideFormat(object):
     def _objecttype(self, schema):
         # create description and type rows
         rows = self._simpletype(schema)
-        rows.extend(self._objectproperties(schema, 'properties'))
-        rows.extend(self._objectproperties(schema, 'patternProperties'))
-        rows.extend(self._bool_or_object(schema, 'additionalProperties'))
-        rows.extend(self._dependencies(schema, 'dependencies'))
+        rows.extend((yield from self._objectproperties(schema, 'properties')))
+        rows.extend((yield from self._objectproperties(schema, 'patternProperties')))
+        rows.extend((yield from self._bool_or_object(schema, 'additionalProperties')))
+        rows.extend((yield from self._dependencies(schema, 'dependencies')))
         rows.extend(self._kvpairs(schema, self.KV_OBJECT))
         return rows
 
     def _arraytype(self, schema):
         def oneline(label, item):
             if isinstance(item, dict):
-                rows.extend(self._dispatch(item, label)[0])
+                rows.extend((yield item, label)[0])
             else:
                 rows.append(self._line(label, self._cell(item)))
 
@@ -271,12 +527,12 @@ class WideFormat(object):
                 rows.append(self._line(self._cell('items')))
                 for item in schema['items']:
                     label = self._cell('-')
-                    oneline(label, item)
+                    yield from oneline(label, item)
             else:
-                oneline(self._cell('items'), schema['items'])
+                yield from oneline(self._cell('items'), schema['items'])
             del schema['items']
 
-        rows.extend(self._bool_or_object(schema, 'additionalItems'))
+        rows.extend((yield from self._bool_or_object(schema, 'additionalItems')))
         rows.extend(self._kvpairs(schema, self.KV_ARRAY))
         return rows
 
@@ -332,7 +588,7 @@ class WideFormat(object):
 
                 if isinstance(schema[key][prop], dict):
                     obj = schema[key][prop]
-                    rows.extend(self._dispatch(obj, label)[0])
+                    rows.extend((yield obj, label)[0])
                 else:
                     rows.append(self._line(label, self._cell(schema[key][prop])))
             del schema[key]
@@ -340,7 +596,8 @@ class WideFormat(object):
 
     def _definitions(self, schema, defs_key):
         target = {}
-        for name, item in schema[defs_key].items():
+        items = [(name, SchemaView.wrap(item)) for name, item in schema[defs_key].items()]
+        for name, item in items:
             # add title by the name of the object if title not defined
             if 'title' not in item:
                 item['title'] = name
@@ -357,7 +614,7 @@ class WideFormat(object):
 
 
         result = []
-        for name, item in schema[defs_key].items():
+        for name, item in items:
             new_target = '/{defs_key}/{name}'.format(
                 defs_key=defs_key, name=name
             )
@@ -374,7 +631,7 @@ class WideFormat(object):
             if k in schema:
                 items = []
                 for s in schema[k]:
-                    content = self._dispatch(s)[0]
+                    content = (yield s, None)[0]
                     if content:
                         items.extend(content)
                 if items:
@@ -384,7 +641,7 @@ class WideFormat(object):
         for k in self.SINGLEOBJECTS:
             # combinators belong at this level as alternative to type
             if k in schema:
-                rows.extend(self._dispatch(schema[k], self._cell(k))[0])
+                rows.extend((yield schema[k], self._cell(k))[0])
                 del schema[k]
 
         if self.CONDITIONAL[0] in schema:
@@ -392,7 +649,7 @@ class WideFormat(object):
             items = []
             for k in self.CONDITIONAL:
                 if k in schema:
-                    content = self._dispatch(schema[k])[0]
+                    content = (yield schema[k], None)[0]
                     if content:
                         items.append(self._prepend(self._cell(k), content))
                     del schema[k]
@@ -417,7 +674,7 @@ class WideFormat(object):
                             label,
                             self._cell(str_unicode(', '.join(obj)))))
                 else:
-                    rows.extend(self._dispatch(obj, label)[0])
+                    rows.extend((yield obj, label)[0])
             del schema[key]
         return rows
 
@@ -428,6 +685,8 @@ class WideFormat(object):
             return len(reference), reference[-1]
 
     def _reference(self, schema):
+        # references linked to a title in this schema aren't looked up in the index
+        local = False
         if self.options['auto_reference'] and self.options['lift_title']:
             # first check if references is to own schema
             # when definitions is separated automated they will be linked to the title
@@ -439,6 +698,7 @@ class WideFormat(object):
             if schema['$ref'] == '#' or schema['$ref'] == '#/':
                 if self.ref_titles.get(0, False):
                     row = (self._line(self._cell('`' + self.ref_titles[0] + '`_')))
+                    local = True
                 else:
                     row = (self._line(self._cell(schema['$ref'])))
             elif reference:
@@ -448,6 +708,7 @@ class WideFormat(object):
                         target_name in self.ref_titles[ref_length]):
                     ref_title = self.ref_titles[ref_length][target_name]
                     row = (self._line(self._cell('`' + ref_title + '`_')))
+                    local = True
                 else:
                     row = (self._line(self._cell(schema['$ref'])))
             elif schema['$ref'].startswith("#/"):
@@ -465,9 +726,19 @@ class WideFormat(object):
             row = (self._line(self._cell(':ref:`' + self.filename + schema['$ref'] + '`')))
         else:
             row = (self._line(self._cell(':ref:`' + schema['$ref'] + '`')))
+        if self.base is not None and not local and isinstance(schema['$ref'], str):
+            row[0].ref = self._ref_keys(schema['$ref'])
         del schema['$ref']
         return [row]
 
+    def _ref_keys(self, ref):
+        # the keys of the schema ref refers to, relative to the $id and to the file
+        keys = []
+        if self.schema_id is not None:
+            keys.append(ref_key(self.schema_id[0], ref))
+        keys.append(ref_key(self.base, ref))
+        return keys
+
     def _bool_or_object(self, schema, key):
         # for those attributes that accept either a boolean or a schema.
         rows = []
@@ -477,7 +748,7 @@ class WideFormat(object):
                 rows.append(self._line(self._cell(key), self._cell(schema[key])))
                 del schema[key]
             else:
-                rows.extend(self._dispatch(schema[key], self._cell(key))[0])
+                rows.extend((yield schema[key], self._cell(key))[0])
                 del schema[key]
 
         return rows
@@ -500,19 +771,10 @@ class WideFormat(object):
 
     def _prepend(self, prepend, rows):
         # prepend a label to a set of rows
-        rcnt = len(rows)
-
-        if rcnt == 0:
+        if len(rows) == 0:
             # return a row with only the label
             return [self._line(prepend)]
-        else:
-            # add the label to the first row
-            prepend[0] = rcnt - 1
-            rows[0].insert(0, prepend)
-            # following rows have an empty column prepended
-            for r in range(1, rcnt):
-                rows[r].insert(0, None)
-            return rows
+        return [Block(prepend, rows)]
 
     def _decodetype(self, typ):
         # render (array of) simple type(s)
@@ -544,76 +806,82 @@ class WideFormat(object):
 
     def _render_any_value(self, value):
         # render a single value, an array of values or a dict with key/value pairs
-        rows = []
-        if isinstance(value, list):
-            if len(value) == 0:
-                rows.append(self._line(self._cell('')))
-            else:
-                for v in value:
-                    rows.extend(self._render_any_value(v))
-        elif isinstance(value, dict):
-            if len(value) == 0:
-                rows.append(self._line(self._cell('')))
+        # nested values are rendered using a stack of [label, items, rows] frames
+        result = []
+        stack = [[None, iter([(None, value)]), result]]
+        while stack:
+            frame = stack[-1]
+            for label, value in frame[1]:
+                if isinstance(value, list) and len(value) > 0:
+                    stack.append([label, ((None, v) for v in value), []])
+                    break
+                elif isinstance(value, dict) and len(value) > 0:
+                    stack.append([label, ((self._cell(k), v) for k, v in value.items()), []])
+                    break
+
+                if isinstance(value, (list, dict)):
+                    rows = [self._line(self._cell(''))]
+                elif isinstance(value, str):
+                    rows = [self._line(self._cell(self._escape(value)))]
+                else:
+                    rows = [self._line(self._cell(value if value is not None else "null"))]
+                frame[2].extend(self._prepend(label, rows) if label is not None else rows)
             else:
-                for k in value:
-                    rows.extend(self._prepend(self._cell(k), self._render_any_value(value[k])))
-        elif isinstance(value, str):
-            rows.append(self._line(self._cell(self._escape(value) if value is not None else "null")))
-        else:
-            rows.append(self._line(self._cell(value if value is not None else "null")))
-        return rows
+                stack.pop()
+                if stack:
+                    label, rows = frame[0], frame[2]
+                    stack[-1][2].extend(self._prepend(label, rows) if label is not None else rows)
+        return result
 
-    def _square(self, rows, nrcols=0):
-        # determine max. number of columns
-        if nrcols == 0:
-            for row in rows:
-                nrcols = max(nrcols, len(row))
-
-        # extend each row to contain same number of columns
-        for row in rows:
-            if len(row) < nrcols:
-                row += [None] * (nrcols - len(row))
-
-        return nrcols
-
-    def _calc_spans(self, rows, nrcols):
-        # calculate colspan
-        for row in rows:
-            target = None
-            for c in range(nrcols):
-                if row[c] is not None:
-                    # try to extend colspan on this cell
-                    target = row[c]
-                else:
-                    if target is not None:
-                        # extend colspan
-                        target[1] += 1
-
-        # convert arrays to tuples
-        # arrays are needed to patch up colspan and rowspan
-        # the table builder requires each cell to be a tuple, not an array
-        for row in rows:
-            for c in range(nrcols):
-                if row[c] is not None:
-                    row[c] = tuple(row[c])
+    def _layout(self, rows):
+        # Flatten the blocks into table rows: a row starts with an empty
+        # column for every block it is in but doesn't start, followed by
+        # the labels of the blocks it starts. Each cell spans the empty
+        # columns after it. Returns the number of columns and the rows.
+        table = []
+        last = []
+        labels = []
+        stack = [(iter(rows), 0)]
+        while stack:
+            items, depth = stack[-1]
+            for row in items:
+                if isinstance(row, Block):
+                    labels.append(row.label)
+                    stack.append((iter(row.rows), depth + 1))
+                    break
+
+                target = None
+                for cell in row:
+                    if cell is not None:
+                        target = cell
+                    elif target is not None:
+                        target.colspan += 1
+                table.append([None] * (depth - len(labels)) + labels + row)
+                last.append(target if target is not None else labels[-1] if labels else None)
+                labels = []
+            else:
+                stack.pop()
+
+        # extend each row to contain the same number of columns
+        nrcols = max([len(row) for row in table] or [0])
+        for row, target in zip(table, last):
+            missing = nrcols - len(row)
+            if missing:
+                if target is not None:
+                    target.colspan += missing
+                row += [None] * missing
+        return nrcols, table
 
     def _line(self, *cells):
         # turn a number of cells into a list
         return [c for c in cells]
 
     def _cell(self, text):
-        # Table builder wants all cells as a tuple of 4 fields.
-        # Returns a list since it needs to be mutable (tuple isn't).
-        # Eventually, _calc_spans() will turn these lists into tuples.
-        return [
-            0,  # rowspan
-            0,  # colspan
-            self.lineno,  # source line number
-
-            # turn string into multiline array of views on lists
-            # required by table builder
-            self._convert_content(text)
-        ]
+        # Table builder wants all cells as a tuple of 4 fields:
+        # rowspan, colspan, source line number and the lines of text.
+        # Cells are mutable to patch up rowspan and colspan, TableRows
+        # converts them when the table is built.
+        return Cell(str_unicode(text))
 
     def _convert_content(self, text):
         list_lines = statemachine.string2lines(str_unicode(text))
@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import threading
+
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+
+class SchemaHandler(BaseHTTPRequestHandler):
+    """ Serves the files of the server, with conditional requests when they have an ETag """
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        etag = server.etags.get(self.path)
+        server.requests.append((self.path, self.headers.get('If-None-Match')))
+        if self.path not in server.files:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif etag is not None and self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        else:
+            body = server.files[self.path]
+            self.send_response(200)
+            if etag is not None:
+                self.send_header('ETag', etag)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class SchemaServer(ThreadingHTTPServer):
+
+    def __init__(self):
+        super(SchemaServer, self).__init__(('127.0.0.1', 0), SchemaHandler)
+        self.url = 'http://127.0.0.1:%d' % self.server_port
+        # the bodies and ETags of the files by path, and the (path, If-None-Match) requested
+        self.files = {}
+        self.etags = {}
+        self.requests = []
+
+
+@pytest.fixture
+def schema_server():
+    """ A local HTTP server, the tests set the files it serves """
+    server = SchemaServer()
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class SphinxProject(object):
+    """ The source directory of a Sphinx project using the extension """
+
+    def __init__(self, root):
+        self.root = root
+        self.source = root / 'source'
+        self.source.mkdir()
+        # the documents read by the last build
+        self.read = []
+        self.configure()
+
+    def configure(self, options=None, **config):
+        """
+        Write conf.py with `options` as the jsonschema_options, the disk
+        cache is off unless they turn it on, and the other `config` values.
+        """
+        options = dict({'disk_cache': False}, **(options or {}))
+        lines = ["extensions = ['sphinx-jsonschema']", 'jsonschema_options = %r' % options]
+        lines.extend('%s = %r' % item for item in sorted(config.items()))
+        self.write('conf.py', '\n'.join(lines) + '\n')
+
+    def write(self, name, text):
+        """ Write the file `name` in the source directory """
+        path = self.source / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+        return path
+
+    def index(self, docnames, text=''):
+        """ Write index.rst with a toctree of `docnames`, followed by `text` """
+        self.write('index.rst', 'Index\n=====\n\n.. toctree::\n\n%s\n%s'
+                   % (''.join('    %s\n' % docname for docname in docnames), text))
+
+    def build(self, builder='html', name='', status=None, warning=None, **kwargs):
+        """
+        Build the project into the directories under `name`, returns the
+        Sphinx application.
+        """
+        sphinx_application = pytest.importorskip('sphinx.application')
+        app = sphinx_application.Sphinx(str(self.source), str(self.source), str(self.root / name / 'out'),
+                                        str(self.root / name / 'doctrees'), builder,
+                                        status=status, warning=warning, **kwargs)
+        read = []
+        app.connect('source-read', lambda app, docname, content: read.append(docname))
+        app.build()
+        self.read = sorted(read)
+        return app
+
+
+@pytest.fixture
+def sphinx_project(tmp_path):
+    """ A Sphinx project in a temporary directory, the tests write its documents """
+    return SphinxProject(tmp_path)
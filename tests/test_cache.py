@@ -0,0 +1,123 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import importlib
+import json
+
+import pytest
+
+from collections import OrderedDict
+
+cache = importlib.import_module('sphinx-jsonschema.cache')
+
+
+@pytest.fixture
+def schema_cache():
+    return cache.SchemaCache(max_entries=2, max_bytes=100)
+
+
+def test_hit_and_miss(schema_cache):
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return {'type': 'string'}, 10
+
+    first = schema_cache.load(('url', 'a'), loader)
+    second = schema_cache.load(('url', 'a'), loader)
+    assert first is second
+    assert len(calls) == 1
+    assert schema_cache.stats()['hits'] == 1
+    assert schema_cache.stats()['misses'] == 1
+
+
+def test_evict_lru_entries(schema_cache):
+    schema_cache.put('a', 1, 10)
+    schema_cache.put('b', 2, 10)
+    schema_cache.get('a')
+    schema_cache.put('c', 3, 10)
+    assert 'a' in schema_cache
+    assert 'b' not in schema_cache
+    assert schema_cache.evictions == 1
+
+
+def test_evict_on_size(schema_cache):
+    schema_cache.put('a', 1, 60)
+    schema_cache.put('b', 2, 60)
+    assert 'a' not in schema_cache
+    assert schema_cache.size == 60
+
+
+def test_file_key_changes(tmp_path):
+    path = tmp_path / 'schema.json'
+    path.write_text('{}')
+    before = cache.file_key(str(path))
+    path.write_text('{"type": "object"}')
+    assert cache.file_key(str(path)) != before
+
+
+@pytest.fixture
+def disk_cache(tmp_path):
+    return cache.DiskCache(str(tmp_path / 'cache'), max_bytes=4096)
+
+
+def test_disk_round_trip(disk_cache):
+    document = {'type': 'object', 'properties': {'a': {'type': 'string'}}}
+    digest = disk_cache.digest('some text')
+    assert disk_cache.get(digest) is None
+    disk_cache.put(digest, document)
+    assert disk_cache.get(digest) == document
+    assert disk_cache.hits == 1
+
+
+def test_disk_digest_context(disk_cache):
+    assert disk_cache.digest('text') != disk_cache.digest('text', 'yaml')
+    assert disk_cache.digest('text', 'yaml') == disk_cache.digest('text', 'yaml')
+
+
+def test_disk_no_temporary_files(disk_cache, tmp_path):
+    disk_cache.put(disk_cache.digest('a'), {'a': 1})
+    files = [p.name for p in (tmp_path / 'cache').rglob('*') if p.is_file()]
+    assert len(files) == 1
+    assert files[0].endswith(cache.DiskCache.SUFFIX)
+
+
+def test_disk_corrupt_entry(disk_cache):
+    digest = disk_cache.digest('a')
+    disk_cache.put(digest, {'a': 1})
+    with open(disk_cache._path(digest), 'wb') as file:
+        file.write(b'garbage')
+    assert disk_cache.get(digest) is None
+
+
+def test_disk_evict(disk_cache):
+    for n in range(20):
+        disk_cache.put(disk_cache.digest(str(n)), {'data': 'x' * 400})
+    assert disk_cache._scan_size() <= disk_cache.max_bytes
+
+
+def test_disk_plain_data(disk_cache):
+    import datetime
+
+    digest = disk_cache.digest('a')
+    document = OrderedDict([('b', [1, 2.5, None, True]), ('a', {'c': 'd'})])
+    disk_cache.put(digest, document)
+    with open(disk_cache._path(digest), 'rb') as file:
+        assert json.loads(file.read()) == document
+    result = disk_cache.get(digest)
+    assert result == document and list(result) == ['b', 'a']
+
+    # what JSON can't hold exactly isn't stored
+    for document in ({1: 'a'}, {'date': datetime.date(2020, 1, 1)}, {'nan': float('nan')}):
+        digest = disk_cache.digest(repr(document))
+        disk_cache.put(digest, document)
+        assert disk_cache.get(digest) is None
+
+
+def test_disk_size_rewritten(disk_cache):
+    digest = disk_cache.digest('a')
+    disk_cache.put(digest, {'data': 'x' * 100})
+    size = disk_cache._size
+    for _ in range(5):
+        disk_cache.put(digest, {'data': 'x' * 100})
+    assert disk_cache._size == size == disk_cache._scan_size()
@@ -0,0 +1,104 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import importlib
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+cli = importlib.import_module('sphinx-jsonschema.cli')
+
+
+@pytest.fixture
+def schemas(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'a.json').write_text(json.dumps(
+        {'title': 'A', 'type': 'object',
+         'properties': {'b': {'$ref': '#/definitions/b'}, 'c': {'type': 'string', '$comment': 'hidden'}},
+         'definitions': {'b': {'title': 'B', 'type': 'integer'}}}))
+    (tmp_path / 'sub' / 'b.yaml').write_text('title: B\ntype: string\ndescription: A *YAML* schema\n')
+    (tmp_path / 'sub' / 'notes.txt').write_text('not a schema')
+    return tmp_path
+
+
+def test_expand(schemas):
+    assert cli.expand([str(schemas)]) == [str(schemas / 'a.json'), str(schemas / 'sub' / 'b.yaml')]
+    assert cli.expand([str(schemas / '**' / '*.yaml'), str(schemas / 'sub' / 'b.yaml'),
+                       str(schemas / 'a.json') + '#/definitions/b']) == [
+        str(schemas / 'sub' / 'b.yaml'), str(schemas / 'a.json') + '#/definitions/b']
+
+
+def test_render(schemas):
+    args = cli.parser().parse_args(['-f', 'json', '-O', 'lift_definitions', '--hide', '/**/$comment', 'x'])
+    output, messages = cli.render(str(schemas / 'a.json'), args)
+    summary = json.loads(output)
+    assert messages == []
+    assert summary['titles'] == ['A', 'B']
+    assert summary['tags']['table'] == 2
+
+    args.format = 'html'
+    output, messages = cli.render(str(schemas / 'a.json') + '#/properties/c', args)
+    assert '<table' in output and 'hidden' not in output and '<h1' not in output
+
+    args.format, args.layout = 'pseudoxml', 'compact'
+    output, messages = cli.render(str(schemas / 'sub' / 'b.yaml'), args)
+    assert '<bullet_list' in output and '<emphasis>\n' in output
+
+    output, messages = cli.render(str(schemas / 'a.json') + '#/missing', args)
+    assert messages == [(3, 'pointer "/missing" not found')]
+
+
+def test_main(schemas, tmp_path, capsys):
+    output = tmp_path / 'out'
+    assert cli.main(['-j', '2', '-o', str(output), str(schemas)]) == 0
+    assert sorted(path.relative_to(output).as_posix() for path in output.rglob('*.html')) == [
+        'a.html', 'sub/b.html']
+
+    assert cli.main(['-j', '2', '-f', 'json', str(schemas / 'a.json'), str(schemas / 'sub')]) == 0
+    summaries = json.loads(capsys.readouterr().out)
+    assert [summary['file'] for summary in summaries] == [str(schemas / 'a.json'), str(schemas / 'sub' / 'b.yaml')]
+
+    (schemas / 'bad.json').write_text('{"type": ')
+    (schemas / 'warning.json').write_text('{"description": "*emphasis"}')
+    assert cli.main(['-j', '2', '-f', 'json', str(schemas)]) == 1
+    errors = capsys.readouterr().err.splitlines()
+    assert len(errors) == 2
+    assert errors[0].startswith(str(schemas / 'bad.json') + ': ERROR: parsing failed')
+    assert errors[1].startswith(str(schemas / 'warning.json') + ': WARNING: ')
+
+    # the layout fails on a schema of the wrong shape, the other files are rendered still
+    (schemas / 'bad.json').write_text('{"type": 5}')
+    assert cli.main(['-j', '2', '-f', 'json', str(schemas)]) == 1
+    output = capsys.readouterr()
+    assert len(json.loads(output.out)) == 4
+    assert output.err.startswith(str(schemas / 'bad.json') + ': ERROR: rendering failed: TypeError')
+
+    assert cli.main(['-j', '1', str(schemas / 'warning.json')]) == 0
+    assert cli.main(['-j', '1', '-W', str(schemas / 'warning.json')]) == 1
+    assert cli.main([str(schemas / '*.xml')]) == 1
+
+
+BLOCK_SPHINX = """
+import importlib, sys
+
+class Blocker(object):
+    def find_spec(self, name, path=None, target=None):
+        if name == 'sphinx' or name.startswith('sphinx.'):
+            raise ModuleNotFoundError(name)
+
+sys.meta_path.insert(0, Blocker())
+importlib.import_module('sphinx-jsonschema.wide_format')
+sys.exit(importlib.import_module('sphinx-jsonschema.cli').main(sys.argv[1:]))
+"""
+
+
+def test_without_sphinx(schemas):
+    # Sphinx isn't a dependency, only the extension itself needs it
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-c', BLOCK_SPHINX, '-f', 'json', str(schemas / 'a.json')],
+                            cwd=root, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout)[0]['titles'] == ['A']
@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import io
+import json
+
+import pytest
+
+nodes = pytest.importorskip('docutils.nodes')
+
+
+def test_collection(sphinx_project):
+    project = sphinx_project
+    project.write('schemas/b.json', json.dumps({'title': 'B', 'type': 'string'}))
+    project.write('schemas/a.json', json.dumps({'type': 'integer'}))
+    project.write('schemas/sub/c.yaml', 'title: C\ntype: boolean\n')
+    project.write('schemas/sub/bad.json', '{"type": ')
+    project.index(['all', 'json'])
+    project.write('all.rst', 'All\n===\n\n.. jsonschema-collection:: schemas\n')
+    project.write('json.rst', 'JSON\n====\n\n.. jsonschema-collection:: schemas/**/*.json\n'
+                              '    :lift_title: false\n')
+
+    warnings = io.StringIO()
+
+    def build():
+        app = project.build(warning=warnings)
+        return app, project.read
+
+    def titles(app, docname):
+        doctree = app.env.get_doctree(docname)
+        return [section.next_node(nodes.title).astext() for section in doctree.findall(nodes.section)][1:]
+
+    app, read = build()
+    assert read == ['all', 'index', 'json']
+    assert titles(app, 'all') == ['schemas/a.json', 'B', 'schemas/sub/bad.json', 'C']
+    assert titles(app, 'json') == ['schemas/a.json', 'schemas/b.json', 'schemas/sub/bad.json']
+    # the file that fails to parse is reported, the others are rendered
+    assert len(list(app.env.get_doctree('json').findall(nodes.table))) == 2
+    assert len([line for line in warnings.getvalue().splitlines() if 'error while parsing' in line]) == 2
+    assert 'schemas/sub/c.yaml' in app.env.dependencies['all']
+
+    assert build()[1] == []
+
+    # a file matched changes
+    project.write('schemas/sub/c.yaml', 'title: D\ntype: boolean\n')
+    app, read = build()
+    assert read == ['all']
+    assert titles(app, 'all') == ['schemas/a.json', 'B', 'schemas/sub/bad.json', 'D']
+
+    # a file is added
+    project.write('schemas/e.yml', 'title: E\n')
+    assert build()[1] == ['all']
+
+    project.write('schemas/sub/bad.json', '{"title": "Fixed"}')
+    app, read = build()
+    assert read == ['all', 'json']
+    assert titles(app, 'all') == ['schemas/a.json', 'B', 'E', 'Fixed', 'D']
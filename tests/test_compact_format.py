@@ -0,0 +1,90 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import importlib
+import io
+import json
+
+from unittest.mock import Mock
+
+compact_format = importlib.import_module('sphinx-jsonschema.compact_format')
+wide_format = importlib.import_module('sphinx-jsonschema.wide_format')
+
+SCHEMA = {
+    'title': 'Person',
+    'description': 'A *person*.',
+    'type': 'object',
+    'required': ['name'],
+    'properties': {
+        'name': {'type': 'string', 'minLength': 1},
+        'tags': {'type': 'array', 'items': {'type': 'string'}},
+        'kind': {'anyOf': [{'type': 'integer'}, {'type': 'null'}]}
+    }
+}
+
+
+def _publish(layout, schema):
+    from docutils.core import publish_doctree
+    from docutils.parsers.rst import Directive, directives
+
+    class TestDirective(Directive):
+        def run(self):
+            app = Mock()
+            app.config.jsonschema_options = {}
+            app.env.domaindata = {'std': {'labels': {}, 'anonlabels': {}}}
+            return layout(self.state, self.lineno, 'x.json', {}, app).run(schema)
+
+    directives.register_directive('layouttest', TestDirective)
+    return publish_doctree('Text\n\n.. layouttest::\n', source_path='doc.rst')
+
+
+def test_lists():
+    document = _publish(compact_format.CompactFormat, SCHEMA)
+    assert not list(document.findall(lambda node: node.tagname == 'table'))
+    container = next(iter(document.findall(lambda node: node.tagname == 'container')))
+    assert container['classes'] == ['jsonschema']
+    description, types, properties, items = container.children
+    assert description.astext() == 'A person.'
+    assert types.astext() == 'type: object'
+    assert properties.astext() == 'properties'
+
+    name, tags, kind = items.children
+    # the required property is bold, its keys are items of a nested list
+    assert name[0][0].tagname == 'strong'
+    assert [item.astext() for item in name[1]] == ['type: string', 'minLength: 1']
+    assert [item.astext() for item in tags[1]] == ['type: array']
+    term, definition = tags[2][0]
+    assert (term.astext(), definition.astext()) == ('items', 'type: string')
+    term, definition = kind[1][0]
+    assert term.astext() == 'anyOf'
+    assert [item.astext() for item in definition[0]] == ['type: integer', 'type: null']
+
+
+def test_fewer_nodes():
+    def properties(depth):
+        return {'p%d' % n: {'type': 'object', 'description': 'Nested *object*',
+                            'properties': properties(depth - 1)} if depth and n == 0 else
+                {'type': 'string', 'minLength': n} for n in range(4)}
+
+    schema = {'type': 'object', 'properties': properties(6)}
+    compact = sum(1 for _ in _publish(compact_format.CompactFormat, schema).findall())
+    wide = sum(1 for _ in _publish(wide_format.WideFormat, schema).findall())
+    assert compact < wide * 0.8
+
+
+def test_registry(sphinx_project):
+    sphinx_project.configure({'layout': 'custom'},
+                             jsonschema_layouts={'custom': 'sphinx-jsonschema.compact_format.CompactFormat'})
+    schema = json.dumps({'type': 'string'})
+    sphinx_project.write(
+        'index.rst',
+        'Index\n=====\n\n'
+        '.. jsonschema::\n\n    %s\n\n'
+        '.. jsonschema::\n    :layout: wide\n\n    %s\n\n'
+        '.. jsonschema::\n    :layout: unknown\n\n    %s\n' % (schema, schema, schema))
+
+    warnings = io.StringIO()
+    app = sphinx_project.build('pseudoxml', warning=warnings, freshenv=True)
+    doctree = app.env.get_doctree('index')
+    assert [node.tagname for node in doctree[0].children[1:]] == ['container', 'table']
+    assert 'unknown layout "unknown", choose from: compact, custom, lazy, wide' in warnings.getvalue()
@@ -0,0 +1,75 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import importlib
+import sys
+
+import pytest
+import requests
+
+fetch = importlib.import_module('sphinx-jsonschema.fetch')
+
+SCHEMA = b'{"title": "Remote", "type": "string"}'
+ETAG = '"v1"'
+
+
+@pytest.fixture
+def server(schema_server):
+    schema_server.files['/schema.json'] = SCHEMA
+    schema_server.etags['/schema.json'] = ETAG
+    return schema_server
+
+
+def test_fetch(server):
+    fetcher = fetch.Fetcher()
+    assert fetcher.fetch(server.url + '/schema.json') == SCHEMA.decode()
+    assert fetcher.downloads == 1
+
+
+def test_fetch_not_found(server):
+    fetcher = fetch.Fetcher()
+    with pytest.raises(fetch.FetchError):
+        fetcher.fetch(server.url + '/missing.json')
+
+
+def test_fetch_without_requests(server, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'requests', None)
+    fetcher = fetch.Fetcher()
+    with pytest.raises(fetch.FetchError, match='pip install requests'):
+        fetcher.fetch(server.url + '/schema.json')
+
+
+def test_conditional_request(server, tmp_path):
+    fetcher = fetch.Fetcher(str(tmp_path))
+    url = server.url + '/schema.json'
+    assert fetcher.fetch(url) == SCHEMA.decode()
+    # a new fetcher revalidates the response cached on disk
+    fetcher = fetch.Fetcher(str(tmp_path))
+    assert fetcher.fetch(url) == SCHEMA.decode()
+    assert fetcher.revalidations == 1
+    assert fetcher.downloads == 0
+    assert server.requests[-1] == ('/schema.json', ETAG)
+
+
+def test_offline(server, tmp_path):
+    url = server.url + '/schema.json'
+    fetch.Fetcher(str(tmp_path)).fetch(url)
+    count = len(server.requests)
+
+    fetcher = fetch.Fetcher(str(tmp_path), offline=True)
+    assert fetcher.fetch(url) == SCHEMA.decode()
+    assert len(server.requests) == count
+    with pytest.raises(fetch.FetchError):
+        fetcher.fetch(server.url + '/other.json')
+
+
+def test_unreachable_host_uses_cache(server, tmp_path):
+    url = server.url + '/schema.json'
+    fetch.Fetcher(str(tmp_path)).fetch(url)
+    fetcher = fetch.Fetcher(str(tmp_path))
+
+    def timeout(*args, **kwargs):
+        raise requests.exceptions.ConnectTimeout()
+
+    fetcher.session.get = timeout
+    assert fetcher.fetch(url) == SCHEMA.decode()
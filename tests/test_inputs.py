@@ -0,0 +1,106 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import importlib
+import json
+
+inputs = importlib.import_module('sphinx-jsonschema.inputs')
+
+
+def test_ref_files(tmp_path):
+    (tmp_path / 'a.json').write_text('{}')
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'sub' / 'b.json').write_text('{}')
+    schema = {'properties': {
+        'a': {'$ref': 'a.json#/definitions/x'},
+        'b': {'items': [{'$ref': 'sub/b.json'}, {'$ref': './a.json'}]},
+        'local': {'$ref': '#/definitions/y'},
+        'missing': {'$ref': 'missing.json'},
+        'remote': {'$ref': 'http://example.com/c.json'},
+        '$ref': 'not a reference'}}
+    assert inputs.ref_files(schema, str(tmp_path)) == [
+        str(tmp_path / 'a.json'), str(tmp_path / 'sub' / 'b.json')]
+
+
+def test_ref_files_transitive(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    (tmp_path / 'a.json').write_text('{"items": {"$ref": "sub/b.yaml#/x"}}')
+    (tmp_path / 'sub' / 'b.yaml').write_text('x:\n  $ref: c.json\n')
+    # back to the first, the cycle ends there
+    (tmp_path / 'sub' / 'c.json').write_text('{"$ref": "../a.json"}')
+    (tmp_path / 'd.json').write_text('not a schema')
+    schema = {'properties': {'a': {'$ref': 'a.json'}, 'd': {'$ref': 'd.json'}}}
+    expected = [str(tmp_path / name) for name in ('a.json', 'd.json', 'sub/b.yaml', 'sub/c.json')]
+    assert inputs.ref_files(schema, str(tmp_path)) == expected
+
+    # the schemas are walked once
+    hits = inputs._ref_files.hits
+    assert inputs.ref_files(schema, str(tmp_path)) == expected
+    assert inputs._ref_files.hits == hits + 5
+
+
+def test_changed():
+    index = inputs.InputIndex()
+    index.add('a', ('file', 'x'), '1')
+    index.add('a', ('config', 'y'), '2')
+    index.add('b', ('config', 'y'), '2')
+    index.add('c', ('file', 'z'), '3')
+    calls = []
+
+    def current(input):
+        calls.append(input)
+        return {('file', 'x'): '1', ('config', 'y'): '4', ('file', 'z'): '3'}[input]
+
+    assert index.changed(current, ['a', 'b', 'c']) == ['a', 'b']
+    # every input is looked at once
+    assert sorted(calls) == [('config', 'y'), ('file', 'x'), ('file', 'z')]
+
+
+def test_outdated(sphinx_project, schema_server):
+    project = sphinx_project
+    project.write('schemas/a.json', json.dumps(
+        {'title': 'A', 'properties': {'b': {'$ref': 'b.json#/definitions/x'}}}))
+    project.write('schemas/b.json', json.dumps(
+        {'definitions': {'x': {'type': 'string'}, 'y': {'$ref': 'c.json'}}}))
+    project.write('schemas/c.json', json.dumps({'type': 'string'}))
+    schema_server.files['/remote.json'] = b'{"title": "Remote", "type": "string"}'
+
+    def configure(options):
+        options.update({'http_cache': str(project.root / 'http')})
+        project.configure(options)
+
+    configure({})
+    project.index(['a', 'b', 'c', 'url'])
+    project.write('a.rst', 'A\n=\n\n.. jsonschema:: schemas/a.json\n')
+    project.write('b.rst', 'B\n=\n\n.. jsonschema::\n\n    {"$ref": "schemas/b.json"}\n')
+    project.write('c.rst', 'C\n=\n\nNo schema.\n')
+    project.write('url.rst', 'URL\n===\n\n.. jsonschema:: %s/remote.json\n' % schema_server.url)
+
+    def build():
+        project.build()
+        return project.read
+
+    assert build() == ['a', 'b', 'c', 'index', 'url']
+    assert build() == []
+
+    # a file reached through $ref
+    project.write('schemas/b.json', json.dumps({'definitions': {'x': {'type': 'integer'}}}))
+    assert build() == ['a', 'b']
+
+    # the same content
+    project.write('schemas/b.json', json.dumps({'definitions': {'x': {'type': 'integer'}}}))
+    assert build() == []
+
+    # a file reached through the $ref of a file reached through $ref
+    project.write('schemas/b.json', json.dumps(
+        {'definitions': {'x': {'type': 'integer'}, 'y': {'$ref': 'c.json'}}}))
+    assert build() == ['a', 'b']
+    project.write('schemas/c.json', json.dumps({'type': 'integer'}))
+    assert build() == ['a', 'b']
+
+    schema_server.files['/remote.json'] = b'{"title": "Remote", "type": "integer"}'
+    assert build() == ['url']
+
+    # only the documents with schemas depend on the configuration
+    configure({'lift_description': True})
+    assert build() == ['a', 'b', 'url']
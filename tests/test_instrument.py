@@ -0,0 +1,106 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import importlib
+import io
+import json
+
+from unittest.mock import Mock
+
+import pytest
+
+instrument = importlib.import_module('sphinx-jsonschema.instrument')
+
+
+def test_measure(monkeypatch):
+    clock = iter(range(100))
+    monkeypatch.setattr(instrument.time, 'perf_counter', lambda: next(clock))
+    env = Mock()
+    env.docname = 'doc'
+    env.app.config.jsonschema_options = {'profile': True, 'profile_memory': False}
+    env.jsonschema_profile = []
+
+    # every reading of the clock advances it by one
+    def run():
+        with instrument.phase('load'):
+            instrument.note(bytes=10)
+        with instrument.phase('layout'):
+            with instrument.phase('table'):
+                instrument.note_source('x.json')
+            instrument.note(bytes=5)
+        return []
+
+    assert instrument.measure(env, 12, run) == []
+    record, = env.jsonschema_profile
+    assert record['phases'] == {'load': 1, 'parse': 0, 'transform': 0, 'layout': 2, 'table': 1}
+    assert (record['total'], record['bytes'], record['source'], record['lineno'], record['peak_memory']) == (
+        7, 15, 'x.json', 12, None)
+
+    # nothing is recorded outside an instrumented directive
+    with instrument.phase('load'):
+        instrument.note(bytes=10)
+    assert len(env.jsonschema_profile) == 1
+
+
+@pytest.mark.parametrize('reset_peak', [True, False])
+def test_measure_memory(monkeypatch, reset_peak):
+    if not reset_peak:
+        # as before Python 3.9
+        monkeypatch.delattr(instrument.tracemalloc, 'reset_peak', raising=False)
+    tracing = instrument.tracemalloc.is_tracing()
+    env = Mock()
+    env.docname = 'doc'
+    env.app.config.jsonschema_options = {'profile': True}
+    env.jsonschema_profile = []
+
+    def run():
+        data = bytearray(4000000)
+        del data
+        return []
+
+    # an earlier peak isn't attributed to the directive
+    instrument.tracemalloc.start()
+    bytearray(20000000)
+    try:
+        instrument.measure(env, 1, run)
+        instrument.measure(env, 2, lambda: [])
+    finally:
+        if not tracing:
+            instrument.tracemalloc.stop()
+    first, second = env.jsonschema_profile
+    assert 4000000 <= first['peak_memory'] < 20000000
+    assert second['peak_memory'] < 4000000
+
+
+def test_report(sphinx_project):
+    sphinx_project.write('schemas/big.json', json.dumps(
+        {'title': 'Big', 'type': 'object',
+         'properties': {'p%d' % n: {'type': 'string', 'description': 'Property *%d*' % n} for n in range(30)}}))
+    report = sphinx_project.root / 'report.json'
+    sphinx_project.configure({'profile': str(report), 'profile_top': 2})
+    pages = ['page%d' % n for n in range(6)]
+    sphinx_project.index(pages)
+    for page in pages:
+        sphinx_project.write(
+            page + '.rst',
+            '%s\n=====\n\n.. jsonschema:: schemas/big.json\n\n.. jsonschema::\n\n    {"type": "string"}\n' % page)
+
+    for parallel in (1, 2):
+        status = io.StringIO()
+        sphinx_project.build(status=status, freshenv=True, parallel=parallel)
+
+        data = json.loads(report.read_text())
+        assert data['directives'] == 12
+        records = data['records']
+        assert sorted((record['docname'], record['lineno']) for record in records) == sorted(
+            (page, line) for page in pages for line in (4, 6))
+        assert [record['total'] for record in records] == sorted(
+            (record['total'] for record in records), reverse=True)
+        files = [record for record in records if record['source'] == 'schemas/big.json']
+        assert len(files) == 6
+        assert all(record['nodes'] > 100 and record['peak_memory'] > 0 for record in files)
+        assert abs(data['totals']['total'] - sum(record['total'] for record in records)) < 1e-6
+
+        output = status.getvalue()
+        assert 'jsonschema: 12 directives in' in output
+        assert len([line for line in output.splitlines() if line.startswith('  ') and ':4' in line]) <= 2
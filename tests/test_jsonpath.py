@@ -0,0 +1,309 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import copy
+import importlib
+import random
+
+import pytest
+
+jsonschema = importlib.import_module('sphinx-jsonschema')
+jsonpath = importlib.import_module('sphinx-jsonschema.jsonpath')
+NOESC = importlib.import_module('sphinx-jsonschema.wide_format').NOESC
+
+
+# The recursive implementation the engine replaced, one traversal per path.
+# It defines the semantics the engine must keep.
+
+def _legacy_fan_out(doc, path, transform, deep=False):
+    if not path:
+        if isinstance(doc, list):
+            for r in range(len(doc)):
+                transform(doc, r)
+        return
+
+    targets = []
+    items = doc.items() if isinstance(doc, dict) else enumerate(doc) if isinstance(doc, list) else ()
+    for k, v in items:
+        if k == path[0]:
+            targets.append(path)
+        elif deep:
+            _legacy_fan_out(v, path, transform, deep)
+        elif len(path) > 1:
+            _legacy_bind(v, path[1:], transform)
+
+    for r in targets:
+        _legacy_bind(doc, r, transform)
+
+
+def _legacy_bind(doc, path, transform):
+    obj = doc
+    last = obj
+    for idx, p in enumerate(path):
+        if p in ('**', '*'):
+            return _legacy_fan_out(obj, path[idx+1:], transform, deep=(p == '**'))
+        last = obj
+        try:
+            obj = obj[p]
+        except (KeyError, IndexError, TypeError):
+            return
+    if path:
+        transform(last, path[-1])
+
+
+def legacy_transform(document, path, transformer):
+    _legacy_bind(document, jsonpath.parse_path(path), transformer)
+
+
+SCHEMA = {
+    'title': 'Root',
+    'examples': ['a', 'b'],
+    'default': '',
+    'properties': {
+        'name': {'type': 'string', 'examples': ['x'], 'default': ''},
+        'examples': {'type': 'array', 'default': []},
+        'nested': {
+            'type': 'object',
+            'properties': {
+                'deep': {'type': 'integer', 'examples': [], 'description': 'deep'}
+            }
+        }
+    },
+    'items': [{'examples': [1]}, {'title': 't'}, 'text']
+}
+
+
+@pytest.mark.parametrize('path', [
+    '/examples',
+    '/**/examples',
+    '/*/examples',
+    '/properties/*/examples',
+    '/properties/*',
+    '/**/deep/examples',
+    '/items/0',
+    '/items/0/examples',
+    '/**/default',
+    '/*/name',
+    '/missing/**/x',
+])
+@pytest.mark.parametrize('transformer', [jsonschema.remove, jsonschema.remove_empty])
+def test_single_path(path, transformer):
+    expected = copy.deepcopy(SCHEMA)
+    legacy_transform(expected, path, transformer)
+    document = copy.deepcopy(SCHEMA)
+    jsonschema.json_path_transform(document, path, transformer)
+    assert document == expected
+
+
+def test_hide_everywhere():
+    document = copy.deepcopy(SCHEMA)
+    jsonschema.json_path_transform(document, '/**/examples', jsonschema.remove)
+    assert 'examples' not in document
+    assert 'examples' not in document['properties']
+    assert 'examples' not in document['properties']['name']
+    assert 'examples' not in document['properties']['nested']['properties']['deep']
+    assert document['items'][0] == {}
+
+
+def test_multiple_rules_in_order():
+    document = copy.deepcopy(SCHEMA)
+    engine = jsonpath.PathEngine([
+        ('/**/examples', jsonschema.remove),
+        ('/**/default', jsonschema.remove_empty),
+        ('/properties/nested/properties/deep/description', jsonschema.tag_noescape),
+        # inside a removed key, doesn't complain about the list
+        ('/properties/examples/default', jsonschema.tag_noescape),
+    ])
+    engine.apply(document)
+    assert 'examples' not in document and 'default' not in document
+    assert 'default' not in document['properties']['name']
+    assert document['properties']['nested']['properties']['deep']['description'] == NOESC + 'deep'
+
+
+def test_not_a_string():
+    with pytest.raises(ValueError):
+        jsonpath.PathEngine([('/items', jsonschema.tag_noescape)]).apply(copy.deepcopy(SCHEMA))
+
+
+@pytest.mark.parametrize('path', ['', '/**/*/a', '/a/*/**', '/*/*'])
+def test_invalid(path):
+    with pytest.raises(ValueError):
+        jsonpath.PathEngine([(path, jsonschema.remove)])
+
+
+def test_compiled_once():
+    rules = [('/**/examples', jsonschema.remove)]
+    assert jsonpath.compile_paths(rules) is jsonpath.compile_paths(list(rules))
+
+
+def _random_document(rnd, depth=0):
+    keys = ['a', 'b', 'c', 'examples']
+    if depth > 3 or rnd.random() < 0.2:
+        return rnd.choice(['', 'text', 0, [], {}])
+    if rnd.random() < 0.3:
+        return [_random_document(rnd, depth + 1) for _ in range(rnd.randint(0, 3))]
+    return {key: _random_document(rnd, depth + 1) for key in rnd.sample(keys, rnd.randint(0, 4))}
+
+
+def _random_path(rnd):
+    parts = []
+    for _ in range(rnd.randint(1, 4)):
+        if parts and parts[-1] in ('*', '**'):
+            parts.append(rnd.choice(['a', 'b', 'examples', '0']))
+        else:
+            parts.append(rnd.choice(['a', 'b', 'c', 'examples', '0', '1', '*', '**']))
+    return '/' + '/'.join(parts)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_same_as_legacy(seed):
+    rnd = random.Random(seed)
+    for _ in range(25):
+        document = _random_document(rnd)
+        rules = [(_random_path(rnd), rnd.choice([jsonschema.remove, jsonschema.remove_empty]))
+                 for _ in range(rnd.randint(1, 3))]
+        if not isinstance(document, (dict, list)):
+            continue
+
+        expected = copy.deepcopy(document)
+        try:
+            for path, transformer in rules:
+                legacy_transform(expected, path, transformer)
+        except (ValueError, IndexError):
+            # e.g. a trailing wildcard on a list, its indices shift while deleting
+            continue
+
+        jsonpath.PathEngine(rules).apply(document)
+        assert document == expected, rules
+
+
+def test_deeply_nested():
+    depth = 10000
+    document = {'examples': [], 'default': 'x'}
+    for _ in range(depth):
+        document = {'properties': document, 'examples': []}
+    jsonpath.PathEngine([
+        ('/**/examples', jsonschema.remove),
+        ('/**/default', jsonschema.tag_noescape),
+    ]).apply(document)
+
+    for _ in range(depth):
+        assert list(document) == ['properties']
+        document = document['properties']
+    assert document == {'default': NOESC + 'x'}
+
+
+def test_transformed_copies_on_write():
+    document = copy.deepcopy(SCHEMA)
+    engine = jsonpath.PathEngine([
+        ('/properties/name/examples', jsonschema.remove),
+        ('/items/0', jsonschema.remove),
+        ('/items/0/title', jsonschema.tag_noescape),
+    ])
+    result = engine.transformed(document)
+
+    assert document == SCHEMA
+    expected = copy.deepcopy(SCHEMA)
+    engine.apply(expected)
+    assert result == expected
+
+    # only the containers on the way to the changes are copies
+    assert result is not document
+    assert result['properties'] is not document['properties']
+    assert result['properties']['nested'] is document['properties']['nested']
+    assert result['examples'] is document['examples']
+    # the item moved up after the removal of the first
+    assert result['items'][0]['title'] == NOESC + 't'
+    assert document['items'][1]['title'] == 't'
+
+
+def _random_list(rnd, depth=0):
+    if depth > 2 or rnd.random() < 0.2:
+        return rnd.choice(['', 'text', {'a': []}, {'b': 'x'}])
+    return [_random_list(rnd, depth + 1) for _ in range(rnd.randint(0, 4))]
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_list_positions(seed):
+    # each rule sees the positions left by the removals of the ones before
+    rnd = random.Random(seed)
+    for _ in range(25):
+        document = {'a': _random_list(rnd)}
+        rules = [('/' + '/'.join(rnd.choice(['a', '0', '1', '2', '**']) for _ in range(rnd.randint(1, 3))),
+                  rnd.choice([jsonschema.remove, jsonschema.remove_empty]))
+                 for _ in range(rnd.randint(2, 4))]
+        try:
+            engine = jsonpath.PathEngine(rules)
+        except ValueError:
+            continue
+
+        expected = copy.deepcopy(document)
+        try:
+            for path, transformer in rules:
+                legacy_transform(expected, path, transformer)
+        except (ValueError, IndexError, TypeError):
+            # indexing into a string, the legacy code didn't check
+            continue
+
+        original = copy.deepcopy(document)
+        assert engine.transformed(document) == expected, rules
+        assert document == original
+        engine.apply(document)
+        assert document == expected, rules
+
+
+def test_list_positions_moved():
+    document = {'items': ['a', 'b', {'title': 'c'}, 'd']}
+    engine = jsonpath.PathEngine([
+        ('/items/0', jsonschema.remove),
+        ('/items/0', jsonschema.remove),
+        ('/items/0/title', jsonschema.tag_noescape),
+    ])
+    assert engine.transformed(document) == {'items': [{'title': NOESC + 'c'}, 'd']}
+
+
+def test_transformed_unchanged():
+    document = copy.deepcopy(SCHEMA)
+    assert jsonpath.PathEngine([('/missing', jsonschema.remove)]).transformed(document) is document
+
+
+def test_transformed_aliases():
+    loaders = importlib.import_module('sphinx-jsonschema.loaders')
+    document = loaders.ordered_load(
+        'properties:\n'
+        '  a: &sh {type: string, description: shared}\n'
+        '  b: *sh\n'
+        'definitions:\n'
+        '  c: *sh\n', format='yaml')
+    assert document['properties']['a'] is document['properties']['b']
+    original = copy.deepcopy(document)
+    engine = jsonpath.PathEngine([('/properties/**/description', jsonschema.remove)])
+    result = engine.transformed(document)
+
+    assert document == original
+    # hidden for every parent of the shared container, as in-place
+    expected = copy.deepcopy(document)
+    engine.apply(expected)
+    assert result == expected
+    assert [dict(value) for value in result['properties'].values()] == [{'type': 'string'}] * 2
+    assert 'description' not in result['definitions']['c']
+    assert result['properties']['a'] is result['definitions']['c']
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_transformed_shared(seed):
+    rnd = random.Random(seed)
+    for _ in range(25):
+        shared = _random_document(rnd, 2)
+        document = [shared, {'a': shared, 'b': [shared]}, _random_document(rnd)]
+        rules = [(_random_path(rnd), rnd.choice([jsonschema.remove, jsonschema.remove_empty]))
+                 for _ in range(rnd.randint(1, 3))]
+
+        original = copy.deepcopy(document)
+        expected = copy.deepcopy(document)
+        try:
+            jsonpath.PathEngine(rules).apply(expected)
+        except (ValueError, IndexError):
+            continue
+        assert jsonpath.PathEngine(rules).transformed(document) == expected, rules
+        assert document == original
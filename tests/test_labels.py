@@ -0,0 +1,95 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import importlib
+import json
+
+labels = importlib.import_module('sphinx-jsonschema.labels')
+
+SHARED = {'$id': 'http://example.com/shared.json', 'title': 'Shared', 'type': 'object',
+          'definitions': {'Name': {'type': 'string'}}}
+
+PAGES = ['page%02d' % n for n in range(12)]
+
+
+def test_index():
+    index = labels.LabelIndex()
+    index.add('x', 'b', 'id-b', 'B')
+    index.add('x', 'a', 'id-a', 'A')
+    index.add('y', 'a', 'id-y', 'Y')
+    domaindata = {'labels': {}, 'anonlabels': {}}
+    index.install(domaindata, ['x', 'y', 'z'])
+    # the last document in reading order wins, whatever the order of adding
+    assert domaindata['labels'] == {'x': ('b', 'id-b', 'B'), 'y': ('a', 'id-y', 'Y')}
+    assert domaindata['anonlabels'] == {'x': ('b', 'id-b'), 'y': ('a', 'id-y')}
+
+    assert index.purge('b') == {'x'}
+    index.install(domaindata, ['x'])
+    assert domaindata['labels']['x'] == ('a', 'id-a', 'A')
+    assert index.purge('a') == {'x', 'y'}
+    assert index.labels == {} and index.documents == {}
+
+    other = labels.LabelIndex()
+    other.add('x', 'c', 'id-c', 'C')
+    other.add('x', 'd', 'id-d', 'D')
+    assert index.merge(other, ['c']) == {'x'}
+    assert index.labels == {'x': {'c': ('id-c', 'C')}}
+
+
+def _write(project, pages):
+    for page in PAGES:
+        if page in pages:
+            project.write(
+                page + '.rst',
+                '%s\n======\n\n'
+                '.. jsonschema:: schemas/shared.json\n    :auto_target:\n    :lift_definitions:\n\n'
+                '.. jsonschema::\n\n    {"title": "Own", "$$target": "own-%s", "type": "string"}\n'
+                % (page, page))
+        else:
+            project.write(page + '.rst', '%s\n======\n' % page)
+
+
+def _state(app):
+    std = app.env.domaindata['std']
+    names = [name for name in std['labels'] if name.startswith(('shared.json', 'own-'))]
+    doctree = app.env.get_and_resolve_doctree('index', app.builder)
+    # the references outside the toctree
+    references = [(node.get('refuri'), node.astext())
+                  for child in doctree[0] if child.tagname != 'compound'
+                  for node in child.findall(lambda node: node.tagname == 'reference')]
+    return ({name: std['labels'][name] for name in names},
+            {name: std['anonlabels'][name] for name in names},
+            {key: sorted(entries) for key, entries in app.env.jsonschema_refs.targets.items()},
+            references)
+
+
+def test_parallel(sphinx_project):
+    project = sphinx_project
+    project.write('schemas/shared.json', json.dumps(SHARED))
+    project.index(PAGES, ':ref:`shared.json`\n\n'
+                  '.. jsonschema::\n\n    {"title": "Uses", "properties": {"name": '
+                  '{"$ref": "http://example.com/shared.json#/definitions/Name"}}}\n')
+    _write(project, PAGES)
+
+    def build(name, parallel):
+        return project.build(name=name, parallel=parallel)
+
+    serial = _state(build('serial', 1))
+    assert serial[0]['shared.json'][0] == 'page11'
+    assert serial[0]['own-page00'][0] == 'page00'
+    assert serial[3] == [('page11.html#shared', 'Shared'), ('page11.html#name', 'Name')]
+    assert _state(build('parallel', 2)) == serial
+
+    # documents defining the label are edited or dropped, the
+    # label stays with the last document still defining it
+    _write(project, PAGES[:3])
+    serial = _state(build('serial', 1))
+    assert serial[0]['shared.json'][0] == 'page02'
+    assert 'own-page11' not in serial[0]
+    assert serial[3] == [('page02.html#shared', 'Shared'), ('page02.html#name', 'Name')]
+    assert _state(build('parallel', 2)) == serial
+
+    _write(project, PAGES)
+    serial = _state(build('serial', 1))
+    assert serial[0]['shared.json'][0] == 'page11'
+    assert _state(build('parallel', 2)) == serial
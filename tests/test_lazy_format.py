@@ -0,0 +1,67 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import datetime
+import importlib
+import json
+import pathlib
+
+lazy_format = importlib.import_module('sphinx-jsonschema.lazy_format')
+wide_format = importlib.import_module('sphinx-jsonschema.wide_format')
+
+SCHEMA = {
+    'title': 'Lazy',
+    'type': 'object',
+    'properties': {
+        'name': {'type': 'string', 'description': 'Ends with </script>'},
+        'secret': {'type': 'string'}
+    }
+}
+
+
+def build(project, builder):
+    if not (project.source / 'schema.json').exists():
+        project.configure({'layout': 'lazy', 'node_cache': False})
+        project.write('schema.json', json.dumps(SCHEMA))
+        project.write('index.rst', 'Index\n=====\n\n.. jsonschema:: schema.json\n    :hide_key: /properties/secret\n')
+
+    app = project.build(builder)
+    return app, pathlib.Path(app.outdir)
+
+
+def test_embed():
+    html = lazy_format.embed({'a': '</script><!--'})
+    assert '</script><' not in html[:-len('</script></div>')]
+    data = html[html.index('>', html.index('<script')) + 1:-len('</script></div>')]
+    assert json.loads(data) == {'a': '</script><!--'}
+
+
+def test_embed_values():
+    # values YAML loads that aren't JSON, and views of the schema
+    view = wide_format.SchemaView.wrap({'type': 'string', 'default': datetime.date(2020, 1, 1)})
+    html = lazy_format.embed({'properties': {'day': view}})
+    data = html[html.index('>', html.index('<script')) + 1:-len('</script></div>')]
+    assert json.loads(data) == {'properties': {'day': {'type': 'string', 'default': '2020-01-01'}}}
+
+
+def test_builders(sphinx_project):
+    app, out = build(sphinx_project, 'html')
+    page = (out / 'index.html').read_text()
+    assert '<table' not in page
+    assert 'class="jsonschema-lazy"' in page
+    assert '_static/jsonschema-lazy.js' in page
+    assert (out / '_static' / 'jsonschema-lazy.js').exists()
+    data = page[page.index('application/json">') + len('application/json">'):]
+    schema = json.loads(data[:data.index('</script>')])
+    # the title became the section, the hidden key is gone
+    assert schema == {'type': 'object', 'properties': {'name': SCHEMA['properties']['name']}}
+
+    # the same doctrees, the document is read again for the table
+    app, out = build(sphinx_project, 'pseudoxml')
+    page = (out / 'index.pseudoxml').read_text()
+    assert '<table' in page and '<raw' not in page
+    assert app.env.jsonschema_lazy == {'index': 'other'}
+
+    app, out = build(sphinx_project, 'html')
+    assert 'class="jsonschema-lazy"' in (out / 'index.html').read_text()
+    assert app.env.jsonschema_lazy == {'index': 'html'}
@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import importlib
+import json
+import os
+import sys
+
+import pytest
+
+from collections import OrderedDict
+
+loaders = importlib.import_module('sphinx-jsonschema.loaders')
+cache = importlib.import_module('sphinx-jsonschema.cache')
+
+JSON = '{"title": "T", "properties": {"b": {"type": "string"}, "a": {"type": "integer"}}}'
+YAML = 'title: T\nproperties:\n  b:\n    type: string\n  a:\n    type: integer\n'
+EXPECTED = {'title': 'T', 'properties': {'b': {'type': 'string'}, 'a': {'type': 'integer'}}}
+
+
+@pytest.fixture(params=sorted(loaders.JSON_BACKENDS))
+def backend(request):
+    loaders.set_json_backend(request.param)
+    yield request.param
+    loaders.set_json_backend()
+
+
+@pytest.mark.parametrize('format', loaders.FORMATS)
+def test_json(backend, format):
+    result = loaders.ordered_load(JSON, format=format)
+    assert result == EXPECTED
+    assert list(result['properties']) == ['b', 'a']
+
+
+class Pairs(OrderedDict):
+    pass
+
+
+@pytest.mark.parametrize('format', ['auto', 'json'])
+def test_json_object_pairs_hook(backend, format):
+    result = loaders.ordered_load(JSON, object_pairs_hook=Pairs, format=format)
+    assert type(result) is Pairs and type(result['properties']['a']) is Pairs
+
+
+def test_exponent(backend):
+    # a number to JSON, but text to YAML
+    assert loaders.ordered_load('{"a": 1e3}') == {'a': 1000.0}
+    assert loaders.ordered_load('{"a": 1e3}', format='yaml') == {'a': '1e3'}
+
+
+@pytest.mark.parametrize('format', ['auto', 'yaml'])
+def test_yaml(format):
+    result = loaders.ordered_load(YAML, format=format)
+    assert result == EXPECTED
+    assert list(result['properties']) == ['b', 'a']
+
+
+def test_yaml_flow_style():
+    assert loaders.ordered_load('{title: T}') == {'title': 'T'}
+
+
+def test_yaml_as_json():
+    with pytest.raises(ValueError):
+        loaders.ordered_load(YAML, format='json')
+
+
+def test_sniff_format():
+    assert loaders.sniff_format('', 'schema.yaml') == 'yaml'
+    assert loaders.sniff_format('', 'schema.json') == 'auto'
+    assert loaders.sniff_format('  {"a": 1}') == 'json'
+    assert loaders.sniff_format('a: 1') == 'auto'
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        loaders.set_json_backend('simdjson')
+
+
+def test_import_object():
+    obj, mod = loaders.import_object('sphinx-jsonschema.example.SCHEMA')
+    assert obj['title'] == 'An example'
+    assert mod.__name__ == 'sphinx-jsonschema.example'
+
+
+def test_import_nested_object():
+    obj, mod = loaders.import_object('json.decoder.JSONDecoder.decode')
+    assert obj is json.decoder.JSONDecoder.decode
+    assert mod is json.decoder
+
+
+def test_import_modified(tmp_path, monkeypatch):
+    monkeypatch.syspath_prepend(str(tmp_path))
+    module = tmp_path / 'edited_schema.py'
+    module.write_text('SCHEMA = {"title": "First"}\n')
+    obj, mod = loaders.import_object('edited_schema.SCHEMA')
+    assert obj == {'title': 'First'}
+    assert loaders.import_object('edited_schema.SCHEMA')[0] is obj
+    key = cache.data_key('edited_schema.SCHEMA', path=mod.__file__)
+
+    # as in a long running build process, once the file is edited
+    module.write_text('SCHEMA = {"title": "Second"}\n')
+    stat = module.stat()
+    os.utime(module, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert loaders.import_object('edited_schema.SCHEMA')[0] == {'title': 'Second'}
+    assert cache.data_key('edited_schema.SCHEMA', path=mod.__file__) != key
+    del sys.modules['edited_schema']
+
+
+def test_import_missing_module():
+    with pytest.raises(ImportError):
+        loaders.import_object('no_such_module.SCHEMA')
+
+
+def test_native_schema():
+    schema = {'type': 'string', 'default': None, 'readOnly': True}
+    assert loaders.native_schema(schema) is schema
+    assert loaders.native_schema(lambda: schema) is schema
+    assert loaders.native_schema([schema]) == [schema]
+    assert loaders.native_schema('{"type": "string"}') is None
+    assert loaders.native_schema(dict) is None
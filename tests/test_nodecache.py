@@ -0,0 +1,132 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import importlib
+import io
+import json
+import pathlib
+
+nodecache = importlib.import_module('sphinx-jsonschema.nodecache')
+
+SCHEMA = {
+    'title': 'Error',
+    'description': 'An error, see `Detail`_.',
+    'type': 'object',
+    'properties': {
+        'code': {'type': 'integer', 'description': 'The *code*'},
+        'reason': {'type': 'string', 'description': 'See :ref:`missing`'},
+        'detail': {'$ref': '#/definitions/Detail'}
+    },
+    'definitions': {
+        'Detail': {'type': 'string', 'examples': ['text']}
+    }
+}
+
+PAGE = """
+{title}
+=======
+
+Text before.
+{before}
+
+.. jsonschema:: schemas/error.json
+    :lift_definitions:
+    :auto_reference:
+    :auto_target:
+
+.. jsonschema:: schemas/error.json#/definitions/Detail
+
+.. jsonschema::
+
+    {{"title": "Inline", "type": "string", "description": "See :ref:`error.json`"}}
+
+.. jsonschema::
+
+    {{"title": "Link", "type": "string", "description": "Go `there <http://example.com>`_"}}
+"""
+
+
+def build(project, name, **options):
+    options.update(prefetch=False)
+    project.configure(options)
+    project.write('schemas/error.json', json.dumps(SCHEMA))
+    project.write('index.rst', PAGE.format(title='Index', before='') + '\n.. toctree::\n\n    other\n')
+    # move the directives of the second page down a few lines
+    project.write('other.rst', PAGE.format(title='Other', before='\nMore.\n\nAnd more.\n'))
+
+    warnings = io.StringIO()
+    app = project.build('pseudoxml', name, warning=warnings, freshenv=True)
+    out = pathlib.Path(app.outdir)
+    source = str(project.source)
+    labels = app.env.domaindata['std']['labels']
+    return ((out / 'index.pseudoxml').read_text().replace(source, ''),
+            (out / 'other.pseudoxml').read_text().replace(source, ''),
+            {name: labels[name] for name in labels if 'error' in name},
+            # the warnings about the documents, not about setting up Sphinx
+            sorted(line for line in warnings.getvalue().replace(source, '').splitlines()
+                   if '.rst:' in line))
+
+
+def test_same_output(sphinx_project):
+    nodecache.node_cache.clear()
+    cached = build(sphinx_project, 'cached', node_cache=True)
+    stats = nodecache.node_cache.stats()
+    # the second page reuses the renderings of the file, the inline schema
+    # is entered in the reference index under the name of its own page
+    assert stats['hits'] == 2
+    assert stats['entries'] == 4
+
+    nodecache.node_cache.clear()
+    uncached = build(sphinx_project, 'uncached', node_cache=False)
+    assert nodecache.node_cache.stats()['entries'] == 0
+
+    assert cached == uncached
+    # the labels were registered for the last page rendering them
+    assert cached[2]['error.json'][0] == 'other'
+
+
+def test_fragments_reused(sphinx_project):
+    nodecache.fragment_cache.clear()
+    cached = build(sphinx_project, 'cached', node_cache=False)
+    stats = nodecache.fragment_cache.stats()
+    # every fragment of the second page, and the repeated ones of the first
+    assert stats['hits'] > stats['entries'] > 0
+
+    nodecache.fragment_cache.clear()
+    uncached = build(sphinx_project, 'uncached', node_cache=False, fragment_cache=False)
+    assert nodecache.fragment_cache.stats()['entries'] == 0
+
+    assert cached == uncached
+    # the warnings of copied references point at their own lines
+    assert any('other.rst:' in warning and 'missing' in warning for warning in cached[3])
+
+
+def test_lines_replayed():
+    from docutils import nodes
+    from docutils.frontend import OptionParser
+    from docutils.parsers.rst import Parser
+    from docutils.utils import new_document
+
+    settings = OptionParser(components=(Parser,)).get_default_values()
+    cache = nodecache.NodeCache()
+
+    def render():
+        section = nodes.section(names=['title'])
+        paragraph = nodes.paragraph('text', 'text')
+        paragraph.source, paragraph.line = 'first.rst', 5
+        section += paragraph
+        return [section], [], []
+
+    first = new_document('first.rst', settings)
+    first.current_source = 'first.rst'
+    result = cache.render('key', render, first, None, 5)
+    first.note_implicit_target(result[0], result[0])
+
+    second = new_document('second.rst', settings)
+    second.current_source = 'second.rst'
+    copy = cache.render('key', render, second, None, 12)[0]
+    assert cache.stats()['hits'] == 1
+    assert copy is not result[0]
+    assert copy['ids'] == ['title']
+    assert second.ids['title'] is copy
+    assert (copy[0].source, copy[0].line) == ('second.rst', 12)
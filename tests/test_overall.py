@@ -1,22 +1,31 @@
 #!/usr/bin/python3
 # -*- coding: utf-8 -*-
 
+import re
+
+import docutils.nodes
 import pytest
 
 from unittest.mock import Mock
 
+from docutils.frontend import OptionParser
+from docutils.parsers.rst import Parser
 from docutils.parsers.rst.states import RSTStateMachine, Body
+from docutils.utils import new_document
 
 wide_format = __import__('sphinx-jsonschema.wide_format')
 
 @pytest.fixture
 def wideformat():
     state = Body(RSTStateMachine([], None))
+    settings = OptionParser(components=(Parser,)).get_default_values()
+    state.document = new_document('<test>', settings)
     state.build_table = Mock()
     lineno = 1
     source = ''
     options = {}
-    app = None
+    app = Mock()
+    app.config.jsonschema_options = {}
 
     return wide_format.WideFormat(state, lineno, source, options, app)
 
@@ -37,3 +46,155 @@ def test_string(wideformat):
     }
     result = wideformat.transform(schema)
     wideformat.state.build_table.assert_called()
+
+DEPTH = 5000
+
+def _nested(key, depth, leaf):
+    schema = leaf
+    for _ in range(depth):
+        schema = {key: schema}
+    return schema
+
+@pytest.mark.parametrize('key', ['not', 'additionalProperties'])
+def test_deeply_nested(wideformat, key):
+    schema = _nested(key, DEPTH, {'type': 'string'})
+    wideformat.transform(schema)
+    cols, head, body = wideformat.state.build_table.call_args[0][0]
+    # a label column for each level and one for the type
+    assert len(cols) == DEPTH + 2
+    assert len(body) == 1
+
+def test_deeply_nested_default(wideformat):
+    schema = {'type': 'string', 'default': _nested('key', DEPTH, [1, 2])}
+    wideformat.transform(schema)
+    cols, head, body = wideformat.state.build_table.call_args[0][0]
+    # 'type' and 'default' rows, the default spans its levels plus its items
+    assert len(body) == 3
+    assert len(cols) == DEPTH + 2
+
+def test_nested_default_siblings(wideformat):
+    # containers followed by sibling keys, at every level
+    def text(row):
+        if isinstance(row, wide_format.wide_format.Cell):
+            return row.text
+        if isinstance(row, wide_format.wide_format.Block):
+            return {text(row.label): [text(r) for r in row.rows]}
+        return [text(item) for item in row]
+
+    value = {'a': [1, {'b': None}], 'c': {}, 'd': {'e': 1}, 'f': 2}
+    assert text(wideformat._render_any_value(value)) == [
+        {'a': [['1'], {'b': [['null']]}]}, {'c': [['']]}, {'d': [{'e': [['1']]}]}, {'f': [['2']]}]
+
+    wideformat.transform({'type': 'object', 'default': value, 'examples': [{'a': {'b': 1}, 'c': 2}]})
+    cols, head, body = wideformat.state.build_table.call_args[0][0]
+    assert len(body) == 8
+
+def _tables(wideformat):
+    tables = []
+    for call in wideformat.state.build_table.call_args_list:
+        cols, head, body = call[0][0]
+        tables.append((cols, [[cell if cell is None else cell[:3] + (list(cell[3]),) for cell in row]
+                              for row in body]))
+    wideformat.state.build_table.reset_mock()
+    return tables
+
+def test_schema_untouched(wideformat):
+    import copy
+    wideformat.options['lift_definitions'] = True
+    wideformat.options['lift_title'] = False
+    wideformat.app.env.domaindata = {'std': {'labels': {}, 'anonlabels': {}}}
+    schema = {
+        '$id': 'http://example.com/schema.json',
+        'title': 'Shared',
+        '$$description': ['first', 'second'],
+        'type': 'object',
+        'properties': {
+            'name': {'type': 'string', 'default': {'a': [1, 2]}},
+            'item': {'$ref': '#/definitions/Item'}
+        },
+        'definitions': {
+            'Item': {'type': 'array', 'items': [{'type': 'integer'}, 'x']}
+        }
+    }
+    original = copy.deepcopy(schema)
+    wideformat.run(schema)
+    first = _tables(wideformat)
+    assert len(first) == 2
+    assert schema == original
+
+    wideformat.run(schema)
+    assert _tables(wideformat) == first
+    assert schema == original
+
+def test_schema_view():
+    view = wide_format.wide_format.SchemaView({'a': 1, 'b': 2, 'c': 3})
+    del view['b']
+    view['a'] = 10
+    view['d'] = 4
+    assert list(view) == ['a', 'c', 'd']
+    assert dict(view) == {'a': 10, 'c': 3, 'd': 4}
+    assert 'b' not in view and len(view) == 3
+    with pytest.raises(KeyError):
+        del view['b']
+    assert view.schema == {'a': 1, 'b': 2, 'c': 3}
+
+def test_table_rows():
+    cell = wide_format.wide_format.Cell('first\nsecond')
+    cell.colspan = 1
+    rows = wide_format.wide_format.TableRows([[cell, None], [None]], 'doc.rst', 7)
+    assert len(rows) == 2
+    (rowspan, colspan, lineno, lines), empty = rows[0]
+    assert (rowspan, colspan, lineno, empty) == (0, 1, 0, None)
+    assert list(lines) == ['first', 'second']
+    assert lines.items == [('doc.rst', 7), ('doc.rst', 7)]
+    assert rows[1:] == [[None]]
+
+def test_layout(wideformat):
+    wf = wideformat
+    cell = wf._cell
+    inner = wf._prepend(cell('inner'), [wf._line(cell('a'), cell('1')), wf._line(cell('b'))])
+    outer = wf._prepend(cell('outer'), inner + [wf._line(cell('c'), cell('2'), cell('3'))])
+    nrcols, table = wf._layout([wf._line(cell('top'))] + outer)
+
+    def text(row):
+        return [None if c is None else (c.text, c.rowspan, c.colspan) for c in row]
+
+    assert nrcols == 4
+    assert [text(row) for row in table] == [
+        [('top', 0, 3), None, None, None],
+        [('outer', 2, 0), ('inner', 1, 0), ('a', 0, 0), ('1', 0, 0)],
+        [None, None, ('b', 0, 1), None],
+        [None, ('c', 0, 0), ('2', 0, 0), ('3', 0, 0)],
+    ]
+
+def _parsed_table(monkeypatch, plain):
+    from docutils.core import publish_doctree
+    from docutils.parsers.rst import Directive, directives
+
+    if not plain:
+        monkeypatch.setattr(wide_format.wide_format, 'PLAIN', re.compile('(?!)'))
+    schema = {
+        'type': 'object',
+        'description': 'Some *markup* and plain text',
+        'properties': {
+            'name': {'type': 'string', 'minLength': 1, 'pattern': '^a_b$', 'description': 'Just text'},
+            'list': {'type': 'array', 'items': {'enum': ['A. first', 'second']}},
+            'number': {'type': 'number', 'default': 1.5, 'examples': [1, 'it\'s']}
+        }
+    }
+
+    class TestDirective(Directive):
+        def run(self):
+            app = Mock()
+            app.config.jsonschema_options = {}
+            app.env.domaindata = {'std': {'labels': {}, 'anonlabels': {}}}
+            format = wide_format.WideFormat(self.state, self.lineno, 'x.json', {}, app)
+            return format.run(schema)
+
+    directives.register_directive('widetest', TestDirective)
+    document = publish_doctree('Text\n\n.. widetest::\n', source_path='doc.rst')
+    return [(node.pformat() if isinstance(node, docutils.nodes.Element) else str(node),
+             node.source, node.line) for node in document.findall()]
+
+def test_plain_cells(monkeypatch):
+    assert _parsed_table(monkeypatch, True) == _parsed_table(monkeypatch, False)
@@ -0,0 +1,131 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import importlib
+import json
+import pathlib
+
+from unittest.mock import Mock
+
+prefetch = importlib.import_module('sphinx-jsonschema.prefetch')
+cache = importlib.import_module('sphinx-jsonschema.cache')
+example = importlib.import_module('sphinx-jsonschema.example')
+
+SOURCE = """
+Title
+=====
+
+.. jsonschema:: schemas/a.json#/definitions/Foo
+   :encoding: utf-8
+   :lift_title: False
+
+.. jsonschema:: http://example.com/schema.json
+
+.. jsonschema:: #/date
+
+    {"date": {"type": "string"}}
+
+.. jsonschema::
+
+    {"type": "string"}
+
+   .. jsonschema:: sphinx-jsonschema.example.SCHEMA
+"""
+
+
+def test_scan():
+    assert list(prefetch.scan(SOURCE)) == [
+        ('schemas/a.json', '/definitions/Foo', {'encoding': 'utf-8', 'lift_title': 'False'}),
+        ('http://example.com/schema.json', '', {}),
+        ('sphinx-jsonschema.example.SCHEMA', '', {}),
+    ]
+
+
+def test_scan_literal():
+    source = """
+Show it like this:
+
+.. code-block:: rst
+
+    .. jsonschema:: http://example.com/code.json
+
+or as a literal block::
+
+    .. jsonschema:: example.module.SCHEMA
+
+.. note::
+
+    Example::
+
+        .. jsonschema:: schemas/literal.json
+
+    .. jsonschema:: schemas/b.json
+
+.. jsonschema:: schemas/c.json
+"""
+    assert [reference for reference, pointer, options in prefetch.scan(source)] == [
+        'schemas/b.json', 'schemas/c.json']
+
+
+def test_prefetch(tmp_path):
+    (tmp_path / 'schemas').mkdir()
+    schema = tmp_path / 'schemas' / 'a.json'
+    schema.write_text('{"definitions": {"Foo": {"type": "string"}}}')
+    document = tmp_path / 'index.rst'
+    document.write_text('.. jsonschema:: schemas/a.json#/definitions/Foo\n'
+                        '.. jsonschema:: sphinx-jsonschema.example.SCHEMA\n')
+
+    app = Mock()
+    app.config.jsonschema_options = {'disk_cache': False, 'http_cache': False}
+    app.config.source_encoding = 'utf-8'
+    env = Mock()
+    env.doc2path.return_value = str(document)
+
+    cache.schema_cache.clear()
+    prefetch.prefetch(app, env, ['index'])
+    assert cache.file_key(str(schema)) in cache.schema_cache
+    assert cache.data_key('sphinx-jsonschema.example.SCHEMA', path=example.__file__) in cache.schema_cache
+
+
+def test_prefetch_collection(tmp_path):
+    (tmp_path / 'schemas' / 'sub').mkdir(parents=True)
+    (tmp_path / 'schemas' / 'a.json').write_text('{"type": "string"}')
+    (tmp_path / 'schemas' / 'sub' / 'b.yaml').write_text('type: integer\n')
+    document = tmp_path / 'index.rst'
+    document.write_text('.. jsonschema-collection:: schemas/**/*.yaml\n'
+                        '.. jsonschema-collection:: schemas\n')
+
+    app = Mock()
+    app.config.jsonschema_options = {'disk_cache': False, 'http_cache': False}
+    app.config.source_encoding = 'utf-8'
+    env = Mock()
+    env.doc2path.return_value = str(document)
+
+    assert sorted(prefetch.collect(app, env, ['index'])) == [
+        cache.file_key(str(tmp_path / 'schemas' / 'a.json'), None, 'auto'),
+        cache.file_key(str(tmp_path / 'schemas' / 'sub' / 'b.yaml'), None, 'yaml')]
+
+
+def test_prefetch_streams(sphinx_project):
+    bundle = sphinx_project.write('schemas/bundle.json', json.dumps(
+        {'definitions': {'Foo': {'title': 'Foo', 'type': 'string'}, 'Bar': {'type': 'integer'}}}))
+    sphinx_project.configure({'stream_threshold': 0})
+    sphinx_project.write('index.rst', 'Index\n=====\n\n.. jsonschema:: schemas/bundle.json#/definitions/Foo\n')
+
+    key = cache.file_key(str(bundle))
+    app = Mock()
+    app.config.jsonschema_options = {'disk_cache': False, 'http_cache': False, 'stream_threshold': 0}
+    app.config.source_encoding = 'utf-8'
+    env = Mock()
+    env.doc2path.return_value = str(sphinx_project.source / 'index.rst')
+    cache.schema_cache.clear()
+    prefetch.prefetch(app, env, ['index'])
+    # only the part the pointer selects is parsed
+    assert ('pointer', '/definitions/Foo') + key in cache.schema_cache
+    assert key not in cache.schema_cache
+
+    cache.schema_cache.clear()
+    app = sphinx_project.build()
+    assert ('pointer', '/definitions/Foo') + key in cache.schema_cache
+    assert key not in cache.schema_cache
+    assert 'Foo' in (pathlib.Path(app.outdir) / 'index.html').read_text()
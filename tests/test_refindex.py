@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import importlib
+import json
+
+import pytest
+
+refindex = importlib.import_module('sphinx-jsonschema.refindex')
+
+TYPES = {
+    '$id': 'http://example.com/types.json',
+    'title': 'Types',
+    'type': 'object',
+    'definitions': {
+        'Name': {'type': 'string'},
+        'Code': {'type': 'integer'}
+    }
+}
+
+USER = {
+    'title': 'User',
+    'type': 'object',
+    'properties': {
+        'name': {'$ref': 'schemas/types.json#/definitions/Name'},
+        'code': {'$ref': 'http://example.com/types.json#/definitions/Code'},
+        'self': {'$ref': '#'},
+        'other': {'$ref': 'schemas/missing.json'}
+    }
+}
+
+TYPES_PAGE = 'Types\n=====\n\n.. jsonschema:: schemas/types.json\n    :lift_definitions:\n'
+
+
+def test_ref_key():
+    assert refindex.ref_key('schemas/a.json', '#/definitions/x/') == 'schemas/a.json#/definitions/x'
+    assert refindex.ref_key('schemas/a.json', 'b.json') == 'schemas/b.json#'
+    assert refindex.ref_key('schemas/a.json', '../b.json#/x') == 'b.json#/x'
+    assert refindex.ref_key('http://x.org/a/b.json', 'c.json#/d') == 'http://x.org/a/c.json#/d'
+    assert refindex.ref_key('schemas/a.json', 'http://x.org/c.json#') == 'http://x.org/c.json#'
+
+
+def test_index():
+    index = refindex.RefIndex()
+    index.add('a#', 'one', 'a', 'A')
+    index.add('a#', 'two', 'a-1', 'A')
+    index.add('b#', 'two', 'b', 'B')
+    assert index.resolve(['x#', 'a#']) == ('two', 'a-1', 'A')
+    index.purge('two')
+    assert index.resolve(['a#']) == ('one', 'a', 'A')
+    assert index.resolve(['b#']) is None
+
+    other = refindex.RefIndex()
+    other.add('b#', 'three', 'b', 'B')
+    other.add('c#', 'four', 'c', 'C')
+    index.merge(other, ['three'])
+    assert index.resolve(['b#']) == ('three', 'b', 'B')
+    assert index.resolve(['c#']) is None
+    assert index.documents == {'one': {'a#'}, 'three': {'b#'}}
+
+
+def _references(app, docname):
+    doctree = app.env.get_and_resolve_doctree(docname, app.builder)
+    return sorted((node.get('refuri') or '#' + node['refid'], node.astext())
+                  for node in doctree.findall(lambda node: node.tagname == 'reference'))
+
+
+@pytest.mark.parametrize('node_cache', [True, False])
+def test_across_documents(sphinx_project, node_cache):
+    project = sphinx_project
+    project.write('schemas/types.json', json.dumps(TYPES))
+    project.configure({'node_cache': node_cache})
+    project.index(['types', 'user', 'again'])
+    project.write('types.rst', TYPES_PAGE)
+    project.write('again.rst', 'Again\n=====\n\n' + TYPES_PAGE)
+    project.write('user.rst', 'Users\n=====\n\n.. jsonschema::\n\n    %s\n' % json.dumps(USER))
+
+    app = project.build()
+    # by file and by $id, to the last page read rendering them
+    assert _references(app, 'user') == [
+        ('#user', 'User'), ('types.html#code', 'Code'), ('types.html#name', 'Name')]
+    docname, anchor, title = app.env.jsonschema_refs.resolve(['schemas/types.json#'])
+    assert (docname, title) == ('types', 'Types')
+
+    project.write('types.rst', 'Types\n=====\n')
+    app = project.build()
+    assert _references(app, 'user') == [
+        ('#user', 'User'), ('again.html#code', 'Code'), ('again.html#name', 'Name')]
+
+    project.write('again.rst', 'Again\n=====\n')
+    app = project.build()
+    # the references that aren't found are rendered as before
+    assert _references(app, 'user') == [('#user', 'User')]
+    assert 'again' not in app.env.jsonschema_refs.documents
+
+
+def test_identical_files(sphinx_project):
+    # files with the same content are entered in the index each under their own name
+    for name in ('d1/s.json', 'd2/t.json'):
+        sphinx_project.write(name, json.dumps({'title': 'Thing', 'type': 'string'}))
+    sphinx_project.index(['a', 'b', 'user'])
+    sphinx_project.write('a.rst', 'A\n=\n\n.. jsonschema:: d1/s.json\n')
+    sphinx_project.write('b.rst', 'B\n=\n\n.. jsonschema:: d2/t.json\n')
+    sphinx_project.write(
+        'user.rst',
+        'Users\n=====\n\n.. jsonschema::\n\n    {"title": "User", "properties": {"thing": {"$ref": "d2/t.json"}}}\n')
+    app = sphinx_project.build()
+    assert sorted(app.env.jsonschema_refs.targets) == ['d1/s.json#', 'd2/t.json#', 'user.rst#']
+    assert ('b.html#thing', 'Thing') in _references(app, 'user')
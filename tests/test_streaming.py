@@ -0,0 +1,84 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import importlib
+import json
+
+import pytest
+
+from jsonpointer import resolve_pointer
+
+streaming = importlib.import_module('sphinx-jsonschema.streaming')
+
+DOCUMENT = {
+    'title': 'Bundle',
+    'definitions': {
+        'skip "me"': {'enum': ['a]', '{b', 'c\\"', [1, {'x': None}]]},
+        'a/b': {'type': 'string'},
+        'm~n': {'type': 'integer'},
+        'Foo': {
+            'type': 'object',
+            'properties': {'n': {'type': 'number', 'default': 1.5e3}},
+            'examples': [{'n': 1}, {'n': 2}, {'n': 3}]
+        },
+        'ünïcode': {'description': 'ß'}
+    },
+    'items': [1, True, None, 'text']
+}
+
+
+@pytest.fixture(params=[None, 2])
+def bundle(request, tmp_path):
+    path = tmp_path / 'bundle.json'
+    path.write_text(json.dumps(DOCUMENT, indent=request.param, ensure_ascii=False),
+                    encoding='utf-8')
+    return str(path)
+
+
+@pytest.mark.parametrize('pointer', [
+    '',
+    '/title',
+    '/definitions/Foo',
+    '/definitions/Foo/properties/n/default',
+    '/definitions/Foo/examples/2',
+    '/definitions/a~1b',
+    '/definitions/m~0n',
+    '/definitions/skip "me"/enum/3/1',
+    '/definitions/ünïcode',
+    '/items/0',
+    '/items/3',
+])
+def test_extract(bundle, pointer):
+    value, size = streaming.extract(bundle, pointer, json.loads)
+    assert value == resolve_pointer(DOCUMENT, pointer)
+
+
+@pytest.mark.parametrize('pointer', [
+    '/missing',
+    '/definitions/Foo/examples/3',
+    '/items/01',
+    '/title/0',
+])
+def test_missing(bundle, pointer):
+    with pytest.raises(KeyError):
+        streaming.extract(bundle, pointer, json.loads)
+
+
+def test_not_json(tmp_path):
+    path = tmp_path / 'schema.yaml'
+    path.write_text('definitions:\n  Foo:\n    type: string\n')
+    assert not streaming.is_json(str(path))
+    with pytest.raises(streaming.StreamError):
+        streaming.extract(str(path), '/definitions/Foo', json.loads)
+
+
+def test_is_json(bundle):
+    assert streaming.is_json(bundle)
+
+
+def test_skip_deep_nesting(tmp_path):
+    path = tmp_path / 'deep.json'
+    path.write_text('{"x": ' + '{"b": [1, "x]"], "a": ' * 100 + 'null' + '}' * 100 +
+                    ', "y": {"z": [1, 2]}}')
+    value, size = streaming.extract(str(path), '/y', json.loads)
+    assert value == {'z': [1, 2]}
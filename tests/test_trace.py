@@ -0,0 +1,80 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+import importlib
+import json
+
+import pytest
+
+instrument = importlib.import_module('sphinx-jsonschema.instrument')
+
+
+@pytest.fixture
+def untraced():
+    yield
+    instrument._tracing = False
+    instrument._events = []
+
+
+def test_span(monkeypatch, untraced):
+    clock = iter(range(100))
+    monkeypatch.setattr(instrument.time, 'perf_counter', lambda: next(clock))
+    with instrument.span('off'):
+        pass
+    assert instrument._events == []
+
+    instrument._tracing = True
+    with instrument.span('outer', path='x.json'):
+        with instrument.span('inner'):
+            pass
+    inner, outer = instrument._events
+    assert (outer['name'], outer['ph'], outer['ts'], outer['dur'], outer['args']) == (
+        'outer', 'X', 0, 3e6, {'path': 'x.json'})
+    assert (inner['name'], inner['ts'], inner['dur']) == ('inner', 1e6, 1e6)
+
+
+def test_trace(sphinx_project, untraced):
+    sphinx_project.write('schemas/nested.json', json.dumps(
+        {'title': 'Nested', 'type': 'object',
+         'properties': {'a': {'type': 'object', 'properties': {'b': {'type': 'object',
+                                                                     'properties': {'c': {'type': 'string'}}}}}}}))
+    trace = sphinx_project.root / 'trace.json'
+    sphinx_project.configure({'node_cache': False, 'trace': str(trace)})
+    pages = ['page%d' % n for n in range(6)]
+    sphinx_project.index(pages)
+    for page in pages:
+        sphinx_project.write(
+            page + '.rst',
+            '%s\n=====\n\n.. jsonschema:: schemas/nested.json\n\n.. jsonschema::\n\n    {"type": "string"}\n' % page)
+
+    for parallel in (1, 2):
+        sphinx_project.build(freshenv=True, parallel=parallel)
+
+        data = json.loads(trace.read_text())
+        events = [event for event in data['traceEvents'] if event['ph'] == 'X']
+        names = [event['name'] for event in events]
+        directives = [event for event in events if event['name'] == 'jsonschema']
+        assert sorted((event['args']['docname'], event['args']['lineno']) for event in directives) == sorted(
+            (page, line) for page in pages for line in (4, 6))
+        for name in ('get_json_data', 'read', 'parse', 'WideFormat.run', 'dispatch', 'build_table'):
+            assert name in names
+        # the levels of the nested schema each have a span
+        assert max(event['args']['depth'] for event in events if event['name'] == '_walk') >= 3
+        assert all(event['dur'] >= 0 for event in events)
+        # the prefetch reads the schemas before any document is read
+        assert all(event['args'].get('docname') in pages
+                   or event['name'] in ('read', 'parse') and 'docname' not in event['args'] for event in events)
+
+        # the spans of a directive lie within it
+        for directive in directives:
+            inner = [event for event in events if event['pid'] == directive['pid']
+                     and event['args'].get('docname') == directive['args']['docname']
+                     and event['ts'] >= directive['ts']
+                     and event['ts'] + event['dur'] <= directive['ts'] + directive['dur']]
+            assert len(inner) > 1
+
+        processes = {event['pid'] for event in events}
+        assert (len(processes) > 1) == (parallel > 1)
+        named = {event['pid'] for event in data['traceEvents']
+                 if event['ph'] == 'M' and event['name'] == 'process_name'}
+        assert named == processes